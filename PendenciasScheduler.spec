@@ -3,9 +3,29 @@ from PyInstaller.utils.hooks import collect_all
 
 datas = [('.env', '.')]
 binaries = []
-hiddenimports = ['pyodbc', 'schedule', 'pandas', 'dotenv', 'app.services.pendencias', 'app.services.database', 'app.models', 'app.core', 'app.utils']
-tmp_ret = collect_all('schedule')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
+hiddenimports = [
+    'pyodbc', 'numpy', 'pandas', 'dotenv',
+    'app.services.pendencias', 'app.services.database',
+    'app.services.agendador',
+    'app.services.analisador_tendencias',
+    'app.services.anomalias',
+    'app.services.cadencias',
+    'app.services.catalogo',
+    'app.services.checkpoint',
+    'app.services.circuit_breaker',
+    'app.services.comparacao',
+    'app.services.connection_pool',
+    'app.services.distribuicao',
+    'app.services.duracoes',
+    'app.services.formato_resultados',
+    'app.services.historico',
+    'app.services.pendencias_async',
+    'app.services.resumo',
+    'app.services.serie_historica',
+    'app.services.trava_execucao',
+    'app.services.usuarios',
+    'app.models', 'app.core', 'app.utils',
+]
 tmp_ret = collect_all('pyodbc')
 datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 tmp_ret = collect_all('pandas')
@@ -1,5 +1,6 @@
-import schedule
-import time
+import asyncio
+import concurrent.futures
+import signal
 import sys
 import os
 from pathlib import Path
@@ -9,9 +10,18 @@ import logging
 
 sys.path.append(str(Path(__file__).parent.parent))
 
+from app.services.agendador import Agendador
+from app.services.distribuicao import ExecucaoDistribuida, criar_coordenador
+from app.services.trava_execucao import ExecucaoEmAndamento
 from app.services.pendencias import PendenciasService
+from app.services.pendencias_async import PendenciasServiceAsync
 from app.services.database import DatabaseService
 
+try:
+    from config.settings import APP_CONFIG
+except ImportError:
+    APP_CONFIG = {'output_dir': 'output', 'agenda_execucao_completa': '0 22 * * *'}
+
 class PendenciasScheduler:
     def __init__(self):
         logging.basicConfig(
@@ -25,29 +35,79 @@ class PendenciasScheduler:
         self.logger = logging.getLogger(__name__)
         self.database_service = DatabaseService()
         self.pendencias_service = PendenciasService()
-        self.running = False
+        self.agendador = Agendador()
+        # Uma execução por vez: um job não começa enquanto outro (ou executar_agora) está rodando
+        self._execucao_lock = threading.Lock()
+        
+        self.modo_distribuicao = APP_CONFIG.get('modo_distribuicao', 'desativado')
+        self.no_id = APP_CONFIG.get('no_id', 'scheduler')
+        self.coordenador = None
+        if self.modo_distribuicao != 'desativado':
+            self.coordenador = criar_coordenador(
+                APP_CONFIG.get('coordenacao', 'sqlserver'),
+                db_service=self.database_service,
+                caminho_sqlite=Path(APP_CONFIG.get('coordenacao_sqlite', 'output/coordenacao.db'))
+            )
+            self.coordenador.anunciar(self.no_id)
+            self.logger.info(f"Modo distribuído '{self.modo_distribuicao}' ativo - nó {self.no_id}")
+        
+        # Caminho assíncrono: as execuções rodam num event loop próprio, que também atende status e cancelamento
+        self.pendencias_async = PendenciasServiceAsync(self.pendencias_service)
+        self._loop = None
+        if APP_CONFIG.get('execucao_async', False):
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name='scheduler-loop', daemon=True).start()
+            self.logger.info(f"Execução assíncrona ativa - até {self.pendencias_async.max_concorrencia} consultas simultâneas")
+        
+    @property
+    def running(self) -> bool:
+        return self.agendador.em_execucao
+        
+    def executar_consultas_agendadas(self, grupos=None, apenas_vencidas=False):
+        with self._execucao_lock:
+            return self._executar_consultas(grupos, apenas_vencidas)
+    
+    def _criar_distribuicao(self):
+        if self.coordenador is None:
+            return None
+        # Todos os nós precisam chegar à mesma chave: o horário agendado do job (não o relógio local)
+        tarefa = self.agendador.tarefa_atual
+        if tarefa is not None:
+            execucao = f"{tarefa.nome}-{tarefa.proxima:%Y%m%d%H%M}"
+        else:
+            execucao = f"imediata-{datetime.now():%Y%m%d%H}"
+        return ExecucaoDistribuida(
+            self.coordenador, self.no_id, execucao,
+            modo=self.modo_distribuicao,
+            lease_ttl=APP_CONFIG.get('lease_ttl', 900),
+            no_ttl=APP_CONFIG.get('no_ttl', 900),
+            espera_max=APP_CONFIG.get('distribuicao_espera_max', 3600)
+        )
+    
+    def executar_consultas_vencidas(self):
+        return self.executar_consultas_agendadas(apenas_vencidas=True)
+    
+    def _executar_consultas(self, grupos=None, apenas_vencidas=False):
+        if self._loop is not None:
+            # O job espera no seu thread; a execução acontece no event loop
+            futuro = asyncio.run_coroutine_threadsafe(self.executar_consultas_async(grupos, apenas_vencidas), self._loop)
+            try:
+                return futuro.result()
+            except concurrent.futures.CancelledError:
+                return False
         
-    def executar_consultas_agendadas(self):
         try:
-            self.logger.info("Iniciando execução agendada de consultas de pendências")
-            
-            if not self.database_service.test_connection():
-                self.logger.error("Teste de conexão com banco de dados falhou - abortando execução")
+            if not self._iniciar_execucao(grupos, apenas_vencidas):
                 return False
             
-            self.logger.info("Conexão com banco de dados verificada - prosseguindo com execução das consultas")
-            
-            resumo = self.pendencias_service.executar_todas_consultas()
-            
-            if resumo:
-                self.logger.info(f"Execução concluída com sucesso: {resumo.consultas_executadas} consultas executadas")
-                self.logger.info(f"Total de pendências encontradas: {resumo.total_pendencias_encontradas}")
-                self.logger.info(f"Taxa de sucesso: {resumo.taxa_sucesso:.1f}%")
-                return True
-            else:
-                self.logger.error("Execução falhou - nenhum resultado retornado")
-                return False
+            resumo = self.pendencias_service.executar_todas_consultas(
+                grupos=grupos or None, apenas_vencidas=apenas_vencidas, distribuicao=self._criar_distribuicao()
+            )
+            return self._registrar_resultado(resumo, apenas_vencidas)
                 
+        except ExecucaoEmAndamento as e:
+            self.logger.warning(f"Execução ignorada - {e}")
+            return False
         except KeyboardInterrupt:
             self.logger.info("Execução interrompida pelo usuário")
             return False
@@ -57,42 +117,150 @@ class PendenciasScheduler:
             self.logger.error(f"Rastreamento completo: {traceback.format_exc()}")
             return False
     
-    def iniciar_scheduler(self):
-        self.logger.info("Inicializando agendador para execução diária às 19:39")
+    async def executar_consultas_async(self, grupos=None, apenas_vencidas=False):
+        """Execução aguardável no event loop; cancelar a task interrompe a execução mantendo o checkpoint"""
+        loop = asyncio.get_running_loop()
+        try:
+            if not await loop.run_in_executor(None, self._iniciar_execucao, grupos, apenas_vencidas):
+                return False
+            
+            resumo = await self.pendencias_async.executar_todas_consultas(
+                grupos=grupos or None, apenas_vencidas=apenas_vencidas, distribuicao=self._criar_distribuicao()
+            )
+            return self._registrar_resultado(resumo, apenas_vencidas)
         
-        schedule.clear()
-        schedule.every().day.at("22:00").do(self.executar_consultas_agendadas)
+        except ExecucaoEmAndamento as e:
+            self.logger.warning(f"Execução ignorada - {e}")
+            return False
+        except asyncio.CancelledError:
+            self.logger.info("Execução cancelada")
+            raise
+        except Exception as e:
+            self.logger.error(f"Erro na execução agendada: {str(e)}")
+            import traceback
+            self.logger.error(f"Rastreamento completo: {traceback.format_exc()}")
+            return False
+    
+    def _iniciar_execucao(self, grupos, apenas_vencidas):
+        if apenas_vencidas:
+            self.logger.info("Iniciando ciclo de atualização por cadência")
+        elif grupos:
+            self.logger.info(f"Iniciando execução agendada de consultas de pendências dos grupos {grupos}")
+        else:
+            self.logger.info("Iniciando execução agendada de consultas de pendências")
         
-        self.running = True
-        self.logger.info("Agendador iniciado com sucesso")
+        if not self.database_service.test_connection():
+            self.logger.error("Teste de conexão com banco de dados falhou - abortando execução")
+            return False
         
-        last_log_time = time.time()
+        self.logger.info("Conexão com banco de dados verificada - prosseguindo com execução das consultas")
+        return True
+    
+    def _registrar_resultado(self, resumo, apenas_vencidas):
+        if resumo:
+            self.logger.info(f"Execução concluída com sucesso: {resumo.consultas_executadas} consultas executadas")
+            self.logger.info(f"Total de pendências encontradas: {resumo.total_pendencias_encontradas}")
+            self.logger.info(f"Taxa de sucesso: {resumo.taxa_sucesso:.1f}%")
+            return True
+        elif apenas_vencidas:
+            self.logger.info("Ciclo de cadência sem consultas executadas")
+            return True
+        else:
+            self.logger.error("Execução falhou - nenhum resultado retornado")
+            return False
+    
+    def cancelar_execucao(self):
+        """Cancela a execução assíncrona em andamento (qualquer thread); False se não há o que cancelar"""
+        if self._loop is None:
+            return False
+        return self._no_loop(self.pendencias_async.cancelar)
+    
+    async def status_async(self):
+        return self._coletar_status()
+    
+    def status(self):
+        """Situação do agendador e da execução atual, atendida pelo event loop quando ele está ativo"""
+        if self._loop is None:
+            return self._coletar_status()
+        return self._no_loop(self._coletar_status)
+    
+    def _coletar_status(self):
+        proxima = self.agendador.proxima_execucao()
+        tarefa = self.agendador.tarefa_atual
+        return {
+            'agendador_ativo': self.running,
+            'tarefa_atual': tarefa.nome if tarefa is not None else None,
+            'proxima_execucao': proxima.isoformat() if proxima else None,
+            'execucao_em_andamento': self._execucao_lock.locked(),
+            'execucao': self.pendencias_async.status()
+        }
+    
+    def _no_loop(self, funcao):
+        async def chamar():
+            return funcao()
+        return asyncio.run_coroutine_threadsafe(chamar(), self._loop).result()
+    
+    def executar_analise_tendencias(self):
+        # Importado aqui: o analisador só é necessário quando o job está configurado
+        from app.services.analisador_tendencias import AnalisadorTendencias
         
-        while self.running:
-            try:
-                schedule.run_pending()
-                
-                current_time = time.time()
-                if current_time - last_log_time >= 300:  
-                    next_run = schedule.next_run()
-                    if next_run:
-                        time_until_next = next_run - datetime.now()
-                        self.logger.info(f"Agendador em execução - próxima execução em {time_until_next}")
-                    else:
-                        self.logger.info("Agendador em execução - nenhum trabalho agendado")
-                    last_log_time = current_time
-                
-                time.sleep(60)
-                
-            except KeyboardInterrupt:
-                self.logger.info("Agendador interrompido pelo usuário")
-                break
-            except Exception as e:
-                self.logger.error(f"Erro no loop do agendador: {e}")
-                time.sleep(60)
+        with self._execucao_lock:
+            relatorio = AnalisadorTendencias().executar_analise_ontem_hoje()
+        
+        destino = Path(APP_CONFIG.get('output_dir', 'output')) / f"relatorio_tendencias_{datetime.now():%Y%m%d_%H%M%S}.txt"
+        destino.write_text(relatorio, encoding='utf-8')
+        self.logger.info(f"Relatório de tendências salvo em {destino}")
+        return destino
+    
+    def configurar_agendamentos(self):
+        """Registra os jobs configurados em APP_CONFIG (expressão vazia desativa o job)"""
+        completa = APP_CONFIG.get('agenda_execucao_completa', '0 22 * * *')
+        if completa:
+            self.agendador.adicionar('execucao_completa', completa, self.executar_consultas_agendadas)
+        
+        intradiaria = APP_CONFIG.get('agenda_intradiaria', '')
+        grupos = list(APP_CONFIG.get('agenda_intradiaria_grupos', []))
+        if intradiaria:
+            if grupos:
+                self.agendador.adicionar(
+                    'atualizacao_intradiaria', intradiaria,
+                    lambda: self.executar_consultas_agendadas(grupos=grupos)
+                )
+            else:
+                self.logger.warning("SCHEDULE_INTRADAY definido sem SCHEDULE_INTRADAY_GROUPS - job intradiário ignorado")
+        
+        cadencias = APP_CONFIG.get('agenda_cadencias', '')
+        if cadencias:
+            # A cada ciclo roda só o que venceu pela cadência de cada grupo/pendência
+            self.agendador.adicionar('atualizacao_por_cadencia', cadencias, self.executar_consultas_vencidas)
+        
+        tendencias = APP_CONFIG.get('agenda_analise_tendencias', '')
+        if tendencias:
+            self.agendador.adicionar('analise_tendencias', tendencias, self.executar_analise_tendencias)
+        
+        if self.coordenador is not None:
+            # Heartbeat do nó: mantém o anel de hash dos outros nós atualizado
+            self.agendador.adicionar('heartbeat_no', '*/5 * * * *', lambda: self.coordenador.anunciar(self.no_id))
+    
+    def iniciar_scheduler(self):
+        self.logger.info("Inicializando agendador")
+        self.configurar_agendamentos()
+        
+        if not self.agendador.tarefas():
+            self.logger.warning("Nenhum job agendado - verifique SCHEDULE_FULL_RUN / SCHEDULE_INTRADAY / SCHEDULE_CADENCE_TICK / SCHEDULE_TREND_ANALYSIS")
+        
+        self.logger.info("Agendador iniciado com sucesso")
+        try:
+            # Bloqueia dormindo até o próximo horário; parar_scheduler acorda o laço na hora
+            self.agendador.executar()
+        except KeyboardInterrupt:
+            self.logger.info("Agendador interrompido pelo usuário")
+            self.agendador.parar()
     
     def parar_scheduler(self):
-        self.running = False
+        self.agendador.parar()
+        if self.cancelar_execucao():
+            self.logger.info("Execução em andamento cancelada - progresso mantido no checkpoint")
         self.logger.info("Agendador interrompido")
     
     def executar_agora(self):
@@ -105,12 +273,10 @@ class PendenciasScheduler:
         return success
     
     def proximo_agendamento(self):
-        jobs = schedule.get_jobs()
-        if jobs:
-            next_run = min(job.next_run for job in jobs)
+        next_run = self.agendador.proxima_execucao()
+        if next_run:
             self.logger.info(f"Próxima execução agendada para: {next_run}")
-            return next_run
-        return None
+        return next_run
 
 def main():
     try:
@@ -118,7 +284,11 @@ def main():
         
         scheduler = PendenciasScheduler()
         
-        scheduler.executar_agora()
+        # docker stop envia SIGTERM: encerrar o laço imediatamente em vez de esperar o próximo horário
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.parar_scheduler())
+        
+        if APP_CONFIG.get('executar_ao_iniciar', True):
+            scheduler.executar_agora()
         
         scheduler.iniciar_scheduler()
         
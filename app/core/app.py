@@ -4,6 +4,7 @@ from typing import Optional
 
 from app.services.database import DatabaseService
 from app.services.pendencias import PendenciasService
+from app.services.trava_execucao import ExecucaoEmAndamento
 from app.utils.logger import get_logger
 
 # Import com fallback
@@ -57,7 +58,11 @@ class PendenciasApp:
             return
         
         # Executar
-        resumo = self.pendencias_service.executar_todas_consultas()
+        try:
+            resumo = self.pendencias_service.executar_todas_consultas()
+        except ExecucaoEmAndamento as e:
+            print(f"⏳ Outra execução já está em andamento: {e}")
+            return
         
         if resumo:
             self.pendencias_service.imprimir_resumo_final(resumo)
@@ -1,10 +1,45 @@
-
-from dataclasses import dataclass
-from typing import Optional, Any, Dict, List
+# Data models
+from dataclasses import dataclass, field, fields
+from typing import Optional, Any, Dict, List, Sequence
 from datetime import datetime
 
+import numpy as np
 
-@dataclass
+
+def _slots_getstate(self):
+    return [getattr(self, f.name) for f in fields(self)]
+
+
+def _slots_setstate(self, estado):
+    for f, valor in zip(fields(self), estado):
+        # object.__setattr__ contorna o __setattr__ das dataclasses frozen
+        object.__setattr__(self, f.name, valor)
+
+
+def _com_slots(cls):
+    """Recria a dataclass com ``__slots__`` (equivalente a ``slots=True`` do Python 3.10+).
+
+    Sem ``__dict__`` por instância, cada objeto ocupa só os campos declarados.
+    Como no stdlib, ``__getstate__``/``__setstate__`` tornam as instâncias
+    copiáveis e serializáveis com pickle mesmo quando ``frozen=True``.
+    """
+    nomes = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    for nome in nomes:
+        # Defaults ficam no __init__ gerado; como atributos de classe conflitariam com os slots
+        namespace.pop(nome, None)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = nomes
+    namespace.setdefault('__getstate__', _slots_getstate)
+    namespace.setdefault('__setstate__', _slots_setstate)
+    novo = type(cls)(cls.__name__, cls.__bases__, namespace)
+    novo.__qualname__ = cls.__qualname__
+    return novo
+
+
+@_com_slots
+@dataclass(frozen=True)
 class Pendencia:
     id: int
     id_pendencia: int
@@ -14,8 +49,15 @@ class Pendencia:
     dt_criacao: Optional[datetime] = None
     dt_modificacao: Optional[datetime] = None
     exibe_contagem: Optional[int] = None
+    hash_consulta: Optional[str] = None  # SQL normalizado, para deduplicação na execução
 
+    @property
+    def consulta_preview(self) -> str:
+        consulta = self.consulta_pendencia or ''
+        return consulta[:100] + "..." if len(consulta) > 100 else consulta
 
+
+@_com_slots
 @dataclass
 class ResultadoExecucao:
     id: int
@@ -26,9 +68,109 @@ class ResultadoExecucao:
     status: str
     exibe_contagem: Optional[int] = None
     erro: Optional[str] = None
-    consulta_preview: Optional[str] = None
+    tempos: Optional[Dict[str, float]] = None  # segundos por fase (conexao, execucao, busca, usuarios, historico, total)
+    id_consulta_origem: Optional[int] = None  # id da consulta executada cuja contagem foi reaproveitada
+    do_historico: bool = False  # contagem lida de amm_histPendencias (modo incremental)
+    # Referência à pendência de origem: o preview do SQL é derivado dela sob demanda
+    pendencia: Optional[Pendencia] = field(default=None, repr=False, compare=False)
+
+    @property
+    def consulta_preview(self) -> Optional[str]:
+        return self.pendencia.consulta_preview if self.pendencia is not None else None
+
+
+class TabelaResultados:
+    """Visão colunar dos resultados de uma execução (um array NumPy por campo).
+
+    Agregações (totais, top-K, somas por fase) operam sobre as colunas; os
+    objetos ResultadoExecucao só são consultados para montar as linhas exibidas.
+    """
+
+    STATUS = ('sucesso', 'erro', 'ignorada')
+    FASES = ('conexao', 'execucao', 'busca', 'usuarios', 'historico', 'total')
+    SEM_GRUPO = -1
+
+    __slots__ = (
+        'resultados', 'ids', 'id_pendencia', 'id_grupo', 'quantidade', 'tem_quantidade', 'status',
+        'do_historico', 'tempos'
+    )
+
+    def __init__(self, resultados: Sequence[ResultadoExecucao]):
+        n = len(resultados)
+        codigos = {s: i for i, s in enumerate(self.STATUS)}
+
+        self.resultados = resultados
+        self.ids = np.fromiter((r.id for r in resultados), dtype=np.int64, count=n)
+        self.id_pendencia = np.fromiter((r.id_pendencia for r in resultados), dtype=np.int64, count=n)
+        self.id_grupo = np.fromiter(
+            (self.SEM_GRUPO if r.id_grupo is None else r.id_grupo for r in resultados), dtype=np.int64, count=n
+        )
+        self.quantidade = np.fromiter((r.quantidade or 0 for r in resultados), dtype=np.int64, count=n)
+        self.tem_quantidade = np.fromiter((r.quantidade is not None for r in resultados), dtype=bool, count=n)
+        self.status = np.fromiter((codigos.get(r.status, 1) for r in resultados), dtype=np.int8, count=n)
+        self.do_historico = np.fromiter((r.do_historico for r in resultados), dtype=bool, count=n)
 
+        # Uma linha por resultado, uma coluna por fase; NaN quando não houve medição
+        self.tempos = np.full((n, len(self.FASES)), np.nan)
+        for i, r in enumerate(resultados):
+            if r.tempos:
+                self.tempos[i] = [r.tempos.get(fase, np.nan) for fase in self.FASES]
 
+    def __len__(self) -> int:
+        return len(self.resultados)
+
+    def mascara_status(self, status: str) -> np.ndarray:
+        return self.status == self.STATUS.index(status)
+
+    def mascara_com_dados(self) -> np.ndarray:
+        """Sucesso com quantidade > 0"""
+        return self.mascara_status('sucesso') & self.tem_quantidade & (self.quantidade > 0)
+
+    def coluna_tempo(self, fase: str) -> np.ndarray:
+        return self.tempos[:, self.FASES.index(fase)]
+
+    def soma_tempos(self) -> Dict[str, float]:
+        if len(self) == 0:
+            return {}
+        medidos = ~np.isnan(self.tempos)
+        somas = np.nansum(self.tempos, axis=0)
+        return {fase: float(somas[i]) for i, fase in enumerate(self.FASES) if medidos[:, i].any()}
+
+
+@_com_slots
+@dataclass
+class ResumoGrupo:
+    """Subtotais de uma execução para um id_grupo (None = pendências sem grupo)"""
+    id_grupo: Optional[int]
+    consultas: int = 0
+    executadas: int = 0
+    erros: int = 0
+    ignoradas: int = 0
+    total_pendencias: int = 0
+    duracao: float = 0.0
+
+    @property
+    def taxa_sucesso(self) -> float:
+        if self.consultas == 0:
+            return 0.0
+        return (self.executadas / self.consultas) * 100
+
+
+@_com_slots
+@dataclass
+class Anomalia:
+    """Contagem do dia fora da distribuição recente da consulta"""
+    id: int
+    nome_pendencia: Optional[str]
+    quantidade: float
+    mediana: float
+    desvio: float  # desvio absoluto mediano (MAD) do histórico
+    escore: float  # distância à mediana em unidades de desvio robusto (com sinal)
+    tipo: str  # 'aumento' | 'queda' | 'zerada'
+    dias_historico: int
+
+
+@_com_slots
 @dataclass
 class ResumoExecucao:
     timestamp: str
@@ -38,9 +180,21 @@ class ResumoExecucao:
     total_pendencias_encontradas: int
     resultados: List[ResultadoExecucao]
     top_pendencias: List[Dict[str, Any]]
-    
+    consultas_ignoradas: int = 0
+    consultas_reaproveitadas: int = 0
+    duracao_total: Optional[float] = None
+    tempos_por_fase: Dict[str, float] = field(default_factory=dict)
+    consultas_mais_lentas: List[Dict[str, Any]] = field(default_factory=list)
+    grupos: List[ResumoGrupo] = field(default_factory=list)
+    anomalias: List[Anomalia] = field(default_factory=list)
+    # Execução de apenas parte das consultas (por grupo ou por cadência)
+    parcial: bool = False
+    # None numa execução completa; os id_grupo executados numa execução por grupos
+    grupos_executados: Optional[List[int]] = None
+    tabela: Optional[TabelaResultados] = field(default=None, repr=False, compare=False)
+
     @property
     def taxa_sucesso(self) -> float:
         if self.total_consultas == 0:
             return 0.0
-        return (self.consultas_executadas / self.total_consultas) * 100
\ No newline at end of file
+        return (self.consultas_executadas / self.total_consultas) * 100
@@ -0,0 +1,210 @@
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+
+class ExpressaoCron:
+    """Expressão cron de 5 campos: minuto hora dia-do-mês mês dia-da-semana.
+
+    Aceita ``*``, listas (``1,15``), intervalos (``8-18``), passos (``*/15``,
+    ``8-18/2``) e os atalhos ``@hourly``, ``@daily``, ``@weekly`` e ``@monthly``.
+    Dia da semana: 0 ou 7 = domingo. Como no cron, quando dia-do-mês e
+    dia-da-semana são ambos restritos (nenhum começa com ``*``), basta um deles casar.
+    """
+
+    def __init__(self, expressao: str):
+        self.expressao = expressao.strip()
+        campos = _ALIASES.get(self.expressao.lower(), self.expressao).split()
+        if len(campos) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: '{expressao}'")
+
+        self.minutos = self._campo(campos[0], 0, 59)
+        self.horas = self._campo(campos[1], 0, 23)
+        self.dias = self._campo(campos[2], 1, 31)
+        self.meses = self._campo(campos[3], 1, 12)
+        self.dias_semana = {d % 7 for d in self._campo(campos[4], 0, 7)}
+        # Como no cron: só campos que não começam com '*' (nem '*/2') contam como restritos
+        self._dia_restrito = not campos[2].startswith('*')
+        self._semana_restrita = not campos[4].startswith('*')
+
+    @staticmethod
+    def _campo(texto: str, minimo: int, maximo: int) -> Set[int]:
+        valores: Set[int] = set()
+        for parte in texto.split(','):
+            faixa, _, passo = parte.partition('/')
+            if faixa == '*':
+                inicio, fim = minimo, maximo
+            elif '-' in faixa:
+                inicio, fim = (int(v) for v in faixa.split('-', 1))
+            else:
+                inicio = int(faixa)
+                fim = maximo if passo else inicio
+            incremento = int(passo) if passo else 1
+            if inicio < minimo or fim > maximo or inicio > fim or incremento < 1:
+                raise ValueError(f"Invalid cron field '{texto}' (allowed {minimo}-{maximo})")
+            valores.update(range(inicio, fim + 1, incremento))
+        return valores
+
+    def _dia_casa(self, momento: datetime) -> bool:
+        dia_ok = momento.day in self.dias
+        # isoweekday: segunda = 1 ... domingo = 7 -> cron: domingo = 0
+        semana_ok = momento.isoweekday() % 7 in self.dias_semana
+        if self._dia_restrito and self._semana_restrita:
+            return dia_ok or semana_ok
+        return dia_ok and semana_ok
+
+    def proxima(self, apos: datetime) -> datetime:
+        """Primeiro instante (com minuto cheio) estritamente depois de ``apos``"""
+        momento = apos.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = momento + timedelta(days=366 * 5)
+        while momento < limite:
+            if momento.month not in self.meses:
+                ano, mes = (momento.year + 1, 1) if momento.month == 12 else (momento.year, momento.month + 1)
+                momento = momento.replace(year=ano, month=mes, day=1, hour=0, minute=0)
+                continue
+            if not self._dia_casa(momento):
+                momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if momento.hour not in self.horas:
+                momento = momento.replace(minute=0) + timedelta(hours=1)
+                continue
+            if momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+                continue
+            return momento
+        raise ValueError(f"Cron expression never fires: '{self.expressao}'")
+
+    def __str__(self) -> str:
+        return self.expressao
+
+
+@dataclass
+class Tarefa:
+    nome: str
+    cron: ExpressaoCron
+    acao: Callable[[], Any]
+    proxima: datetime = field(default_factory=datetime.now)
+    execucoes: int = 0
+
+
+class Agendador:
+    """Agendador de tarefas cron que dorme num ``threading.Event`` até o próximo horário.
+
+    Não há polling: a espera termina exatamente no horário da próxima tarefa, ou
+    imediatamente quando ``parar`` é chamado ou uma tarefa é adicionada. As
+    tarefas vencidas rodam em sequência na thread do agendador; se uma execução
+    longa fizer outra perder o horário, ela roda uma vez ao final, sem acumular.
+    """
+
+    # Intervalo máximo entre mensagens de "agendador ativo" no log
+    INTERVALO_LOG = 300
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._tarefas: Dict[str, Tarefa] = {}
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        # _parado: o laço não está rodando; _parada_solicitada: parar() foi chamado (inclusive antes do laço começar)
+        self._parado = threading.Event()
+        self._parado.set()
+        self._parada_solicitada = threading.Event()
+        # Tarefa em execução; durante a ação, ``tarefa_atual.proxima`` ainda é o horário agendado
+        self.tarefa_atual: Optional[Tarefa] = None
+
+    def adicionar(self, nome: str, expressao: str, acao: Callable[[], Any]) -> Tarefa:
+        cron = ExpressaoCron(expressao)
+        tarefa = Tarefa(nome=nome, cron=cron, acao=acao, proxima=cron.proxima(datetime.now()))
+        with self._lock:
+            self._tarefas[nome] = tarefa
+        self.logger.info(f"Job '{nome}' scheduled ({cron}) - next run at {tarefa.proxima:%d/%m/%Y %H:%M}")
+        self._acordar.set()
+        return tarefa
+
+    def remover(self, nome: str) -> None:
+        with self._lock:
+            self._tarefas.pop(nome, None)
+        self._acordar.set()
+
+    def tarefas(self) -> List[Tarefa]:
+        with self._lock:
+            return sorted(self._tarefas.values(), key=lambda t: t.proxima)
+
+    def proxima_execucao(self) -> Optional[datetime]:
+        tarefas = self.tarefas()
+        return tarefas[0].proxima if tarefas else None
+
+    @property
+    def em_execucao(self) -> bool:
+        return not self._parado.is_set()
+
+    def parar(self) -> None:
+        self._parada_solicitada.set()
+        self._acordar.set()
+
+    def executar(self) -> None:
+        """Laço principal (bloqueante) até ``parar`` ser chamado.
+
+        Um ``parar`` anterior à chamada (ex.: SIGTERM durante a execução inicial) não é
+        descartado: o laço nem começa.
+        """
+        if self._parada_solicitada.is_set():
+            self.logger.info("Stop requested before the scheduler loop started")
+            return
+        self._parado.clear()
+        try:
+            self._executar_laco()
+        finally:
+            self._parado.set()
+        self.logger.info("Scheduler loop finished")
+
+    def _executar_laco(self) -> None:
+        ultimo_log = datetime.now()
+
+        while not self._parada_solicitada.is_set():
+            agora = datetime.now()
+            proxima = self.proxima_execucao()
+
+            if proxima is not None and proxima <= agora:
+                self._executar_vencidas(agora)
+                continue
+
+            if (agora - ultimo_log).total_seconds() >= self.INTERVALO_LOG:
+                if proxima is not None:
+                    self.logger.info(f"Scheduler running - next run in {proxima - agora}")
+                else:
+                    self.logger.info("Scheduler running - no jobs scheduled")
+                ultimo_log = agora
+
+            espera = self.INTERVALO_LOG
+            if proxima is not None:
+                espera = min(espera, (proxima - agora).total_seconds())
+            self._acordar.wait(timeout=max(espera, 0))
+            self._acordar.clear()
+
+    def _executar_vencidas(self, agora: datetime) -> None:
+        vencidas = [t for t in self.tarefas() if t.proxima <= agora]
+        for tarefa in vencidas:
+            if self._parada_solicitada.is_set():
+                return
+            self.logger.info(f"Running scheduled job '{tarefa.nome}'")
+            self.tarefa_atual = tarefa
+            try:
+                tarefa.acao()
+            except Exception as e:
+                self.logger.error(f"Scheduled job '{tarefa.nome}' failed: {e}")
+            finally:
+                self.tarefa_atual = None
+            tarefa.execucoes += 1
+            # A partir de agora (e não do horário perdido): sem rajada de execuções atrasadas
+            tarefa.proxima = tarefa.cron.proxima(datetime.now())
+            self.logger.info(f"Job '{tarefa.nome}' next run at {tarefa.proxima:%d/%m/%Y %H:%M}")
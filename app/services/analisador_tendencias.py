@@ -1,74 +1,123 @@
 
-import json
 import csv
 from datetime import datetime, timedelta
+from decimal import Decimal
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import logging
-from dataclasses import dataclass
-from decimal import Decimal
 import sys
 
+import numpy as np
+import pandas as pd
+
 # Adicionar o diretório raiz ao path
 root_path = Path(__file__).parent.parent.parent
 sys.path.append(str(root_path))
 
 try:
-    from app.services.database import DatabaseService
-    from app.utils.logger import setup_logging
+    from config.settings import APP_CONFIG
 except ImportError:
-    # Fallback para execução direta
-    sys.path.append(str(Path(__file__).parent))
-    sys.path.append(str(Path(__file__).parent.parent))
-    try:
-        from database import DatabaseService
-        from app.utils.logger import setup_logging
-    except ImportError:
-        # Último fallback - só logging básico
-        DatabaseService = None
-        def setup_logging():
-            logging.basicConfig(level=logging.INFO)
-
+    APP_CONFIG = {}
 
-@dataclass
-class ResultadoComparacao:
-    consulta_id: int
-    nome_pendencia: str
-    contagem_anterior: int
-    contagem_atual: int
-    diferenca: int
-    percentual_reducao: float
-    valor_monetario_anterior: Optional[Decimal] = None
-    valor_monetario_atual: Optional[Decimal] = None
-    diferenca_monetaria: Optional[Decimal] = None
-    eh_monetario: bool = False
+from app.models.pendencia import Anomalia
+from app.services.anomalias import DetectorAnomalias
+from app.services.catalogo import NOME_CATALOGO, CatalogoExecucoes
+from app.services.comparacao import ResultadoComparacao, ResumoComparacao, TabelaComparacao, criar_resultado_comparacao
+from app.services.formato_resultados import carregar_resultados
+from app.services.resumo import top_k
+from app.services.serie_historica import NOME_SERIE, SerieHistorica
 
+try:
+    from app.services.database import DatabaseService
+    from app.utils.logger import setup_logging
+except ImportError:
+    # Sem pyodbc: a análise usa só os arquivos de resultados, com logging básico
+    DatabaseService = None
+    def setup_logging():
+        logging.basicConfig(level=logging.INFO)
 
 class AnalisadorTendencias:
     
+    # Comparação de duas datas feita no servidor: última contagem de cada dia por
+    # pendência (ROW_NUMBER), valor do dia anterior via LAG e totais por agregados de
+    # janela. Só voltam as linhas das maiores reduções (e uma linha com os totais).
+    QUERY_COMPARACAO = """
+    WITH ultimas AS (
+        SELECT idPendencia, data, qtd,
+               ROW_NUMBER() OVER (PARTITION BY idPendencia, data ORDER BY hora DESC) AS ordem
+        FROM amm_histPendencias
+        WHERE data IN (?, ?)
+    ),
+    serie AS (
+        SELECT idPendencia, data, qtd,
+               LAG(qtd) OVER (PARTITION BY idPendencia ORDER BY data) AS qtd_anterior,
+               LAG(data) OVER (PARTITION BY idPendencia ORDER BY data) AS data_anterior
+        FROM ultimas
+        WHERE ordem = 1
+    ),
+    consultas AS (
+        SELECT id_pendencia, MIN(id) AS id, MAX(nome_pendencia) AS nome_pendencia, MAX(exibe_contagem) AS exibe_contagem
+        FROM amm_consulta_pendencias
+        GROUP BY id_pendencia
+    ),
+    deltas AS (
+        SELECT s.idPendencia, c.id, c.nome_pendencia, c.exibe_contagem,
+               s.qtd_anterior, s.qtd AS qtd_atual, s.qtd_anterior - s.qtd AS diferenca,
+               CASE WHEN s.qtd_anterior > 0 THEN (s.qtd_anterior - s.qtd) * 100.0 / s.qtd_anterior ELSE 0 END AS percentual
+        FROM serie s
+        LEFT JOIN consultas c ON c.id_pendencia = s.idPendencia
+        WHERE s.data = ? AND s.data_anterior = ?
+    ),
+    ranqueadas AS (
+        SELECT d.*,
+               ROW_NUMBER() OVER (ORDER BY CASE WHEN diferenca > 0 THEN diferenca END DESC, idPendencia) AS pos_abs,
+               ROW_NUMBER() OVER (
+                   ORDER BY CASE WHEN diferenca > 0 AND qtd_anterior > 0 THEN percentual END DESC, idPendencia
+               ) AS pos_perc,
+               COUNT(*) OVER () AS total_consultas,
+               SUM(CASE WHEN diferenca > 0 THEN 1 ELSE 0 END) OVER () AS total_reducoes,
+               SUM(CASE WHEN diferenca < 0 THEN 1 ELSE 0 END) OVER () AS total_aumentos,
+               SUM(CASE WHEN diferenca > 0 AND exibe_contagem = 2 THEN diferenca ELSE 0 END) OVER () AS economia
+        FROM deltas d
+    )
+    SELECT idPendencia, id, nome_pendencia, exibe_contagem, qtd_anterior, qtd_atual, diferenca, percentual,
+           pos_abs, pos_perc, total_consultas, total_reducoes, total_aumentos, economia
+    FROM ranqueadas
+    WHERE pos_abs <= ? OR pos_perc <= ? OR pos_abs = 1
+    """
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.database_service = DatabaseService()
+        self.database_service = DatabaseService() if DatabaseService is not None else None
         self.output_dir = Path("output")
         self.output_dir.mkdir(exist_ok=True)
+        self.catalogo = CatalogoExecucoes(self.output_dir / NOME_CATALOGO)
+        if self.catalogo.vazio():
+            # Primeiro uso (ou catálogo apagado): indexar os arquivos já existentes
+            self.catalogo.reconstruir()
+        self.serie = SerieHistorica(self.output_dir / NOME_SERIE)
+        if len(self.serie) == 0 and not self.catalogo.vazio():
+            # Série ainda não existe: carregar o histórico a partir das execuções catalogadas
+            self.serie.reconstruir(self.catalogo.arquivos())
+    
+    def reconstruir_indices(self) -> int:
+        total = self.catalogo.reconstruir()
+        self.serie.reconstruir(self.catalogo.arquivos())
+        return total
     
     def buscar_resultados_por_data(self, data: datetime) -> Optional[Dict]:
         try:
-            # Buscar arquivos JSON da data
             data_str = data.strftime("%Y%m%d")
-            pattern = f"resultados_execucao_pendencias_{data_str}_*.json"
             
-            arquivos = list(self.output_dir.glob(pattern))
+            # Arquivo mais recente da data, pelo catálogo de execuções
+            arquivo_mais_recente = self.catalogo.buscar_mais_recente(data)
             
-            if not arquivos:
+            if arquivo_mais_recente is None:
                 self.logger.warning(f"⚠️ Nenhum arquivo encontrado para a data {data_str}")
                 return None
             
-            # Pegar o arquivo mais recente da data
-            arquivo_mais_recente = max(arquivos, key=lambda x: x.stat().st_mtime)
-            
-            with open(arquivo_mais_recente, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
+            # Qualquer formato/compressão gravado por _salvar_resultados (inclusive os .json antigos)
+            dados = carregar_resultados(arquivo_mais_recente)
             
             self.logger.info(f"📁 Carregado arquivo: {arquivo_mais_recente.name}")
             return dados
@@ -77,7 +126,8 @@ class AnalisadorTendencias:
             self.logger.error(f"❌ Erro ao buscar resultados da data {data_str}: {e}")
             return None
     
-    def comparar_entre_datas(self, data_anterior: datetime, data_atual: datetime) -> List[ResultadoComparacao]:
+    def comparar_tabelas(self, data_anterior: datetime, data_atual: datetime) -> Optional[TabelaComparacao]:
+        """Alinha as execuções das duas datas por id em uma comparação vetorizada"""
         try:
             self.logger.info(f"🔍 Comparando dados entre {data_anterior.strftime('%d/%m/%Y')} e {data_atual.strftime('%d/%m/%Y')}")
             
@@ -87,106 +137,111 @@ class AnalisadorTendencias:
             
             if not dados_anterior or not dados_atual:
                 self.logger.error("❌ Dados insuficientes para comparação")
-                return []
-            
-            comparacoes = []
+                return None
             
-            # Converter resultados se necessário
-            resultados_atual = dados_atual.get('resultados', {})
-            resultados_anterior = dados_anterior.get('resultados', {})
+            tabela = TabelaComparacao(dados_anterior.get('resultados', {}), dados_atual.get('resultados', {}))
             
-            # Se resultados é uma lista, converter para dict
-            if isinstance(resultados_atual, list):
-                resultados_atual = {str(r['id']): r for r in resultados_atual}
-            if isinstance(resultados_anterior, list):
-                resultados_anterior = {str(r['id']): r for r in resultados_anterior}
-            
-            # Comparar cada consulta
-            for consulta_id, info_atual in resultados_atual.items():
-                if consulta_id in resultados_anterior:
-                    info_anterior = resultados_anterior[consulta_id]
-                    
-                    # Extrair contagens (compatibilidade com formatos antigos e novos)
-                    contagem_atual = info_atual.get('total_registros', info_atual.get('quantidade', 0))
-                    contagem_anterior = info_anterior.get('total_registros', info_anterior.get('quantidade', 0))
-                    
-                    # Calcular diferença
-                    diferenca = contagem_anterior - contagem_atual
-                    
-                    # Calcular percentual de redução
-                    if contagem_anterior > 0:
-                        percentual_reducao = (diferenca / contagem_anterior) * 100
-                    else:
-                        percentual_reducao = 0
-                    
-                    # Verificar se é monetário (exibe_contagem = 2)
-                    eh_monetario = info_atual.get('exibe_contagem') == 2
-                    
-                    resultado = ResultadoComparacao(
-                        consulta_id=int(consulta_id),
-                        nome_pendencia=info_atual.get('nome_pendencia', 'N/A'),
-                        contagem_anterior=contagem_anterior,
-                        contagem_atual=contagem_atual,
-                        diferenca=diferenca,
-                        percentual_reducao=percentual_reducao,
-                        eh_monetario=eh_monetario
-                    )
-                    
-                    # Se for monetário, tratar como valores em reais
-                    if eh_monetario:
-                        resultado.valor_monetario_anterior = Decimal(str(contagem_anterior))
-                        resultado.valor_monetario_atual = Decimal(str(contagem_atual))
-                        resultado.diferenca_monetaria = Decimal(str(diferenca))
-                    
-                    comparacoes.append(resultado)
-            
-            self.logger.info(f"Comparação concluída: {len(comparacoes)} consultas analisadas")
-            return comparacoes
+            self.logger.info(f"Comparação concluída: {len(tabela)} consultas analisadas")
+            return tabela
             
         except Exception as e:
             self.logger.error(f"❌ Erro na comparação entre datas: {e}")
-            return []
+            return None
     
-    def identificar_maiores_reducoes(self, comparacoes: List[ResultadoComparacao], limite: int = 10) -> List[ResultadoComparacao]:
-        # Filtrar apenas reduções (diferença positiva)
-        reducoes = [c for c in comparacoes if c.diferenca > 0]
+    def resumir_comparacao(self, data_anterior: datetime, data_atual: datetime, limite: int = 10) -> Optional[ResumoComparacao]:
+        """Totais e maiores reduções entre duas datas, pela fonte configurada.
+        
+        ``banco`` calcula tudo no servidor a partir de amm_histPendencias; ``arquivos``
+        usa os JSON locais; ``auto`` tenta o banco e recorre aos arquivos se ele falhar.
+        """
+        fonte = APP_CONFIG.get('fonte_analise', 'auto')
         
-        # Ordenar por diferença absoluta (maiores reduções primeiro)
-        reducoes_ordenadas = sorted(reducoes, key=lambda x: x.diferenca, reverse=True)
+        if fonte in ('auto', 'banco') and self.database_service is not None:
+            resumo = self._resumir_no_banco(data_anterior, data_atual, limite)
+            if resumo is not None or fonte == 'banco':
+                return resumo
+            self.logger.info("🔄 Usando os arquivos locais para a comparação")
         
-        return reducoes_ordenadas[:limite]
+        tabela = self.comparar_tabelas(data_anterior, data_atual)
+        return tabela.resumir(limite) if tabela is not None else None
+    
+    def _resumir_no_banco(self, data_anterior: datetime, data_atual: datetime, limite: int) -> Optional[ResumoComparacao]:
+        try:
+            self.logger.info(
+                f"🔍 Comparando no banco entre {data_anterior.strftime('%d/%m/%Y')} e {data_atual.strftime('%d/%m/%Y')}"
+            )
+            d_anterior = data_anterior.strftime('%Y-%m-%d')
+            d_atual = data_atual.strftime('%Y-%m-%d')
+            
+            with self.database_service.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self.QUERY_COMPARACAO, (d_anterior, d_atual, d_atual, d_anterior, limite, limite))
+                linhas = cursor.fetchall()
+            
+            if not linhas:
+                self.logger.warning("⚠️ Nenhuma pendência com histórico nas duas datas")
+                return None
+            
+            # Os totais vêm repetidos em todas as linhas (agregados de janela)
+            primeira = linhas[0]
+            resumo = ResumoComparacao(
+                total_consultas=primeira.total_consultas,
+                total_reducoes=primeira.total_reducoes,
+                total_aumentos=primeira.total_aumentos,
+                total_inalteradas=primeira.total_consultas - primeira.total_reducoes - primeira.total_aumentos,
+                economia_monetaria=Decimal(str(primeira.economia or 0)),
+                fonte='banco'
+            )
+            
+            def resultado(linha) -> ResultadoComparacao:
+                return criar_resultado_comparacao(
+                    linha.id if linha.id is not None else linha.idPendencia,
+                    linha.nome_pendencia or f"Pendência {linha.idPendencia}",
+                    linha.qtd_anterior, linha.qtd_atual, float(linha.percentual), linha.exibe_contagem == 2
+                )
+            
+            reducoes = [l for l in linhas if l.diferenca > 0]
+            resumo.top_reducoes = [resultado(l) for l in sorted((l for l in reducoes if l.pos_abs <= limite), key=lambda l: l.pos_abs)]
+            resumo.top_reducoes_percentuais = [
+                resultado(l) for l in sorted((l for l in reducoes if l.pos_perc <= limite and l.qtd_anterior > 0), key=lambda l: l.pos_perc)
+            ]
+            
+            self.logger.info(f"Comparação no banco concluída: {resumo.total_consultas} pendências analisadas")
+            return resumo
+            
+        except Exception as e:
+            self.logger.error(f"❌ Erro na comparação no banco: {e}")
+            return None
+    
+    def comparar_entre_datas(self, data_anterior: datetime, data_atual: datetime) -> List[ResultadoComparacao]:
+        tabela = self.comparar_tabelas(data_anterior, data_atual)
+        return tabela.materializar() if tabela is not None else []
+    
+    def identificar_maiores_reducoes(self, comparacoes: List[ResultadoComparacao], limite: int = 10) -> List[ResultadoComparacao]:
+        # Apenas reduções (diferença positiva), maiores primeiro; heap de tamanho `limite` em vez de ordenar tudo
+        reducoes = (c for c in comparacoes if c.diferenca > 0)
+        return top_k(reducoes, limite, lambda x: x.diferenca)
     
     def identificar_maiores_reducoes_percentuais(self, comparacoes: List[ResultadoComparacao], limite: int = 10) -> List[ResultadoComparacao]:
-        # Filtrar apenas reduções (diferença positiva) e com contagem anterior > 0
-        reducoes = [c for c in comparacoes if c.diferenca > 0 and c.contagem_anterior > 0]
-        
-        # Ordenar por percentual de redução
-        reducoes_ordenadas = sorted(reducoes, key=lambda x: x.percentual_reducao, reverse=True)
-        
-        return reducoes_ordenadas[:limite]
+        # Apenas reduções (diferença positiva) com contagem anterior > 0, por percentual de redução
+        reducoes = (c for c in comparacoes if c.diferenca > 0 and c.contagem_anterior > 0)
+        return top_k(reducoes, limite, lambda x: x.percentual_reducao)
     
     def gerar_relatorio_comparativo(self, data_anterior: datetime, data_atual: datetime) -> str:
         try:
-            comparacoes = self.comparar_entre_datas(data_anterior, data_atual)
+            resumo = self.resumir_comparacao(data_anterior, data_atual, limite=10)
             
-            if not comparacoes:
+            if resumo is None or resumo.total_consultas == 0:
                 return "❌ Não foi possível gerar o relatório comparativo"
             
-            # Separar monetárias e não monetárias
-            monetarias = [c for c in comparacoes if c.eh_monetario]
-            nao_monetarias = [c for c in comparacoes if not c.eh_monetario]
-            
-            # Identificar maiores reduções
-            top_reducoes_abs = self.identificar_maiores_reducoes(comparacoes, 10)
-            top_reducoes_perc = self.identificar_maiores_reducoes_percentuais(comparacoes, 10)
-            
-            # Estatísticas gerais
-            total_reducoes = sum(1 for c in comparacoes if c.diferenca > 0)
-            total_aumentos = sum(1 for c in comparacoes if c.diferenca < 0)
-            total_inalteradas = sum(1 for c in comparacoes if c.diferenca == 0)
+            top_reducoes_abs = resumo.top_reducoes
+            top_reducoes_perc = resumo.top_reducoes_percentuais
             
-            # Economias monetárias
-            economia_total = sum(c.diferenca_monetaria for c in monetarias if c.diferenca > 0 and c.diferenca_monetaria)
+            # Estatísticas gerais e economia monetária
+            total_reducoes = resumo.total_reducoes
+            total_aumentos = resumo.total_aumentos
+            total_inalteradas = resumo.total_inalteradas
+            economia_total = resumo.economia_monetaria
             
             # Construir relatório
             relatorio = []
@@ -194,7 +249,7 @@ class AnalisadorTendencias:
             relatorio.append("📊 RELATÓRIO COMPARATIVO DE PENDÊNCIAS")
             relatorio.append("="*80)
             relatorio.append(f"📅 Período: {data_anterior.strftime('%d/%m/%Y')} → {data_atual.strftime('%d/%m/%Y')}")
-            relatorio.append(f"🔍 Total de consultas analisadas: {len(comparacoes)}")
+            relatorio.append(f"🔍 Total de consultas analisadas: {resumo.total_consultas} (fonte: {resumo.fonte})")
             relatorio.append("")
             
             # Resumo geral
@@ -238,6 +293,20 @@ class AnalisadorTendencias:
                         relatorio.append(f"     📉 Redução: {resultado.percentual_reducao:>6.1f}% ({resultado.diferenca:>6,} unidades)")
                     relatorio.append("")
             
+            # Contagens da data atual fora do padrão recente de cada consulta
+            anomalias = self.detectar_anomalias(data_atual)
+            if anomalias:
+                relatorio.append(f"🚨 ANOMALIAS EM {data_atual.strftime('%d/%m/%Y')} (mediana/MAD dos dias anteriores):")
+                relatorio.append("-" * 80)
+                for anomalia in anomalias:
+                    nome = anomalia.nome_pendencia or f"Consulta {anomalia.id}"
+                    relatorio.append(f"  [{anomalia.tipo.upper()}] {nome[:50]:<50}")
+                    relatorio.append(
+                        f"     📊 Atual: {anomalia.quantidade:>10,.0f} | Mediana: {anomalia.mediana:>10,.0f} "
+                        f"({anomalia.dias_historico} dias) | Escore: {anomalia.escore:+.1f}"
+                    )
+                relatorio.append("")
+            
             relatorio.append("="*80)
             
             # Salvar relatório
@@ -256,6 +325,105 @@ class AnalisadorTendencias:
             self.logger.error(f"❌ Erro ao gerar relatório comparativo: {e}")
             return f"❌ Erro ao gerar relatório: {e}"
     
+    def analisar_periodo(self, dias: int = 30, limite: int = 10, janela_media: int = 7) -> str:
+        """Tendência dos últimos ``dias`` dias a partir da série histórica (sem ler os JSON)"""
+        try:
+            fim = datetime.now().date()
+            inicio = fim - timedelta(days=dias - 1)
+            ids, datas, valores = self.serie.matriz(inicio, fim)
+            
+            if len(ids) == 0:
+                return f"❌ Nenhum dado na série histórica para os últimos {dias} dias"
+            
+            # Linhas = consultas, colunas = dias; NaN onde não houve execução
+            df = pd.DataFrame(valores, index=ids, columns=pd.DatetimeIndex(datas))
+            media_movel = df.T.rolling(janela_media, min_periods=1).mean().T
+            preenchido = df.ffill(axis=1).bfill(axis=1)
+            primeiro = preenchido.iloc[:, 0]
+            ultimo = preenchido.iloc[:, -1]
+            variacao = primeiro - ultimo
+            
+            # Semana contra semana: média dos últimos 7 dias contra a dos 7 anteriores
+            semana_atual = df.iloc[:, -7:].mean(axis=1)
+            semana_anterior = df.iloc[:, -14:-7].mean(axis=1) if df.shape[1] > 7 else pd.Series(np.nan, index=df.index)
+            delta_semanal = semana_atual - semana_anterior
+            
+            total_diario = df.sum(axis=0, min_count=1)
+            nomes = self.serie.nomes()
+            
+            relatorio = []
+            relatorio.append("="*80)
+            relatorio.append(f"📊 TENDÊNCIA DE PENDÊNCIAS - ÚLTIMOS {dias} DIAS")
+            relatorio.append("="*80)
+            relatorio.append(f"📅 Período: {inicio.strftime('%d/%m/%Y')} → {fim.strftime('%d/%m/%Y')}")
+            relatorio.append(f"🔍 Consultas na série: {len(ids)} | Dias com execução: {int(total_diario.notna().sum())}")
+            relatorio.append(f"📈 Total diário: {self._sparkline(total_diario.to_numpy())}")
+            relatorio.append(
+                f"  Reduções: {int((variacao > 0).sum())} | ⬆️ Aumentos: {int((variacao < 0).sum())} | "
+                f"➡️ Inalteradas: {int((variacao == 0).sum())}"
+            )
+            relatorio.append("")
+            
+            for titulo, serie_ordem in (
+                (f"🏆 TOP {limite} - MAIORES REDUÇÕES NO PERÍODO:", variacao),
+                (f"⚠️ TOP {limite} - MAIORES AUMENTOS NO PERÍODO:", -variacao),
+            ):
+                positivos = serie_ordem[serie_ordem > 0]
+                if positivos.empty:
+                    continue
+                relatorio.append(titulo)
+                relatorio.append("-" * 80)
+                for i, id_consulta in enumerate(positivos.nlargest(limite).index, 1):
+                    nome = nomes.get(str(id_consulta), f"Consulta {id_consulta}")
+                    delta = delta_semanal[id_consulta]
+                    delta_txt = f"{delta:+,.1f}" if pd.notna(delta) else "n/d"
+                    relatorio.append(f"{i:2d}. {nome[:50]:<50}")
+                    relatorio.append(
+                        f"     📊 De: {primeiro[id_consulta]:>10,.0f} → Para: {ultimo[id_consulta]:>10,.0f} | "
+                        f"Média {janela_media}d: {media_movel.loc[id_consulta].iloc[-1]:>10,.1f} | Semana: {delta_txt}"
+                    )
+                    relatorio.append(f"     {self._sparkline(df.loc[id_consulta].to_numpy())}")
+                    relatorio.append("")
+            
+            relatorio.append("="*80)
+            return '\n'.join(relatorio)
+            
+        except Exception as e:
+            self.logger.error(f"❌ Erro na análise do período de {dias} dias: {e}")
+            return f"❌ Erro na análise do período: {e}"
+    
+    def detectar_anomalias(self, data: datetime) -> List[Anomalia]:
+        """Anomalias do dia na série histórica local (vazia se o dia não estiver na série)"""
+        try:
+            detector = DetectorAnomalias(
+                self.serie,
+                janela_dias=APP_CONFIG.get('anomalias_janela_dias', 30),
+                limite=APP_CONFIG.get('anomalias_limite', 3.5),
+                minimo_dias=APP_CONFIG.get('anomalias_minimo_dias', 7),
+                variacao_minima=APP_CONFIG.get('anomalias_variacao_minima', 0.2)
+            )
+            return detector.detectar_no_historico(data.date())
+        except Exception as e:
+            self.logger.error(f"❌ Erro na detecção de anomalias: {e}")
+            return []
+    
+    @staticmethod
+    def _sparkline(valores: np.ndarray, largura: int = 60) -> str:
+        """Mini gráfico em blocos Unicode; séries longas são reduzidas pela média de cada faixa"""
+        niveis = "▁▂▃▄▅▆▇█"
+        valores = np.asarray(valores, dtype=float)
+        if len(valores) > largura:
+            faixas = np.array_split(valores, largura)
+            valores = np.array([np.nan if np.isnan(f).all() else np.nanmean(f) for f in faixas])
+        
+        validos = ~np.isnan(valores)
+        if not validos.any():
+            return ""
+        minimo, maximo = valores[validos].min(), valores[validos].max()
+        escala = (valores - minimo) / (maximo - minimo) if maximo > minimo else np.zeros_like(valores)
+        indices = np.clip(np.nan_to_num(escala) * (len(niveis) - 1), 0, len(niveis) - 1).round().astype(int)
+        return ''.join(niveis[i] if v else ' ' for i, v in zip(indices, validos))
+    
     def executar_analise_ontem_hoje(self) -> str:
         hoje = datetime.now()
         ontem = hoje - timedelta(days=1)
@@ -286,6 +454,8 @@ def main():
         print("1. 📈 Comparar ontem vs hoje")
         print("2. 📅 Comparar datas customizadas")
         print("3. 🔍 Listar arquivos disponíveis")
+        print("4. 🔄 Reconstruir catálogo de execuções")
+        print("5. 📉 Tendência por período (30/90/365 dias)")
         print("0. ❌ Sair")
         print("="*70)
         
@@ -308,14 +478,31 @@ def main():
                     
                 elif opcao == "3":
                     print("📁 Arquivos de resultados disponíveis:")
-                    arquivos = list(analisador.output_dir.glob("resultados_execucao_pendencias_*.json"))
-                    if arquivos:
-                        for arquivo in sorted(arquivos):
-                            data_mod = datetime.fromtimestamp(arquivo.stat().st_mtime)
-                            print(f"   📄 {arquivo.name} (modificado: {data_mod.strftime('%d/%m/%Y %H:%M')})")
+                    execucoes = analisador.catalogo.listar()
+                    if execucoes:
+                        for execucao in execucoes:
+                            momento = datetime.strptime(execucao['momento'], '%Y-%m-%d %H:%M:%S')
+                            print(
+                                f"   📄 {execucao['arquivo']} ({momento.strftime('%d/%m/%Y %H:%M')}) - "
+                                f"{execucao['total_pendencias'] or 0:,} pendências, "
+                                f"{execucao['consultas_executadas'] or 0}/{execucao['total_consultas'] or 0} consultas"
+                            )
                     else:
                         print("   ❌ Nenhum arquivo de resultado encontrado")
                     
+                elif opcao == "4":
+                    print("🔄 Reconstruindo catálogo e série histórica a partir de output/...")
+                    total = analisador.reconstruir_indices()
+                    print(f"   ✅ {total} arquivos indexados")
+                    
+                elif opcao == "5":
+                    dias = input("📅 Quantidade de dias [30]: ").strip() or "30"
+                    if not dias.isdigit() or int(dias) <= 0:
+                        print("❌ Informe um número de dias válido")
+                        continue
+                    print(f"🔄 Analisando tendência dos últimos {dias} dias...")
+                    print(analisador.analisar_periodo(int(dias)))
+                    
                 elif opcao == "0":
                     print("👋 Saindo do analisador...")
                     break
@@ -0,0 +1,111 @@
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.models.pendencia import Anomalia
+from app.services.serie_historica import SerieHistorica
+
+# Fator que torna o MAD comparável ao desvio padrão numa distribuição normal
+_ESCALA_MAD = 1.4826
+
+
+class DetectorAnomalias:
+    """Sinaliza contagens do dia muito fora da mediana recente de cada consulta.
+
+    Para cada consulta, a referência são os últimos ``janela_dias`` dias da série
+    histórica (sem o próprio dia): mediana e desvio absoluto mediano (MAD). O
+    escore robusto ``(valor - mediana) / (1.4826 * MAD)`` é calculado para todas as
+    consultas de uma vez sobre a matriz (consultas × dias). Uma contagem que cai a
+    zero com mediana positiva é sempre sinalizada, pois costuma indicar consulta quebrada;
+    as demais precisam também variar ao menos ``variacao_minima`` (fração da mediana).
+    """
+
+    def __init__(
+        self,
+        serie: SerieHistorica,
+        janela_dias: int = 30,
+        limite: float = 3.5,
+        minimo_dias: int = 7,
+        variacao_minima: float = 0.2
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.serie = serie
+        self.janela_dias = janela_dias
+        self.limite = limite
+        self.minimo_dias = max(1, minimo_dias)
+        self.variacao_minima = variacao_minima
+
+    def detectar(
+        self,
+        dia: date,
+        ids: np.ndarray,
+        quantidades: np.ndarray,
+        nomes: Optional[Dict[int, str]] = None
+    ) -> List[Anomalia]:
+        """Anomalias entre as contagens ``quantidades`` (alinhadas a ``ids``) do dia ``dia``"""
+        if len(ids) == 0:
+            return []
+
+        ids_hist, _, valores = self.serie.matriz(dia - timedelta(days=self.janela_dias), dia - timedelta(days=1))
+        if len(ids_hist) == 0:
+            return []
+
+        # Alinhar as consultas do dia às linhas da matriz (ids_hist vem ordenado)
+        ids = np.asarray(ids, dtype=np.int64)
+        quantidades = np.asarray(quantidades, dtype=np.float64)
+        posicao = np.clip(np.searchsorted(ids_hist, ids), 0, len(ids_hist) - 1)
+        encontrado = ids_hist[posicao] == ids
+
+        historico = valores[posicao[encontrado]]
+        atuais = quantidades[encontrado]
+        ids_validos = ids[encontrado]
+
+        dias = np.count_nonzero(~np.isnan(historico), axis=1)
+        suficiente = dias >= self.minimo_dias
+        if not suficiente.any():
+            return []
+
+        historico, atuais, ids_validos, dias = historico[suficiente], atuais[suficiente], ids_validos[suficiente], dias[suficiente]
+        mediana = np.nanmedian(historico, axis=1)
+        mad = np.nanmedian(np.abs(historico - mediana[:, None]), axis=1)
+
+        # Série constante (MAD = 0): usar 1 unidade como escala mínima para não dividir por zero
+        escala = np.maximum(_ESCALA_MAD * mad, 1.0)
+        escore = (atuais - mediana) / escala
+
+        # Séries muito estáveis têm MAD pequeno: exigir também uma variação relativa mínima
+        relevante = np.abs(atuais - mediana) >= self.variacao_minima * np.maximum(np.abs(mediana), 1.0)
+        zerada = (atuais == 0) & (mediana > 0)
+        anomala = zerada | ((np.abs(escore) >= self.limite) & relevante)
+
+        nomes = nomes or {}
+        anomalias = []
+        for i in np.flatnonzero(anomala):
+            if zerada[i]:
+                tipo = 'zerada'
+            else:
+                tipo = 'aumento' if escore[i] > 0 else 'queda'
+            anomalias.append(Anomalia(
+                id=int(ids_validos[i]),
+                nome_pendencia=nomes.get(int(ids_validos[i])),
+                quantidade=float(atuais[i]),
+                mediana=float(mediana[i]),
+                desvio=float(mad[i]),
+                escore=round(float(escore[i]), 2),
+                tipo=tipo,
+                dias_historico=int(dias[i])
+            ))
+
+        # Mais graves primeiro: zeradas, depois pelo tamanho do escore
+        anomalias.sort(key=lambda a: (a.tipo != 'zerada', -abs(a.escore)))
+        if anomalias:
+            self.logger.warning(f"Anomaly detection: {len(anomalias)} pendências outside their recent range")
+        return anomalias
+
+    def detectar_no_historico(self, dia: date) -> List[Anomalia]:
+        """Anomalias de um dia já gravado na série histórica"""
+        registros = self.serie.carregar(dia, dia)
+        nomes = {int(k): v for k, v in self.serie.nomes().items()}
+        return self.detectar(dia, registros['id'], registros['quantidade'], nomes)
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from app.models.pendencia import Pendencia
+
+NOME_ESTADO_CADENCIAS = "estado_cadencias.json"
+
+CADENCIAS = {
+    'horaria': timedelta(hours=1),
+    'diaria': timedelta(days=1),
+    'semanal': timedelta(weeks=1),
+    'mensal': timedelta(days=30),
+}
+
+_INTERVALO = re.compile(r"^(\d+)\s*([mhd])$")
+_UNIDADES = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+_EPOCA = datetime(1970, 1, 1)
+
+# Serializa as gravações do estado entre os threads do processo; entre processos vale o arquivo .lock
+_LOCK_ESTADO = threading.RLock()
+
+
+def intervalo_cadencia(valor: str) -> timedelta:
+    """Intervalo de uma cadência: nome (horaria, diaria, semanal, mensal) ou ``<n>m``/``<n>h``/``<n>d``"""
+    texto = str(valor).strip().lower()
+    if texto in CADENCIAS:
+        return CADENCIAS[texto]
+    match = _INTERVALO.match(texto)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid refresh cadence '{valor}' (use {', '.join(CADENCIAS)} or e.g. 30m, 4h, 2d)")
+    return timedelta(**{_UNIDADES[match.group(2)]: int(match.group(1))})
+
+
+class PlanoCadencias:
+    """Cadência de atualização de cada consulta: por id_pendencia, senão por id_grupo, senão a padrão.
+
+    O tempo é dividido em janelas do tamanho da cadência; uma consulta está vencida
+    quando sua última atualização é anterior ao início da janela atual. Com
+    ``espalhar``, cada consulta tem um deslocamento fixo (hash do id) dentro da
+    janela, para que as consultas diárias, por exemplo, não vençam todas no mesmo minuto.
+    """
+
+    def __init__(
+        self,
+        padrao: str = 'diaria',
+        por_grupo: Optional[Dict[int, str]] = None,
+        por_pendencia: Optional[Dict[int, str]] = None,
+        espalhar: bool = True
+    ):
+        self.padrao = intervalo_cadencia(padrao)
+        self.por_grupo = {int(k): intervalo_cadencia(v) for k, v in (por_grupo or {}).items()}
+        self.por_pendencia = {int(k): intervalo_cadencia(v) for k, v in (por_pendencia or {}).items()}
+        self.espalhar = espalhar
+
+    @classmethod
+    def carregar(cls, caminho: Path, padrao: str = 'diaria', espalhar: bool = True) -> 'PlanoCadencias':
+        """Lê ``{"padrao": ..., "grupos": {id_grupo: cadência}, "pendencias": {id_pendencia: cadência}}``"""
+        caminho = Path(caminho)
+        if not caminho.exists():
+            logging.getLogger(__name__).info(f"No cadence file at {caminho} - every query uses '{padrao}'")
+            return cls(padrao=padrao, espalhar=espalhar)
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        return cls(
+            padrao=dados.get('padrao', padrao),
+            por_grupo=dados.get('grupos'),
+            por_pendencia=dados.get('pendencias'),
+            espalhar=espalhar
+        )
+
+    def cadencia(self, pendencia: Pendencia) -> timedelta:
+        if pendencia.id_pendencia in self.por_pendencia:
+            return self.por_pendencia[pendencia.id_pendencia]
+        if pendencia.id_grupo in self.por_grupo:
+            return self.por_grupo[pendencia.id_grupo]
+        return self.padrao
+
+    def inicio_janela(self, pendencia: Pendencia, agora: datetime) -> datetime:
+        """Início da janela de atualização que contém ``agora``"""
+        intervalo = int(self.cadencia(pendencia).total_seconds())
+        deslocamento = zlib.crc32(str(pendencia.id).encode()) % intervalo if self.espalhar else 0
+        decorrido = int((agora - _EPOCA).total_seconds()) - deslocamento
+        return _EPOCA + timedelta(seconds=decorrido - decorrido % intervalo + deslocamento)
+
+    def vencidas(self, pendencias: Iterable[Pendencia], estado: 'EstadoCadencias', agora: datetime) -> List[Pendencia]:
+        devidas = []
+        for pendencia in pendencias:
+            ultima = estado.ultima(pendencia.id)
+            if ultima is None or ultima < self.inicio_janela(pendencia, agora):
+                devidas.append(pendencia)
+        return devidas
+
+
+class EstadoCadencias:
+    """Momento da última atualização bem-sucedida de cada consulta (id), em um arquivo JSON local.
+
+    Workers e nós que compartilham o ``output_dir`` gravam o mesmo arquivo: ``salvar``
+    relê o arquivo sob trava e mescla por id (vale o momento mais recente), em vez
+    de sobrescrever as atualizações dos outros com a cópia carregada na criação.
+    """
+
+    # Espera máxima pela trava do arquivo e idade a partir da qual ela é considerada órfã
+    ESPERA_TRAVA = 10.0
+    TRAVA_ORFA = 30.0
+
+    def __init__(self, caminho: Path):
+        self.logger = logging.getLogger(__name__)
+        self.caminho = Path(caminho)
+        self.caminho_trava = self.caminho.with_name(f".{self.caminho.name}.lock")
+        self._ultimas: Dict[int, datetime] = self._ler()
+
+    def _ler(self) -> Dict[int, datetime]:
+        if not self.caminho.exists():
+            return {}
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                return {int(k): datetime.fromisoformat(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            # Estado ilegível: tudo fica vencido e é atualizado no próximo ciclo
+            self.logger.warning(f"Could not read cadence state {self.caminho.name}: {e}")
+            return {}
+
+    def ultima(self, id_consulta: int) -> Optional[datetime]:
+        return self._ultimas.get(id_consulta)
+
+    def registrar(self, ids: Iterable[int], momento: datetime) -> None:
+        with _LOCK_ESTADO:
+            for id_consulta in ids:
+                anterior = self._ultimas.get(id_consulta)
+                if anterior is None or momento > anterior:
+                    self._ultimas[id_consulta] = momento
+            self.salvar()
+
+    def salvar(self) -> None:
+        with _LOCK_ESTADO, self._trava_arquivo():
+            for id_consulta, momento in self._ler().items():
+                atual = self._ultimas.get(id_consulta)
+                if atual is None or momento > atual:
+                    self._ultimas[id_consulta] = momento
+            # Temporário por processo/thread: nós que compartilham o diretório não colidem
+            temporario = self.caminho.with_name(f".{self.caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({str(k): v.isoformat() for k, v in self._ultimas.items()}, f)
+            os.replace(temporario, self.caminho)
+
+    @contextmanager
+    def _trava_arquivo(self):
+        """Trava entre processos: arquivo criado com O_EXCL, removido ao final"""
+        limite = time.monotonic() + self.ESPERA_TRAVA
+        obtida = False
+        while True:
+            try:
+                os.close(os.open(str(self.caminho_trava), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                obtida = True
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(self.caminho_trava).st_mtime > self.TRAVA_ORFA:
+                        # Processo que caiu durante a gravação
+                        os.remove(self.caminho_trava)
+                        continue
+                except FileNotFoundError:
+                    continue
+            if time.monotonic() >= limite:
+                self.logger.warning(f"Timed out waiting for {self.caminho_trava.name} - saving cadence state without it")
+                break
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if obtida:
+                try:
+                    os.remove(self.caminho_trava)
+                except FileNotFoundError:
+                    pass
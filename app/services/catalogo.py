@@ -0,0 +1,157 @@
+import logging
+import re
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.formato_resultados import carregar_resultados, eh_arquivo_resultados
+
+NOME_CATALOGO = "catalogo_execucoes.db"
+PADRAO_ARQUIVO = "resultados_execucao_pendencias_*"
+_NOME_ARQUIVO = re.compile(r"resultados_execucao_pendencias_(\d{8})_(\d{6})")
+
+
+class CatalogoExecucoes:
+    """Índice (SQLite) dos arquivos de resultado gravados em output/.
+
+    Cada execução salva registra data, horário, arquivo e totais do resumo;
+    localizar a execução de um dia vira uma consulta indexada em vez de uma
+    varredura do diretório. ``reconstruir`` refaz o índice a partir dos arquivos.
+    """
+
+    CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS execucoes (
+        arquivo TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        momento TEXT NOT NULL,
+        total_consultas INTEGER,
+        consultas_executadas INTEGER,
+        consultas_com_erro INTEGER,
+        total_pendencias INTEGER,
+        taxa_sucesso REAL,
+        duracao_segundos REAL,
+        parcial INTEGER NOT NULL DEFAULT 0
+    )
+    """
+
+    CREATE_INDEX = "CREATE INDEX IF NOT EXISTS ix_execucoes_data ON execucoes (data, momento)"
+
+    INSERT = """
+    INSERT OR REPLACE INTO execucoes
+    (arquivo, data, momento, total_consultas, consultas_executadas, consultas_com_erro,
+     total_pendencias, taxa_sucesso, duracao_segundos, parcial)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    def __init__(self, caminho: Path):
+        self.logger = logging.getLogger(__name__)
+        self.caminho = Path(caminho)
+        with closing(self._conectar()) as conn, conn:
+            conn.execute(self.CREATE_TABLE)
+            conn.execute(self.CREATE_INDEX)
+            colunas = {linha['name'] for linha in conn.execute("PRAGMA table_info(execucoes)")}
+            if 'parcial' not in colunas:
+                # Catálogos criados antes das execuções parciais (por grupo ou por cadência)
+                conn.execute("ALTER TABLE execucoes ADD COLUMN parcial INTEGER NOT NULL DEFAULT 0")
+
+    @property
+    def diretorio(self) -> Path:
+        # Os arquivos são registrados pelo nome, relativos ao diretório do catálogo
+        return self.caminho.parent
+
+    def _conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.caminho), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _momento_do_arquivo(caminho: Path) -> Optional[datetime]:
+        match = _NOME_ARQUIVO.search(caminho.name)
+        if not match:
+            return None
+        try:
+            return datetime.strptime(match.group(1) + match.group(2), "%Y%m%d%H%M%S")
+        except ValueError:
+            return None
+
+    def _parametros(self, caminho: Path, dados: Dict[str, Any], momento: Optional[datetime]) -> tuple:
+        caminho = Path(caminho)
+        momento = momento or self._momento_do_arquivo(caminho) or datetime.now()
+        return (
+            caminho.name,
+            momento.strftime('%Y-%m-%d'),
+            momento.strftime('%Y-%m-%d %H:%M:%S'),
+            dados.get('total_consultas'),
+            dados.get('consultas_executadas'),
+            dados.get('consultas_com_erro'),
+            dados.get('total_pendencias_encontradas'),
+            dados.get('taxa_sucesso'),
+            dados.get('duracao_total_segundos'),
+            int(bool(dados.get('execucao_parcial') or dados.get('grupos_executados')))
+        )
+
+    def registrar(self, caminho: Path, dados: Dict[str, Any], momento: Optional[datetime] = None) -> None:
+        """Registra (ou atualiza) um arquivo de resultados com os totais do seu resumo"""
+        with closing(self._conectar()) as conn, conn:
+            conn.execute(self.INSERT, self._parametros(caminho, dados, momento))
+
+    def remover(self, caminho: Path) -> None:
+        with closing(self._conectar()) as conn, conn:
+            conn.execute("DELETE FROM execucoes WHERE arquivo = ?", (Path(caminho).name,))
+
+    def vazio(self) -> bool:
+        with closing(self._conectar()) as conn:
+            return conn.execute("SELECT 1 FROM execucoes LIMIT 1").fetchone() is None
+
+    def buscar_mais_recente(self, data: datetime) -> Optional[Path]:
+        """Arquivo da última execução completa do dia (ou da última parcial, se não houver completa).
+
+        Entradas cujo arquivo sumiu são descartadas.
+        """
+        with closing(self._conectar()) as conn:
+            linhas = conn.execute(
+                "SELECT arquivo FROM execucoes WHERE data = ? ORDER BY parcial, momento DESC",
+                (data.strftime('%Y-%m-%d'),)
+            ).fetchall()
+
+        for linha in linhas:
+            caminho = self.diretorio / linha['arquivo']
+            if caminho.exists():
+                return caminho
+            self.logger.warning(f"Catalogued result file no longer exists, removing: {caminho}")
+            self.remover(caminho)
+        return None
+
+    def listar(self) -> List[sqlite3.Row]:
+        with closing(self._conectar()) as conn:
+            return conn.execute("SELECT * FROM execucoes ORDER BY momento").fetchall()
+
+    def arquivos(self) -> List[Tuple[date, Path]]:
+        """(data, caminho) de cada execução catalogada, em ordem cronológica"""
+        return [
+            (datetime.strptime(linha['data'], '%Y-%m-%d').date(), self.diretorio / linha['arquivo'])
+            for linha in self.listar()
+        ]
+
+    def reconstruir(self) -> int:
+        """Refaz o catálogo lendo os arquivos de resultado existentes no diretório"""
+        registros = []
+        for caminho in self.diretorio.glob(PADRAO_ARQUIVO):
+            if not eh_arquivo_resultados(caminho):
+                continue
+            try:
+                dados = carregar_resultados(caminho)
+            except Exception as e:
+                self.logger.warning(f"Skipping unreadable result file {caminho.name}: {e}")
+                continue
+            momento = self._momento_do_arquivo(caminho) or datetime.fromtimestamp(caminho.stat().st_mtime)
+            registros.append(self._parametros(caminho, dados, momento))
+
+        with closing(self._conectar()) as conn, conn:
+            conn.execute("DELETE FROM execucoes")
+            conn.executemany(self.INSERT, registros)
+
+        self.logger.info(f"Run catalog rebuilt: {len(registros)} result files indexed")
+        return len(registros)
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+from dataclasses import fields
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+from app.models.pendencia import ResultadoExecucao
+
+
+class CheckpointExecucao:
+    """Registro incremental (JSON Lines) das pendências concluídas na execução em andamento.
+
+    A primeira linha identifica o dia da execução; cada linha seguinte é um
+    ResultadoExecucao. Se o processo cair, a próxima execução do mesmo dia
+    retoma a partir das pendências que ainda não estão no arquivo.
+    """
+
+    # A referência à Pendencia (com o SQL completo) não é gravada; é religada na retomada
+    _CAMPOS = tuple(f.name for f in fields(ResultadoExecucao) if f.name != 'pendencia')
+
+    def __init__(self, caminho: Path):
+        self.logger = logging.getLogger(__name__)
+        self.caminho = Path(caminho)
+        self._arquivo = None
+
+    def iniciar(self, retomar: bool = True) -> Dict[int, ResultadoExecucao]:
+        """Abre o checkpoint e devolve os resultados já concluídos hoje (quando retomando)"""
+        concluidos = self._carregar() if retomar else {}
+        hoje = datetime.now().strftime('%Y-%m-%d')
+
+        if concluidos:
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        else:
+            self._arquivo = open(self.caminho, 'w', encoding='utf-8')
+            self._escrever({'tipo': 'inicio', 'data': hoje, 'iniciado_em': datetime.now().isoformat()})
+
+        return concluidos
+
+    def _carregar(self) -> Dict[int, ResultadoExecucao]:
+        if not self.caminho.exists():
+            return {}
+
+        concluidos: Dict[int, ResultadoExecucao] = {}
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                cabecalho = json.loads(f.readline() or '{}')
+                if cabecalho.get('data') != datetime.now().strftime('%Y-%m-%d'):
+                    self.logger.info(f"Discarding checkpoint from {cabecalho.get('data')}")
+                    return {}
+
+                for linha in f:
+                    try:
+                        dados = json.loads(linha)
+                    except json.JSONDecodeError:
+                        # Última linha truncada por uma queda no meio da escrita
+                        continue
+                    if dados.pop('tipo', None) != 'resultado':
+                        continue
+                    resultado = ResultadoExecucao(**{k: v for k, v in dados.items() if k in self._CAMPOS})
+                    concluidos[resultado.id] = resultado
+        except Exception as e:
+            self.logger.warning(f"Could not read checkpoint {self.caminho}: {e}")
+            return {}
+
+        if concluidos:
+            self.logger.info(f"Checkpoint found: {len(concluidos)} pendências already completed today")
+        return concluidos
+
+    def _escrever(self, dados: dict) -> None:
+        self._arquivo.write(json.dumps(dados, ensure_ascii=False, default=str) + '\n')
+        self._arquivo.flush()
+
+    def registrar(self, resultado: ResultadoExecucao) -> None:
+        if self._arquivo is None:
+            return
+        try:
+            self._escrever({'tipo': 'resultado', **{campo: getattr(resultado, campo) for campo in self._CAMPOS}})
+        except Exception as e:
+            self.logger.error(f"Error writing checkpoint for pendência {resultado.id}: {e}")
+
+    def fechar(self) -> None:
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def concluir(self) -> None:
+        """Execução completa: o checkpoint não é mais necessário"""
+        self.fechar()
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"Could not remove checkpoint {self.caminho}: {e}")
+
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+from app.models.pendencia import Pendencia
+
+
+class _EstadoConsulta:
+    __slots__ = ('duracoes', 'falhas_consecutivas', 'timeouts_consecutivos', 'aberto_ate')
+
+    def __init__(self, janela: int):
+        self.duracoes: Deque[float] = deque(maxlen=janela)
+        self.falhas_consecutivas = 0
+        self.timeouts_consecutivos = 0
+        # Horário (epoch) até o qual a consulta fica suspensa; relógio de parede para sobreviver ao reinício
+        self.aberto_ate = 0.0
+
+
+class CircuitBreaker:
+    """Acompanha duração e falhas recentes por id_pendencia.
+
+    Consultas que estouram o timeout ``limite_timeouts`` vezes seguidas ficam
+    suspensas por ``pausa`` segundos; depois disso uma nova tentativa é liberada
+    (meio-aberto) e um novo timeout reabre o circuito. Consultas com falhas
+    recentes são movidas para o fim da fila de execução.
+
+    Com ``caminho``, o estado é carregado na criação e gravado por ``salvar`` ao
+    fim de cada execução: numa rotina noturna, timeouts em noites seguidas
+    continuam contando e a suspensão sobrevive ao reinício do processo.
+    """
+
+    def __init__(self, limite_timeouts: int = 3, pausa: float = 3600, janela: int = 10, caminho: Optional[Path] = None):
+        self.logger = logging.getLogger(__name__)
+        self.limite_timeouts = max(1, limite_timeouts)
+        self.pausa = pausa
+        self.janela = janela
+        self.caminho = Path(caminho) if caminho is not None else None
+        self._estados: Dict[int, _EstadoConsulta] = {}
+        self._lock = threading.Lock()
+        self._carregar()
+
+    def _carregar(self) -> None:
+        if self.caminho is None or not self.caminho.exists():
+            return
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            for chave, valores in dados.get('consultas', {}).items():
+                estado = _EstadoConsulta(self.janela)
+                estado.duracoes.extend(float(d) for d in valores.get('duracoes', []))
+                estado.falhas_consecutivas = int(valores.get('falhas_consecutivas', 0))
+                estado.timeouts_consecutivos = int(valores.get('timeouts_consecutivos', 0))
+                estado.aberto_ate = float(valores.get('aberto_ate', 0.0))
+                self._estados[int(chave)] = estado
+            abertos = sum(1 for e in self._estados.values() if e.aberto_ate > time.time())
+            self.logger.info(f"Loaded circuit breaker state for {len(self._estados)} queries ({abertos} open)")
+        except Exception as e:
+            self.logger.warning(f"Could not read circuit breaker state {self.caminho}: {e}")
+            self._estados = {}
+
+    def salvar(self) -> None:
+        """Persiste o estado (sem efeito quando o breaker não tem ``caminho``)"""
+        if self.caminho is None:
+            return
+        with self._lock:
+            dados = {
+                str(id_pendencia): {
+                    'duracoes': [round(d, 4) for d in estado.duracoes],
+                    'falhas_consecutivas': estado.falhas_consecutivas,
+                    'timeouts_consecutivos': estado.timeouts_consecutivos,
+                    'aberto_ate': estado.aberto_ate,
+                }
+                for id_pendencia, estado in self._estados.items()
+            }
+        try:
+            temporario = self.caminho.with_suffix(self.caminho.suffix + '.tmp')
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({'consultas': dados}, f)
+            os.replace(temporario, self.caminho)
+        except Exception as e:
+            self.logger.error(f"Error saving circuit breaker state: {e}")
+
+    def _estado(self, id_pendencia: int) -> _EstadoConsulta:
+        estado = self._estados.get(id_pendencia)
+        if estado is None:
+            estado = self._estados[id_pendencia] = _EstadoConsulta(self.janela)
+        return estado
+
+    def permitir(self, id_pendencia: int) -> bool:
+        with self._lock:
+            estado = self._estados.get(id_pendencia)
+            return estado is None or time.time() >= estado.aberto_ate
+
+    def motivo_bloqueio(self, id_pendencia: int) -> Optional[str]:
+        with self._lock:
+            estado = self._estados.get(id_pendencia)
+            if estado is None:
+                return None
+            restante = estado.aberto_ate - time.time()
+            if restante <= 0:
+                return None
+            return (
+                f"Circuit open after {estado.timeouts_consecutivos} consecutive timeouts - "
+                f"retrying in {restante / 60:.0f} min"
+            )
+
+    def registrar_sucesso(self, id_pendencia: int, duracao: float) -> None:
+        with self._lock:
+            estado = self._estado(id_pendencia)
+            estado.duracoes.append(duracao)
+            estado.falhas_consecutivas = 0
+            estado.timeouts_consecutivos = 0
+            estado.aberto_ate = 0.0
+
+    def registrar_falha(self, id_pendencia: int, duracao: float, timeout: bool = False) -> None:
+        with self._lock:
+            estado = self._estado(id_pendencia)
+            estado.duracoes.append(duracao)
+            estado.falhas_consecutivas += 1
+            if not timeout:
+                return
+
+            estado.timeouts_consecutivos += 1
+            if estado.timeouts_consecutivos >= self.limite_timeouts:
+                estado.aberto_ate = time.time() + self.pausa
+                self.logger.warning(
+                    f"Circuit opened for pendência {id_pendencia}: {estado.timeouts_consecutivos} "
+                    f"consecutive timeouts - skipping for {self.pausa:.0f}s"
+                )
+
+    def duracao_media(self, id_pendencia: int) -> Optional[float]:
+        with self._lock:
+            estado = self._estados.get(id_pendencia)
+            if estado is None or not estado.duracoes:
+                return None
+            return sum(estado.duracoes) / len(estado.duracoes)
+
+    def ordenar(self, pendencias: List[Pendencia]) -> List[Pendencia]:
+        """Move para o fim (ordem estável) as pendências com falhas recentes"""
+        with self._lock:
+            falhas = {id_p for id_p, e in self._estados.items() if e.falhas_consecutivas > 0}
+        if not falhas:
+            return pendencias
+        return sorted(pendencias, key=lambda p: p.id_pendencia in falhas)
@@ -0,0 +1,159 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.resumo import indices_maiores
+
+
+@dataclass
+class ResultadoComparacao:
+    consulta_id: int
+    nome_pendencia: str
+    contagem_anterior: int
+    contagem_atual: int
+    diferenca: int
+    percentual_reducao: float
+    valor_monetario_anterior: Optional[Decimal] = None
+    valor_monetario_atual: Optional[Decimal] = None
+    diferenca_monetaria: Optional[Decimal] = None
+    eh_monetario: bool = False
+
+
+@dataclass
+class ResumoComparacao:
+    """O que o relatório comparativo exibe: totais e as maiores reduções já materializadas"""
+    total_consultas: int
+    total_reducoes: int
+    total_aumentos: int
+    total_inalteradas: int
+    economia_monetaria: Decimal
+    top_reducoes: List[ResultadoComparacao] = field(default_factory=list)
+    top_reducoes_percentuais: List[ResultadoComparacao] = field(default_factory=list)
+    fonte: str = 'arquivos'
+
+
+def _numero(valor: float):
+    # Contagens inteiras voltam como int, como no JSON de origem
+    valor = float(valor)
+    return int(valor) if valor.is_integer() else valor
+
+
+def _frame_resultados(resultados: Dict[str, dict]) -> pd.DataFrame:
+    """Colunas id, nome_pendencia, contagem e exibe_contagem de um ``resultados`` salvo"""
+    if isinstance(resultados, list):
+        resultados = {str(r['id']): r for r in resultados}
+    df = pd.DataFrame.from_dict(resultados, orient='index')
+    if df.empty:
+        return pd.DataFrame(columns=['id', 'nome_pendencia', 'contagem', 'exibe_contagem'])
+
+    # Compatibilidade com formatos antigos (quantidade) e novos (total_registros)
+    contagem = df['total_registros'] if 'total_registros' in df else pd.Series(np.nan, index=df.index)
+    if 'quantidade' in df:
+        contagem = contagem.fillna(df['quantidade'])
+
+    return pd.DataFrame({
+        # A chave do dicionário é o id da consulta (como no alinhamento original por chave)
+        'id': pd.to_numeric(df.index.to_series(), errors='coerce'),
+        'nome_pendencia': df['nome_pendencia'] if 'nome_pendencia' in df else None,
+        'contagem': pd.to_numeric(contagem, errors='coerce'),
+        'exibe_contagem': df['exibe_contagem'] if 'exibe_contagem' in df else None,
+    }, index=df.index)
+
+
+class TabelaComparacao:
+    """Comparação de duas execuções alinhadas por id, em colunas NumPy.
+
+    Diferenças, percentuais, contagens e top-K são calculados sobre os arrays;
+    ``ResultadoComparacao`` só é criado para as linhas pedidas em ``materializar``.
+    Consultas sem contagem em alguma das execuções (ex.: erro) ficam de fora.
+    """
+
+    def __init__(self, resultados_anterior: Dict[str, dict], resultados_atual: Dict[str, dict]):
+        anterior = _frame_resultados(resultados_anterior)
+        atual = _frame_resultados(resultados_atual)
+
+        # Inner join mantendo a ordem das consultas da execução atual
+        unido = atual.merge(
+            anterior[['id', 'contagem']], on='id', how='inner', suffixes=('_atual', '_anterior')
+        ).dropna(subset=['id', 'contagem_atual', 'contagem_anterior'])
+
+        self.ids = unido['id'].to_numpy(dtype=np.int64)
+        self.nomes = unido['nome_pendencia'].fillna('N/A').to_numpy(dtype=object)
+        # float64: contagens monetárias (exibe_contagem = 2) podem ter centavos
+        self.contagem_anterior = unido['contagem_anterior'].to_numpy(dtype=np.float64)
+        self.contagem_atual = unido['contagem_atual'].to_numpy(dtype=np.float64)
+        self.eh_monetario = (unido['exibe_contagem'] == 2).to_numpy(dtype=bool)
+
+        self.diferenca = self.contagem_anterior - self.contagem_atual
+        self.percentual_reducao = np.divide(
+            self.diferenca * 100.0, self.contagem_anterior,
+            out=np.zeros(len(self.diferenca)), where=self.contagem_anterior > 0
+        )
+
+        self.mascara_reducao = self.diferenca > 0
+        self.total_reducoes = int(self.mascara_reducao.sum())
+        self.total_aumentos = int((self.diferenca < 0).sum())
+        self.total_inalteradas = len(self) - self.total_reducoes - self.total_aumentos
+        self.economia_monetaria = sum(
+            (Decimal(str(_numero(v))) for v in self.diferenca[self.mascara_reducao & self.eh_monetario]), Decimal(0)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def top_reducoes(self, limite: int = 10) -> np.ndarray:
+        return indices_maiores(self.diferenca, self.mascara_reducao, limite)
+
+    def top_reducoes_percentuais(self, limite: int = 10) -> np.ndarray:
+        return indices_maiores(self.percentual_reducao, self.mascara_reducao & (self.contagem_anterior > 0), limite)
+
+    def resumir(self, limite: int = 10) -> ResumoComparacao:
+        return ResumoComparacao(
+            total_consultas=len(self),
+            total_reducoes=self.total_reducoes,
+            total_aumentos=self.total_aumentos,
+            total_inalteradas=self.total_inalteradas,
+            economia_monetaria=self.economia_monetaria,
+            top_reducoes=self.materializar(self.top_reducoes(limite)),
+            top_reducoes_percentuais=self.materializar(self.top_reducoes_percentuais(limite))
+        )
+
+    def materializar(self, indices=None) -> List[ResultadoComparacao]:
+        """ResultadoComparacao das linhas indicadas (todas, se ``indices`` for None)"""
+        if indices is None:
+            indices = range(len(self))
+        return [
+            criar_resultado_comparacao(
+                int(self.ids[i]), self.nomes[i], self.contagem_anterior[i], self.contagem_atual[i],
+                float(self.percentual_reducao[i]), bool(self.eh_monetario[i])
+            )
+            for i in indices
+        ]
+
+
+def criar_resultado_comparacao(
+    consulta_id: int,
+    nome_pendencia: str,
+    contagem_anterior: float,
+    contagem_atual: float,
+    percentual_reducao: float,
+    eh_monetario: bool
+) -> ResultadoComparacao:
+    resultado = ResultadoComparacao(
+        consulta_id=consulta_id,
+        nome_pendencia=nome_pendencia,
+        contagem_anterior=_numero(contagem_anterior),
+        contagem_atual=_numero(contagem_atual),
+        diferenca=_numero(float(contagem_anterior) - float(contagem_atual)),
+        percentual_reducao=percentual_reducao,
+        eh_monetario=eh_monetario
+    )
+    # Se for monetário, tratar como valores em reais
+    if eh_monetario:
+        resultado.valor_monetario_anterior = Decimal(str(resultado.contagem_anterior))
+        resultado.valor_monetario_atual = Decimal(str(resultado.contagem_atual))
+        resultado.diferenca_monetaria = Decimal(str(resultado.diferenca))
+    return resultado
@@ -0,0 +1,197 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+class PoolTimeoutError(Exception):
+    """Nenhuma conexão ficou disponível dentro do tempo de espera"""
+
+
+class ConnectionPool:
+    """Pool de conexões reutilizáveis com limite de tamanho e expiração por inatividade"""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 8,
+        idle_timeout: float = 300,
+        health_check: bool = True,
+        acquire_timeout: Optional[float] = 30,
+        health_check_query: str = "SELECT 1"
+    ):
+        self.logger = logging.getLogger(__name__)
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.acquire_timeout = acquire_timeout
+        self.health_check_query = health_check_query
+
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._cond = threading.Condition()
+        self._size = 0  # conexões abertas (ociosas + emprestadas)
+
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    def _purge_expired(self) -> list:
+        """Remove conexões ociosas expiradas; deve ser chamado com o lock adquirido"""
+        expired = []
+        if self.idle_timeout and self.idle_timeout > 0:
+            limite = time.monotonic() - self.idle_timeout
+            # As mais antigas ficam à esquerda (reuso LIFO pela direita)
+            while self._idle and self._idle[0][1] < limite:
+                expired.append(self._idle.popleft()[0])
+                self._size -= 1
+        return expired
+
+    def _close_quietly(self, connection) -> None:
+        try:
+            connection.close()
+        except Exception as e:
+            self.logger.debug(f"Error closing pooled connection: {e}")
+
+    def _is_healthy(self, connection) -> bool:
+        try:
+            cursor = connection.cursor()
+            cursor.execute(self.health_check_query)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            self.logger.warning(f"Pooled connection failed health check: {e}")
+            return False
+
+    def acquire(self):
+        deadline = None if self.acquire_timeout is None else time.monotonic() + self.acquire_timeout
+
+        while True:
+            candidate = None
+            expired = []
+            try:
+                with self._cond:
+                    while True:
+                        expired.extend(self._purge_expired())
+                        if self._idle:
+                            candidate = self._idle.pop()[0]
+                            break
+                        if self._size < self.max_size:
+                            self._size += 1
+                            break
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise PoolTimeoutError(f"No connection available after {self.acquire_timeout}s (max_size={self.max_size})")
+                        self._cond.wait(remaining)
+            finally:
+                for connection in expired:
+                    self.logger.debug("Closing idle-expired pooled connection")
+                    self._close_quietly(connection)
+
+            if candidate is None:
+                break
+
+            if not self.health_check or self._is_healthy(candidate):
+                with self._cond:
+                    self.hits += 1
+                self.logger.debug("Connection pool hit")
+                return candidate
+
+            # Conexão ruim: descartar e tentar a próxima ociosa (ou abrir uma nova)
+            self._discard(candidate)
+
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.misses += 1
+        self.logger.debug("Connection pool miss - opened new connection")
+        return connection
+
+    def _discard(self, connection) -> None:
+        self._close_quietly(connection)
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
+
+    def release(self, connection, discard: bool = False) -> None:
+        if not discard:
+            try:
+                # Não devolver ao pool uma transação aberta
+                connection.rollback()
+            except Exception as e:
+                self.logger.warning(f"Discarding pooled connection after failed rollback: {e}")
+                discard = True
+
+        if discard:
+            self._discard(connection)
+            return
+
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        discard = False
+        try:
+            yield connection
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            self.release(connection, discard=discard)
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle = [c for c, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        for connection in idle:
+            self._close_quietly(connection)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'discarded': self.discarded,
+                'hit_rate': (self.hits / total * 100) if total else 0.0,
+                'open': self._size,
+                'idle': len(self._idle),
+                'max_size': self.max_size
+            }
+
+    def log_stats(self) -> None:
+        s = self.stats()
+        self.logger.info(
+            f"Connection pool stats - hits: {s['hits']}, misses: {s['misses']}, "
+            f"hit rate: {s['hit_rate']:.1f}%, discarded: {s['discarded']}, "
+            f"open: {s['open']}/{s['max_size']} (idle: {s['idle']})"
+        )
+
+
+_shared_pool: Optional[ConnectionPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_pool(connect: Callable[[], Any], **kwargs) -> ConnectionPool:
+    """Retorna o pool compartilhado pelo processo, criando-o na primeira chamada"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ConnectionPool(connect, **kwargs)
+            atexit.register(_shared_pool.close_all)
+        return _shared_pool
@@ -1,10 +1,13 @@
 
 import pyodbc
+import numpy as np
 import pandas as pd
 import logging
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Iterator, Sequence, Tuple, Union
 from contextlib import contextmanager
 
+from app.services.connection_pool import ConnectionPool, get_shared_pool
+
 # Import com fallback
 try:
     from config.settings import DATABASE_CONFIG
@@ -17,14 +20,26 @@ except ImportError:
         'password': os.getenv('DB_PASSWORD'),
         'driver': os.getenv('DB_DRIVER', '{ODBC Driver 18 for SQL Server}'),
         'port': int(os.getenv('DB_PORT', '1433')),
-        'timeout': int(os.getenv('DB_TIMEOUT', '30'))
+        'timeout': int(os.getenv('DB_TIMEOUT', '30')),
+        'fetch_batch_size': int(os.getenv('DB_FETCH_BATCH_SIZE', '500'))
     }
 
 
 class DatabaseService:
-    def __init__(self):
+    def __init__(self, pool: Optional[ConnectionPool] = None):
         self.logger = logging.getLogger(__name__)
         self._connection = None
+        
+        # Por padrão todas as instâncias compartilham o mesmo pool do processo
+        if pool is None and DATABASE_CONFIG.get('pool_enabled', True):
+            pool = get_shared_pool(
+                self._connect,
+                max_size=DATABASE_CONFIG.get('pool_max_size', 8),
+                idle_timeout=DATABASE_CONFIG.get('pool_idle_timeout', 300),
+                health_check=DATABASE_CONFIG.get('pool_health_check', True),
+                acquire_timeout=DATABASE_CONFIG.get('timeout', 30)
+            )
+        self.pool = pool
     
     def _get_connection_string(self) -> str:
         return (
@@ -36,13 +51,36 @@ class DatabaseService:
             f"Encrypt=yes;TrustServerCertificate=no;Connection Timeout={DATABASE_CONFIG['timeout']};"
         )
     
+    def _connect(self):
+        self.logger.info("Connecting to database...")
+        connection = pyodbc.connect(self._get_connection_string())
+        self.logger.info("Database connection established successfully")
+        return connection
+    
+    def limitar_ao_pool(self, conexoes: int, origem: str = 'MAX_WORKERS') -> int:
+        """Conexões simultâneas que o pool consegue atender (acima disso os workers esgotariam o acquire_timeout)"""
+        if self.pool is None or conexoes <= self.pool.max_size:
+            return conexoes
+        self.logger.warning(
+            f"{origem}={conexoes} exceeds DB_POOL_MAX_SIZE={self.pool.max_size} - "
+            f"limiting to {self.pool.max_size} concurrent connections"
+        )
+        return self.pool.max_size
+    
+    def new_connection(self):
+        """Conexão fora do pool, para quem precisa mantê-la aberta por toda a execução (ex.: trava)"""
+        return self._connect()
+    
     @contextmanager
     def get_connection(self):
+        if self.pool is not None:
+            with self._get_pooled_connection() as connection:
+                yield connection
+            return
+        
         connection = None
         try:
-            self.logger.info("Connecting to database...")
-            connection = pyodbc.connect(self._get_connection_string())
-            self.logger.info("Database connection established successfully")
+            connection = self._connect()
             yield connection
         except Exception as e:
             self.logger.error(f"Database connection error: {e}")
@@ -52,6 +90,30 @@ class DatabaseService:
                 connection.close()
                 self.logger.info("Database connection closed")
     
+    @contextmanager
+    def _get_pooled_connection(self):
+        connection = None
+        discard = False
+        try:
+            connection = self.pool.acquire()
+            yield connection
+        except BaseException as e:
+            # Conexão em estado desconhecido: não devolver ao pool
+            discard = True
+            if isinstance(e, Exception):
+                self.logger.error(f"Database connection error: {e}")
+            raise
+        finally:
+            if connection is not None:
+                self.pool.release(connection, discard=discard)
+    
+    def pool_stats(self) -> Optional[Dict[str, Any]]:
+        return self.pool.stats() if self.pool is not None else None
+    
+    def log_pool_stats(self) -> None:
+        if self.pool is not None:
+            self.pool.log_stats()
+    
     def test_connection(self) -> bool:
         try:
             with self.get_connection() as conn:
@@ -87,12 +149,170 @@ class DatabaseService:
             self.logger.error(f"Error executing query: {e}")
             return None
     
-    def execute_query_to_dataframe(self, query: str) -> Optional[pd.DataFrame]:
+    def _iter_batches(
+        self,
+        query: str,
+        params: Optional[Sequence[Any]] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[Tuple[List[str], List[Any]]]:
+        """Entrega (colunas, lote de linhas) a cada ``fetchmany``"""
+        batch_size = batch_size or DATABASE_CONFIG.get('fetch_batch_size', 500)
+        total = 0
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                columns = [column[0] for column in cursor.description]
+                
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    total += len(rows)
+                    yield columns, rows
+            except GeneratorExit:
+                # Consumidor parou antes do fim: descartar o restante e devolver a conexão
+                self.logger.debug(f"Query iteration closed early after {total} records")
+                return
+            finally:
+                cursor.close()
+        
+        self.logger.info(f"Query streamed successfully. {total} records read in batches of {batch_size}")
+    
+    def iter_query(
+        self,
+        query: str,
+        params: Optional[Sequence[Any]] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[Any]:
+        """Executa a consulta e entrega as linhas (pyodbc.Row) em lotes de ``fetchmany``.
+        
+        A conexão fica emprestada enquanto o iterador é consumido. Diferente de
+        ``execute_query``, erros são propagados para quem consome.
+        """
+        for _, rows in self._iter_batches(query, params, batch_size):
+            yield from rows
+    
+    def execute_query_to_dataframe(
+        self,
+        query: str,
+        chunksize: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None,
+        downcast: bool = False,
+        categorias: Optional[Sequence[str]] = None,
+        params: Optional[Sequence[Any]] = None
+    ) -> Optional[Union[pd.DataFrame, Iterator[pd.DataFrame]]]:
+        """Carrega o resultado em DataFrame.
+        
+        Com ``chunksize`` retorna um iterador de DataFrames de até N linhas (como
+        ``pd.read_sql``), mantendo a memória proporcional ao lote. ``dtype`` força
+        tipos por coluna, ``downcast`` reduz inteiros/floats ao menor tipo que
+        comporta os valores e ``categorias`` converte colunas repetitivas (nomes)
+        para ``category``.
+        """
+        if chunksize:
+            return self.iter_query_dataframes(query, chunksize, dtype, downcast, categorias, params)
+        
         try:
-            with self.get_connection() as conn:
-                df = pd.read_sql(query, conn)
-                self.logger.info(f"Query executed successfully. DataFrame created with {len(df)} records")
-                return df
+            partes = list(self.iter_query_dataframes(query, None, dtype, False, None, params))
+            if not partes:
+                df = pd.DataFrame()
+            else:
+                df = partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+                # Downcast e categorias só depois da concatenação: por lote, larguras e categorias
+                # diferentes (ex.: int8 + int16) voltariam a int64/object no concat
+                df = self._otimizar_tipos(df, None, downcast, categorias)
+            self.logger.info(f"Query executed successfully. DataFrame created with {len(df)} records")
+            return df
         except Exception as e:
             self.logger.error(f"Error executing DataFrame query: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def iter_query_dataframes(
+        self,
+        query: str,
+        chunksize: Optional[int] = None,
+        dtype: Optional[Dict[str, Any]] = None,
+        downcast: bool = False,
+        categorias: Optional[Sequence[str]] = None,
+        params: Optional[Sequence[Any]] = None
+    ) -> Iterator[pd.DataFrame]:
+        for columns, rows in self._iter_batches(query, params, chunksize):
+            df = pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+            yield self._otimizar_tipos(df, dtype, downcast, categorias)
+    
+    @staticmethod
+    def _otimizar_tipos(
+        df: pd.DataFrame,
+        dtype: Optional[Dict[str, Any]],
+        downcast: bool,
+        categorias: Optional[Sequence[str]]
+    ) -> pd.DataFrame:
+        if dtype:
+            df = df.astype({col: tipo for col, tipo in dtype.items() if col in df.columns})
+        if downcast:
+            for col in df.select_dtypes(include='integer').columns:
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+            for col in df.select_dtypes(include='float').columns:
+                df[col] = pd.to_numeric(df[col], downcast='float')
+        for col in categorias or ():
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        return df
+    
+    def execute_query_to_arrays(
+        self,
+        query: str,
+        dtypes: Optional[Dict[str, Any]] = None,
+        params: Optional[Sequence[Any]] = None,
+        batch_size: Optional[int] = None
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """Monta uma coluna NumPy por campo diretamente dos lotes de ``fetchmany``.
+        
+        Colunas sem tipo em ``dtypes`` ficam como ``object``; para inteiros que
+        podem vir nulos use ``float`` (NULL vira NaN).
+        """
+        dtypes = dtypes or {}
+        try:
+            columns: List[str] = []
+            partes: Dict[str, List[np.ndarray]] = {}
+            for columns, rows in self._iter_batches(query, params, batch_size):
+                valores = list(zip(*rows))
+                for col, coluna in zip(columns, valores):
+                    partes.setdefault(col, []).append(np.array(coluna, dtype=dtypes.get(col, object)))
+            
+            arrays = {
+                col: np.concatenate(partes[col]) if col in partes else np.array([], dtype=dtypes.get(col, object))
+                for col in columns
+            }
+            total = len(next(iter(arrays.values()))) if arrays else 0
+            self.logger.info(f"Query executed successfully. {len(arrays)} columns with {total} records")
+            return arrays
+        except Exception as e:
+            self.logger.error(f"Error executing columnar query: {e}")
+            return None
+    
+    @staticmethod
+    def set_query_timeout(connection, seconds: int) -> int:
+        """Define o timeout de comando da conexão e retorna o valor anterior"""
+        anterior = getattr(connection, 'timeout', 0)
+        connection.timeout = seconds
+        return anterior
+    
+    @staticmethod
+    def is_timeout_error(error: Exception) -> bool:
+        # SQLSTATE HYT00: timeout expirado (pyodbc.OperationalError)
+        sqlstate = error.args[0] if getattr(error, 'args', None) else ''
+        return sqlstate == 'HYT00' or 'timeout expired' in str(error).lower()
+    
+    @staticmethod
+    def is_connection_error(error: Exception) -> bool:
+        # SQLSTATE classe 08: falhas de conexão (ex.: 08S01 communication link failure)
+        sqlstate = error.args[0] if getattr(error, 'args', None) else ''
+        if isinstance(sqlstate, str) and sqlstate.startswith('08'):
+            return True
+        mensagem = str(error).lower()
+        return 'communication link failure' in mensagem or 'connection is busy' in mensagem or 'connection was closed' in mensagem
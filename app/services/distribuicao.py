@@ -0,0 +1,326 @@
+import bisect
+import hashlib
+import json
+import logging
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing
+from dataclasses import fields
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+from app.models.pendencia import Pendencia, ResultadoExecucao
+
+MODOS_DISTRIBUICAO = ('desativado', 'hash', 'lease')
+
+# Campos de ResultadoExecucao gravados na tabela de trabalho (a Pendencia é religada pelo id)
+_CAMPOS_RESULTADO = tuple(f.name for f in fields(ResultadoExecucao) if f.name != 'pendencia')
+
+
+def _hash(chave: str) -> int:
+    # Estável entre processos (hash() do Python é aleatorizado por execução)
+    return int.from_bytes(hashlib.md5(chave.encode('utf-8')).digest()[:8], 'big')
+
+
+class AnelConsistente:
+    """Anel de hash consistente: cada nó ocupa ``replicas`` pontos virtuais.
+
+    Quando um nó entra ou sai, só as chaves do seu trecho do anel mudam de dono.
+    """
+
+    def __init__(self, nos: Iterable[str], replicas: int = 64):
+        pontos = sorted((_hash(f"{no}#{i}"), no) for no in set(nos) for i in range(replicas))
+        self._chaves = [p[0] for p in pontos]
+        self._nos = [p[1] for p in pontos]
+
+    def __len__(self) -> int:
+        return len(set(self._nos))
+
+    def no_de(self, chave) -> Optional[str]:
+        if not self._chaves:
+            return None
+        posicao = bisect.bisect(self._chaves, _hash(str(chave))) % len(self._chaves)
+        return self._nos[posicao]
+
+
+class CoordenadorExecucao(ABC):
+    """Tabelas de coordenação entre nós do agendador (nós ativos, itens de trabalho e dono do resumo).
+
+    Cada consulta de uma execução é um item com lease: um nó só executa o item
+    que conseguiu reivindicar (UPDATE condicional), e um lease vencido pode ser
+    reivindicado por outro nó — é assim que o trabalho de um nó que caiu é retomado.
+    O resultado de cada item fica gravado na própria tabela, para que o nó dono
+    do resumo monte o resultado completo da execução.
+    """
+
+    DDL = (
+        """CREATE TABLE amm_scheduler_nos (
+            no NVARCHAR(100) NOT NULL PRIMARY KEY,
+            visto_em DATETIME2 NOT NULL
+        )""",
+        """CREATE TABLE amm_scheduler_execucoes (
+            execucao NVARCHAR(100) NOT NULL PRIMARY KEY,
+            criada_em DATETIME2 NOT NULL,
+            dono_resumo NVARCHAR(100) NULL,
+            expira_em DATETIME2 NULL
+        )""",
+        """CREATE TABLE amm_scheduler_itens (
+            execucao NVARCHAR(100) NOT NULL,
+            id INT NOT NULL,
+            dono NVARCHAR(100) NULL,
+            expira_em DATETIME2 NULL,
+            concluido INT NOT NULL DEFAULT 0,
+            resultado NVARCHAR(MAX) NULL,
+            PRIMARY KEY (execucao, id)
+        )""",
+    )
+
+    # Execuções mais antigas que isso são apagadas ao preparar uma nova
+    RETENCAO = timedelta(days=7)
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    # --- acesso ao banco (específico de cada implementação) ---
+
+    @abstractmethod
+    def _executar(self, sql: str, parametros: Sequence = ()) -> int:
+        """Executa uma instrução e devolve o número de linhas afetadas"""
+
+    def _executar_varios(self, sql: str, parametros: List[Sequence]) -> None:
+        for p in parametros:
+            self._executar(sql, p)
+
+    @abstractmethod
+    def _consultar(self, sql: str, parametros: Sequence = ()) -> List[tuple]:
+        """Executa uma consulta e devolve todas as linhas"""
+
+    def _momento(self, valor: datetime):
+        return valor
+
+    # --- nós ---
+
+    def anunciar(self, no: str) -> None:
+        """Heartbeat do nó (entra no anel de hash enquanto o registro estiver dentro do TTL)"""
+        agora = self._momento(datetime.utcnow())
+        if not self._executar("UPDATE amm_scheduler_nos SET visto_em = ? WHERE no = ?", (agora, no)):
+            self._executar(
+                "INSERT INTO amm_scheduler_nos (no, visto_em) "
+                "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM amm_scheduler_nos WHERE no = ?)",
+                (no, agora, no)
+            )
+
+    def nos_ativos(self, ttl: float) -> List[str]:
+        limite = self._momento(datetime.utcnow() - timedelta(seconds=ttl))
+        return sorted(r[0] for r in self._consultar("SELECT no FROM amm_scheduler_nos WHERE visto_em >= ?", (limite,)))
+
+    # --- itens de trabalho ---
+
+    def preparar(self, execucao: str, ids: Iterable[int]) -> None:
+        """Registra a execução e os seus itens (idempotente: cada nó chama com a mesma lista)"""
+        agora = datetime.utcnow()
+        antigas = self._momento(agora - self.RETENCAO)
+        self._executar(
+            "DELETE FROM amm_scheduler_itens WHERE execucao IN "
+            "(SELECT execucao FROM amm_scheduler_execucoes WHERE criada_em < ?)",
+            (antigas,)
+        )
+        self._executar("DELETE FROM amm_scheduler_execucoes WHERE criada_em < ?", (antigas,))
+
+        ids = list(ids)
+        for tentativa in range(1, 4):
+            try:
+                self._executar(
+                    "INSERT INTO amm_scheduler_execucoes (execucao, criada_em) "
+                    "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM amm_scheduler_execucoes WHERE execucao = ?)",
+                    (execucao, self._momento(agora), execucao)
+                )
+                self._executar_varios(
+                    "INSERT INTO amm_scheduler_itens (execucao, id) "
+                    "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM amm_scheduler_itens WHERE execucao = ? AND id = ?)",
+                    [(execucao, i, execucao, i) for i in ids]
+                )
+                return
+            except Exception as e:
+                # Outro nó inseriu os mesmos itens ao mesmo tempo (chave duplicada): repetir pula os existentes
+                if tentativa == 3:
+                    raise
+                self.logger.info(f"Concurrent preparation of run {execucao}, retrying: {e}")
+
+    def reivindicar(self, execucao: str, no: str, ids: Iterable[int], ttl: float) -> List[int]:
+        """Tenta assumir cada item; devolve os ids obtidos (livres, com lease vencido ou já deste nó)"""
+        agora = datetime.utcnow()
+        expira, agora = self._momento(agora + timedelta(seconds=ttl)), self._momento(agora)
+        obtidos = []
+        for id_item in ids:
+            if self._executar(
+                "UPDATE amm_scheduler_itens SET dono = ?, expira_em = ? "
+                "WHERE execucao = ? AND id = ? AND concluido = 0 "
+                "AND (dono IS NULL OR dono = ? OR expira_em < ?)",
+                (no, expira, execucao, id_item, no, agora)
+            ):
+                obtidos.append(id_item)
+        return obtidos
+
+    def concluir(self, execucao: str, no: str, resultados: Iterable[ResultadoExecucao]) -> None:
+        self._executar_varios(
+            "UPDATE amm_scheduler_itens SET concluido = 1, resultado = ? WHERE execucao = ? AND id = ? AND dono = ?",
+            [
+                (json.dumps({c: getattr(r, c) for c in _CAMPOS_RESULTADO}, ensure_ascii=False, default=str), execucao, r.id, no)
+                for r in resultados
+            ]
+        )
+
+    def liberar(self, execucao: str, no: str, ids: Iterable[int]) -> None:
+        """Devolve itens reivindicados e não executados (ex.: interrupção) para outro nó assumir"""
+        self._executar_varios(
+            "UPDATE amm_scheduler_itens SET dono = NULL, expira_em = NULL "
+            "WHERE execucao = ? AND id = ? AND dono = ? AND concluido = 0",
+            [(execucao, i, no) for i in ids]
+        )
+
+    def pendentes(self, execucao: str) -> List[int]:
+        return [r[0] for r in self._consultar(
+            "SELECT id FROM amm_scheduler_itens WHERE execucao = ? AND concluido = 0", (execucao,)
+        )]
+
+    def resultados(self, execucao: str) -> List[ResultadoExecucao]:
+        linhas = self._consultar(
+            "SELECT resultado FROM amm_scheduler_itens WHERE execucao = ? AND concluido = 1", (execucao,)
+        )
+        return [
+            ResultadoExecucao(**{k: v for k, v in json.loads(linha[0]).items() if k in _CAMPOS_RESULTADO})
+            for linha in linhas
+        ]
+
+    # --- resumo ---
+
+    def reivindicar_resumo(self, execucao: str, no: str, ttl: float) -> bool:
+        """Só um nó por vez é dono do resumo/arquivo de resultados da execução (renovável pelo próprio dono)"""
+        agora = datetime.utcnow()
+        return bool(self._executar(
+            "UPDATE amm_scheduler_execucoes SET dono_resumo = ?, expira_em = ? "
+            "WHERE execucao = ? AND (dono_resumo IS NULL OR dono_resumo = ? OR expira_em < ?)",
+            (no, self._momento(agora + timedelta(seconds=ttl)), execucao, no, self._momento(agora))
+        ))
+
+
+class CoordenadorSQLite(CoordenadorExecucao):
+    """Coordenação num arquivo SQLite compartilhado (vários contêineres no mesmo host, ou testes)"""
+
+    def __init__(self, caminho: Path):
+        super().__init__()
+        self.caminho = Path(caminho)
+        with closing(self._conectar()) as conn, conn:
+            for ddl in self.DDL:
+                ddl = ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1)
+                conn.execute(ddl.replace("NVARCHAR(MAX)", "TEXT"))
+
+    def _conectar(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.caminho), timeout=30)
+
+    def _momento(self, valor: datetime) -> str:
+        # Texto ISO de largura fixa: a comparação de strings segue a ordem cronológica
+        return valor.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    def _executar(self, sql: str, parametros: Sequence = ()) -> int:
+        with closing(self._conectar()) as conn, conn:
+            return conn.execute(sql, parametros).rowcount
+
+    def _executar_varios(self, sql: str, parametros: List[Sequence]) -> None:
+        with closing(self._conectar()) as conn, conn:
+            conn.executemany(sql, parametros)
+
+    def _consultar(self, sql: str, parametros: Sequence = ()) -> List[tuple]:
+        with closing(self._conectar()) as conn:
+            return conn.execute(sql, parametros).fetchall()
+
+
+class CoordenadorSqlServer(CoordenadorExecucao):
+    """Coordenação em tabelas amm_scheduler_* no próprio banco (nós em hosts diferentes)"""
+
+    def __init__(self, db_service):
+        super().__init__()
+        self.db_service = db_service
+        with self.db_service.get_connection() as conn:
+            cursor = conn.cursor()
+            for ddl in self.DDL:
+                tabela = ddl.split()[2]
+                cursor.execute(f"IF OBJECT_ID(N'{tabela}', N'U') IS NULL {ddl}")
+            conn.commit()
+
+    def _executar(self, sql: str, parametros: Sequence = ()) -> int:
+        with self.db_service.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, parametros)
+            linhas = cursor.rowcount
+            conn.commit()
+            return linhas
+
+    def _executar_varios(self, sql: str, parametros: List[Sequence]) -> None:
+        if not parametros:
+            return
+        with self.db_service.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            cursor.executemany(sql, parametros)
+            conn.commit()
+
+    def _consultar(self, sql: str, parametros: Sequence = ()) -> List[tuple]:
+        with self.db_service.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, parametros)
+            return [tuple(r) for r in cursor.fetchall()]
+
+
+class ExecucaoDistribuida:
+    """Uma execução dividida entre os nós: ordem de trabalho deste nó e parâmetros de lease.
+
+    Modo ``hash``: as consultas cujo id_pendencia cai neste nó no anel (sobre os nós
+    ativos) vêm primeiro; depois o nó ajuda com o que sobrou. Modo ``lease``: todos
+    disputam a mesma fila, na ordem de execução. Nos dois casos, só o lease garante
+    que cada consulta roda uma vez.
+    """
+
+    def __init__(
+        self,
+        coordenador: CoordenadorExecucao,
+        no: str,
+        execucao: str,
+        modo: str = 'lease',
+        lease_ttl: float = 900,
+        no_ttl: float = 900,
+        espera_max: float = 3600,
+        intervalo_espera: float = 5
+    ):
+        if modo not in ('hash', 'lease'):
+            raise ValueError(f"Unknown distribution mode '{modo}'")
+        self.logger = logging.getLogger(__name__)
+        self.coordenador = coordenador
+        self.no = no
+        self.execucao = execucao
+        self.modo = modo
+        self.lease_ttl = lease_ttl
+        self.no_ttl = no_ttl
+        self.espera_max = espera_max
+        self.intervalo_espera = intervalo_espera
+
+    def ordenar(self, pendencias: List[Pendencia]) -> List[Pendencia]:
+        if self.modo != 'hash':
+            return pendencias
+        self.coordenador.anunciar(self.no)
+        nos = self.coordenador.nos_ativos(self.no_ttl)
+        anel = AnelConsistente(nos or [self.no])
+        proprias = [p for p in pendencias if anel.no_de(p.id_pendencia) == self.no]
+        self.logger.info(f"Hash ring with {len(anel)} nodes: {len(proprias)} of {len(pendencias)} queries assigned to {self.no}")
+        ids_proprios = {p.id for p in proprias}
+        return proprias + [p for p in pendencias if p.id not in ids_proprios]
+
+
+def criar_coordenador(tipo: str, db_service=None, caminho_sqlite: Optional[Path] = None) -> CoordenadorExecucao:
+    if tipo == 'sqlite':
+        return CoordenadorSQLite(caminho_sqlite or Path('output') / 'coordenacao.db')
+    if tipo == 'sqlserver':
+        return CoordenadorSqlServer(db_service)
+    raise ValueError(f"Unknown coordination store '{tipo}' (use sqlserver or sqlite)")
@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.pendencia import Pendencia, ResultadoExecucao
+
+
+class HistoricoDuracoes:
+    """Histórico local das durações de cada consulta (média móvel exponencial por id)"""
+
+    def __init__(self, caminho: Path, alpha: float = 0.3):
+        self.logger = logging.getLogger(__name__)
+        self.caminho = Path(caminho)
+        self.alpha = alpha
+        self._duracoes: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._carregar()
+
+    def _carregar(self) -> None:
+        if not self.caminho.exists():
+            return
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            self._duracoes = {int(k): float(v) for k, v in dados.get('duracoes', {}).items()}
+            self.logger.info(f"Loaded duration history for {len(self._duracoes)} queries")
+        except Exception as e:
+            self.logger.warning(f"Could not read duration history {self.caminho}: {e}")
+            self._duracoes = {}
+
+    def obter(self, id_consulta: int) -> Optional[float]:
+        return self._duracoes.get(id_consulta)
+
+    def atualizar(self, resultados: Iterable[ResultadoExecucao]) -> None:
+        """Incorpora as durações da execução e persiste o histórico"""
+        with self._lock:
+            for r in resultados:
+                if not r.tempos or r.status == 'ignorada':
+                    continue
+                # Sem o tempo de conexão, que depende da ordem e não da consulta
+                duracao = r.tempos.get('total', 0.0) - r.tempos.get('conexao', 0.0)
+                anterior = self._duracoes.get(r.id)
+                if anterior is None:
+                    self._duracoes[r.id] = duracao
+                else:
+                    self._duracoes[r.id] = self.alpha * duracao + (1 - self.alpha) * anterior
+            self._salvar()
+
+    def _salvar(self) -> None:
+        try:
+            temporario = self.caminho.with_suffix(self.caminho.suffix + '.tmp')
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({'duracoes': {str(k): round(v, 4) for k, v in self._duracoes.items()}}, f)
+            os.replace(temporario, self.caminho)
+        except Exception as e:
+            self.logger.error(f"Error saving duration history: {e}")
+
+
+ESTRATEGIAS_ORDENACAO = ('id', 'custo', 'grupo')
+
+
+def ordenar_pendencias(
+    pendencias: List[Pendencia],
+    estrategia: str,
+    duracoes: Optional[HistoricoDuracoes] = None
+) -> List[Pendencia]:
+    """Ordena as pendências conforme a estratégia de execução configurada.
+
+    - ``id``: ordem do cadastro (mesma do MAIN_QUERY)
+    - ``custo``: mais demoradas primeiro, pelo histórico de durações; consultas
+      sem histórico vão no fim, na ordem recebida
+    - ``grupo``: agrupadas por id_grupo e, dentro do grupo, por id
+    """
+    if estrategia == 'custo' and duracoes is not None:
+        def custo(p: Pendencia) -> Tuple[bool, float]:
+            duracao = duracoes.obter(p.id)
+            return (duracao is None, -(duracao or 0.0))
+        return sorted(pendencias, key=custo)
+
+    if estrategia == 'grupo':
+        return sorted(pendencias, key=lambda p: (p.id_grupo is None, p.id_grupo or 0, p.id))
+
+    return sorted(pendencias, key=lambda p: p.id)
@@ -0,0 +1,155 @@
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATOS = ('json', 'jsonl', 'msgpack')
+COMPRESSOES = ('nenhuma', 'gzip', 'zstd')
+
+_EXTENSOES_FORMATO = {'.json': 'json', '.jsonl': 'jsonl', '.msgpack': 'msgpack'}
+_EXTENSOES_COMPRESSAO = {'.gz': 'gzip', '.zst': 'zstd'}
+
+logger = logging.getLogger(__name__)
+
+
+def resolver_formato(formato: str, compressao: str) -> Tuple[str, str]:
+    """Valida a configuração, recorrendo a jsonl/gzip quando a biblioteca opcional não está instalada"""
+    formato = (formato or 'json').lower()
+    compressao = (compressao or 'nenhuma').lower()
+    if compressao in ('', 'none'):
+        compressao = 'nenhuma'
+
+    if formato not in FORMATOS:
+        logger.warning(f"Unknown results format '{formato}' - using json")
+        formato = 'json'
+    if compressao not in COMPRESSOES:
+        logger.warning(f"Unknown results compression '{compressao}' - writing uncompressed")
+        compressao = 'nenhuma'
+
+    if formato == 'msgpack' and msgpack is None:
+        logger.warning("msgpack is not installed - writing results as jsonl")
+        formato = 'jsonl'
+    if compressao == 'zstd' and zstandard is None:
+        logger.warning("zstandard is not installed - compressing results with gzip")
+        compressao = 'gzip'
+    return formato, compressao
+
+
+def extensao(formato: str, compressao: str) -> str:
+    sufixo = next(ext for ext, f in _EXTENSOES_FORMATO.items() if f == formato)
+    if compressao != 'nenhuma':
+        sufixo += next(ext for ext, c in _EXTENSOES_COMPRESSAO.items() if c == compressao)
+    return sufixo
+
+
+def identificar(caminho: Path) -> Tuple[str, str]:
+    """(formato, compressão) pelo sufixo do arquivo; ValueError se não for um arquivo de resultados"""
+    sufixos = [s.lower() for s in Path(caminho).suffixes]
+    compressao = 'nenhuma'
+    if sufixos and sufixos[-1] in _EXTENSOES_COMPRESSAO:
+        compressao = _EXTENSOES_COMPRESSAO[sufixos.pop()]
+    if not sufixos or sufixos[-1] not in _EXTENSOES_FORMATO:
+        raise ValueError(f"Not a results file: {Path(caminho).name}")
+    return _EXTENSOES_FORMATO[sufixos[-1]], compressao
+
+
+def eh_arquivo_resultados(caminho: Path) -> bool:
+    if Path(caminho).name.startswith('.'):
+        # Temporário de uma gravação em andamento
+        return False
+    try:
+        identificar(caminho)
+        return True
+    except ValueError:
+        return False
+
+
+def _serializar(dados: Dict[str, Any], formato: str) -> bytes:
+    if formato == 'msgpack':
+        return msgpack.packb(dados, default=str, use_bin_type=True)
+
+    if formato == 'jsonl':
+        # Linha 1: campos do resumo; demais linhas: um resultado por linha
+        cabecalho = {k: v for k, v in dados.items() if k != 'resultados'}
+        linhas = [json.dumps(cabecalho, ensure_ascii=False, default=str)]
+        linhas.extend(
+            json.dumps(r, ensure_ascii=False, default=str) for r in dados.get('resultados', {}).values()
+        )
+        return ('\n'.join(linhas) + '\n').encode('utf-8')
+
+    return json.dumps(dados, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+
+
+def _desserializar(conteudo: bytes, formato: str) -> Dict[str, Any]:
+    if formato == 'msgpack':
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed - cannot read .msgpack results")
+        return msgpack.unpackb(conteudo, raw=False, strict_map_key=False)
+
+    if formato == 'jsonl':
+        cabecalho, _, corpo = conteudo.decode('utf-8').partition('\n')
+        dados = json.loads(cabecalho) if cabecalho.strip() else {}
+        # Quebras de linha dentro de valores JSON são sempre escapadas: as linhas viram um único array
+        linhas = [linha for linha in corpo.splitlines() if linha.strip()]
+        resultados = json.loads('[' + ','.join(linhas) + ']')
+        dados['resultados'] = {str(r.get('id')): r for r in resultados}
+        return dados
+
+    return json.loads(conteudo.decode('utf-8'))
+
+
+def salvar_resultados(caminho_base: Path, dados: Dict[str, Any], formato: str = 'json', compressao: str = 'nenhuma') -> Path:
+    """Grava ``dados`` em ``caminho_base`` + extensão do formato, via temporário e rename atômico"""
+    formato, compressao = resolver_formato(formato, compressao)
+    caminho_base = Path(caminho_base)
+    destino = caminho_base.with_name(caminho_base.name + extensao(formato, compressao))
+
+    conteudo = _serializar(dados, formato)
+    if compressao == 'gzip':
+        conteudo = gzip.compress(conteudo, compresslevel=6)
+    elif compressao == 'zstd':
+        conteudo = zstandard.ZstdCompressor(level=3).compress(conteudo)
+
+    # Temporário oculto no mesmo diretório: não casa com os padrões de busca e o rename é atômico
+    temporario = destino.with_name(f".{destino.name}.tmp")
+    try:
+        with open(temporario, 'wb') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, destino)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+    return destino
+
+
+def carregar_resultados(caminho: Path) -> Dict[str, Any]:
+    """Lê um arquivo de resultados em qualquer formato/compressão suportado"""
+    formato, compressao = identificar(caminho)
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+
+    if compressao == 'gzip':
+        conteudo = gzip.decompress(conteudo)
+    elif compressao == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed - cannot read .zst results")
+        conteudo = zstandard.ZstdDecompressor().decompress(conteudo)
+
+    return _desserializar(conteudo, formato)
@@ -0,0 +1,123 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+
+class HistoricoBatchWriter:
+    """Acumula as linhas de amm_histPendencias de uma execução e grava em lote.
+
+    Cada flush copia as linhas para uma tabela temporária com ``fast_executemany``
+    e aplica um único MERGE, mantendo a regra de atualizar o registro do dia
+    quando ele já existe e inserir caso contrário.
+    """
+
+    CREATE_STAGING = """
+    IF OBJECT_ID('tempdb..#hist_staging') IS NOT NULL DROP TABLE #hist_staging;
+    SELECT TOP 0 idPendencia, data, hora, idUsuario, qtd
+    INTO #hist_staging
+    FROM amm_histPendencias
+    """
+
+    INSERT_STAGING = """
+    INSERT INTO #hist_staging (idPendencia, data, hora, idUsuario, qtd)
+    VALUES (?, ?, ?, ?, ?)
+    """
+
+    MERGE_HISTORICO = """
+    MERGE amm_histPendencias AS alvo
+    USING #hist_staging AS origem
+    ON alvo.idPendencia = origem.idPendencia AND alvo.data = origem.data
+    WHEN MATCHED THEN
+        UPDATE SET hora = origem.hora, idUsuario = origem.idUsuario, qtd = origem.qtd,
+                   idGestora = 919, usoSistema = 1, responsabilidade = ''
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (idPendencia, data, hora, idUsuario, qtd, idGestora, usoSistema, responsabilidade)
+        VALUES (origem.idPendencia, origem.data, origem.hora, origem.idUsuario, origem.qtd, 919, 1, '');
+    """
+
+    DROP_STAGING = "DROP TABLE #hist_staging"
+
+    def __init__(self, conn, flush_size: int = 500):
+        self.logger = logging.getLogger(__name__)
+        self.conn = conn
+        self.flush_size = max(1, flush_size)
+        # Chave (idPendencia, data): a última contagem do dia prevalece, como no UPDATE original
+        self._linhas: Dict[Tuple[int, str], Tuple[int, str, str, int, int]] = {}
+        self.linhas_gravadas = 0
+        self.ultimo_erro: Optional[Exception] = None
+
+    def __len__(self) -> int:
+        return len(self._linhas)
+
+    def adicionar(self, id_pendencia: int, data: str, hora: str, id_usuario: int, quantidade: int) -> bool:
+        self._linhas[(id_pendencia, data)] = (id_pendencia, data, hora, id_usuario, quantidade)
+        if len(self._linhas) >= self.flush_size:
+            return self.flush()
+        return True
+
+    def flush(self) -> bool:
+        if not self._linhas:
+            return True
+
+        linhas = list(self._linhas.values())
+        self._linhas.clear()
+        self.ultimo_erro = None
+
+        try:
+            self._gravar_merge(linhas)
+            self.linhas_gravadas += len(linhas)
+            self.logger.info(f"History batch flushed: {len(linhas)} rows written to amm_histPendencias")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Batch history write failed ({e}) - falling back to row-by-row writes")
+            self._rollback()
+
+        try:
+            self._gravar_linha_a_linha(linhas)
+            self.linhas_gravadas += len(linhas)
+            self.logger.info(f"History fallback completed: {len(linhas)} rows written to amm_histPendencias")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to write history batch of {len(linhas)} rows: {e}")
+            self.ultimo_erro = e
+            self._rollback()
+            # Manter as linhas para o próximo flush (ex.: após reconectar), sem sobrescrever as mais novas
+            for linha in linhas:
+                self._linhas.setdefault((linha[0], linha[1]), linha)
+            return False
+
+    def _gravar_merge(self, linhas: List[Tuple[int, str, str, int, int]]) -> None:
+        cursor = self.conn.cursor()
+        cursor.execute(self.CREATE_STAGING)
+        cursor.fast_executemany = True
+        cursor.executemany(self.INSERT_STAGING, linhas)
+        cursor.execute(self.MERGE_HISTORICO)
+        cursor.execute(self.DROP_STAGING)
+        self.conn.commit()
+
+    def _gravar_linha_a_linha(self, linhas: List[Tuple[int, str, str, int, int]]) -> None:
+        cursor = self.conn.cursor()
+        for id_pendencia, data, hora, id_usuario, quantidade in linhas:
+            cursor.execute(
+                """
+                UPDATE amm_histPendencias
+                SET hora = ?, idUsuario = ?, qtd = ?, idGestora = 919, usoSistema = 1, responsabilidade = ''
+                WHERE idPendencia = ? AND data = ?
+                """,
+                (hora, id_usuario, quantidade, id_pendencia, data)
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    """
+                    INSERT INTO amm_histPendencias
+                    (idPendencia, data, hora, idUsuario, qtd, idGestora, usoSistema, responsabilidade)
+                    VALUES (?, ?, ?, ?, ?, 919, 1, '')
+                    """,
+                    (id_pendencia, data, hora, id_usuario, quantidade)
+                )
+        self.conn.commit()
+
+    def _rollback(self) -> None:
+        try:
+            self.conn.rollback()
+        except Exception as e:
+            self.logger.debug(f"Rollback after history write failure failed: {e}")
@@ -1,11 +1,30 @@
+import hashlib
 import logging
-import json
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta, time as dt_time
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 from pathlib import Path
 
-from app.models.pendencia import Pendencia, ResultadoExecucao, ResumoExecucao
+from app.models.pendencia import Anomalia, Pendencia, ResultadoExecucao, ResumoExecucao, TabelaResultados
+from app.services.anomalias import DetectorAnomalias
+from app.services.cadencias import NOME_ESTADO_CADENCIAS, EstadoCadencias, PlanoCadencias
+from app.services.catalogo import NOME_CATALOGO, CatalogoExecucoes
+from app.services.checkpoint import CheckpointExecucao
+from app.services.circuit_breaker import CircuitBreaker
 from app.services.database import DatabaseService
+from app.services.distribuicao import ExecucaoDistribuida
+from app.services.duracoes import ESTRATEGIAS_ORDENACAO, HistoricoDuracoes, ordenar_pendencias
+from app.services.formato_resultados import salvar_resultados
+from app.services.historico import HistoricoBatchWriter
+from app.services.resumo import calcular_estatisticas
+from app.services.serie_historica import NOME_SERIE, SerieHistorica
+from app.services.trava_execucao import TravaExecucao, TravaPerdida, criar_trava
+from app.services.usuarios import UsuariosResponsaveisCache
 
 try:
     from config.settings import MAIN_QUERY, APP_CONFIG
@@ -21,8 +40,30 @@ class PendenciasService:
         self.output_dir = Path(APP_CONFIG['output_dir'])
         self.output_dir.mkdir(exist_ok=True)
         self.user_id = APP_CONFIG['user_id']
+        # Mantido entre execuções: com TTL > 0 o processo do agendador reaproveita o índice
+        self.usuarios_cache = UsuariosResponsaveisCache(ttl=APP_CONFIG.get('usuarios_cache_ttl', 0))
+        self.query_timeout = int(APP_CONFIG.get('query_timeout', 0))
+        self.circuit_breaker = CircuitBreaker(
+            limite_timeouts=APP_CONFIG.get('circuit_breaker_timeouts', 3),
+            pausa=APP_CONFIG.get('circuit_breaker_pausa', 3600),
+            caminho=self.output_dir / 'circuit_breaker.json'
+        )
+        self.historico_duracoes = HistoricoDuracoes(self.output_dir / 'duracoes_consultas.json')
+        # Cada worker ocupa uma conexão do pool; a trava de banco usa uma conexão própria, fora dele
+        self.max_workers = self.db_service.limitar_ao_pool(max(1, int(APP_CONFIG.get('max_workers', 1))))
+    
+    def _carregar_usuarios_responsaveis(self) -> None:
+        try:
+            with self.db_service.get_connection() as conn:
+                self.usuarios_cache.carregar(conn)
+        except Exception as e:
+            self.logger.warning(f"Responsible users cache unavailable, using per-pendência lookups: {e}")
     
     def _obter_usuarios_responsaveis(self, conn, id_pendencia: int) -> List[Dict[str, Any]]:
+        usuarios = self.usuarios_cache.obter(id_pendencia)
+        if usuarios is not None:
+            return usuarios
+        
         try:
             cursor = conn.cursor()
             
@@ -44,40 +85,63 @@ class PendenciasService:
                 })
             
             self.logger.debug(f"Found {len(usuarios)} responsible users for pendência {id_pendencia}")
+            self.usuarios_cache.registrar(id_pendencia, usuarios)
             return usuarios
             
         except Exception as e:
             self.logger.error(f"Error getting responsible users for pendência {id_pendencia}: {str(e)}")
             return []
     
-    def _inserir_historico_pendencia(self, conn, id_pendencia: int, quantidade: int, id_usuario: int = None) -> bool:
+    def _resolver_usuario_responsavel(self, conn, id_pendencia: int, id_usuario: int = None) -> Tuple[int, str]:
+        # Obter os usuários responsáveis por esta pendência
+        usuarios_responsaveis = self._obter_usuarios_responsaveis(conn, id_pendencia)
+        
+        if not usuarios_responsaveis:
+            # Se não há usuários responsáveis, usar o usuário padrão
+            id_usuario_para_usar = id_usuario if id_usuario is not None else self.user_id
+            nome_usuario = "Sistema"
+            self.logger.warning(f"No responsible users found for pendência {id_pendencia}, using default user {id_usuario_para_usar}")
+        else:
+            # Usar apenas o primeiro usuário responsável
+            primeiro_usuario = usuarios_responsaveis[0]
+            id_usuario_para_usar = primeiro_usuario['id_usuario']
+            nome_usuario = primeiro_usuario['nome_usuario']
+            
+            # Log informativo sobre todos os usuários encontrados
+            if len(usuarios_responsaveis) > 1:
+                outros_usuarios = [f"{u['nome_usuario']} (ID: {u['id_usuario']})" for u in usuarios_responsaveis[1:]]
+                self.logger.info(f"Pendência {id_pendencia} has {len(usuarios_responsaveis)} responsible users. Using first: {nome_usuario} (ID: {id_usuario_para_usar}). Others: {', '.join(outros_usuarios)}")
+            else:
+                self.logger.debug(f"Pendência {id_pendencia} - Using responsible user: {nome_usuario} (ID: {id_usuario_para_usar})")
+        
+        return id_usuario_para_usar, nome_usuario
+    
+    def _inserir_historico_pendencia(
+        self,
+        conn,
+        id_pendencia: int,
+        quantidade: int,
+        id_usuario: int = None,
+        writer: Optional[HistoricoBatchWriter] = None,
+        tempos: Optional[Dict[str, float]] = None
+    ) -> bool:
+        inicio = time.perf_counter()
         try:
             agora = datetime.now()
             data_atual = agora.strftime('%Y-%m-%d')
             hora_atual = agora.strftime('%H:%M:%S')
             
-            cursor = conn.cursor()
+            id_usuario_para_usar, nome_usuario = self._resolver_usuario_responsavel(conn, id_pendencia, id_usuario)
+            if tempos is not None:
+                tempos['usuarios'] = time.perf_counter() - inicio
+                inicio = time.perf_counter()
             
-            # Obter os usuários responsáveis por esta pendência
-            usuarios_responsaveis = self._obter_usuarios_responsaveis(conn, id_pendencia)
+            if writer is not None:
+                # Gravação adiada: o writer faz o upsert de todas as linhas em lote
+                self.logger.debug(f"Queued history for pendência {id_pendencia} - User: {nome_usuario} (ID: {id_usuario_para_usar}) - Quantity: {quantidade}")
+                return writer.adicionar(id_pendencia, data_atual, hora_atual, id_usuario_para_usar, quantidade)
             
-            if not usuarios_responsaveis:
-                # Se não há usuários responsáveis, usar o usuário padrão
-                id_usuario_para_usar = id_usuario if id_usuario is not None else self.user_id
-                nome_usuario = "Sistema"
-                self.logger.warning(f"No responsible users found for pendência {id_pendencia}, using default user {id_usuario_para_usar}")
-            else:
-                # Usar apenas o primeiro usuário responsável
-                primeiro_usuario = usuarios_responsaveis[0]
-                id_usuario_para_usar = primeiro_usuario['id_usuario']
-                nome_usuario = primeiro_usuario['nome_usuario']
-                
-                # Log informativo sobre todos os usuários encontrados
-                if len(usuarios_responsaveis) > 1:
-                    outros_usuarios = [f"{u['nome_usuario']} (ID: {u['id_usuario']})" for u in usuarios_responsaveis[1:]]
-                    self.logger.info(f"Pendência {id_pendencia} has {len(usuarios_responsaveis)} responsible users. Using first: {nome_usuario} (ID: {id_usuario_para_usar}). Others: {', '.join(outros_usuarios)}")
-                else:
-                    self.logger.debug(f"Pendência {id_pendencia} - Using responsible user: {nome_usuario} (ID: {id_usuario_para_usar})")
+            cursor = conn.cursor()
             
             # Verificar se já existe registro para esta pendência hoje
             query_verificar = """
@@ -114,121 +178,796 @@ class PendenciasService:
         except Exception as e:
             self.logger.error(f"Failed to insert/update history for pendência {id_pendencia}: {e}")
             return False
+        finally:
+            if tempos is not None:
+                tempos['historico'] = time.perf_counter() - inicio
+    
+    def _criar_writer_historico(self, conn) -> Optional[HistoricoBatchWriter]:
+        flush_size = int(APP_CONFIG.get('history_flush_size', 500))
+        if flush_size <= 0:
+            return None
+        return HistoricoBatchWriter(conn, flush_size=flush_size)
     
     def extrair_pendencias(self) -> Optional[List[Pendencia]]:
-        results = self.db_service.execute_query(MAIN_QUERY)
-        if not results:
+        pendencias = []
+        try:
+            # Linhas lidas em lotes e convertidas direto em Pendencia, sem dicts intermediários
+            for row in self.db_service.iter_query(MAIN_QUERY):
+                pendencias.append(Pendencia(
+                    id=row.id,
+                    id_pendencia=row.id_pendencia,
+                    consulta_pendencia=row.consulta_pendencia,
+                    id_grupo=getattr(row, 'id_grupo', None),
+                    nome_pendencia=getattr(row, 'nome_pendencia', None),
+                    dt_criacao=getattr(row, 'dt_criacao', None),
+                    dt_modificacao=getattr(row, 'dt_modificacao', None),
+                    exibe_contagem=getattr(row, 'exibe_contagem', None),
+                    hash_consulta=self._hash_consulta(row.consulta_pendencia)
+                ))
+        except Exception as e:
+            self.logger.error(f"Error reading pendências: {e}")
+            pendencias = []
+        
+        if not pendencias:
             self.logger.error("Failed to extract pendências from database")
             return None
         
-        pendencias = []
-        for row in results:
-            pendencia = Pendencia(
-                id=row['id'],
-                id_pendencia=row['id_pendencia'],
-                consulta_pendencia=row['consulta_pendencia'],
-                id_grupo=row.get('id_grupo'),
-                nome_pendencia=row.get('nome_pendencia'),
-                dt_criacao=row.get('dt_criacao'),
-                dt_modificacao=row.get('dt_modificacao'),
-                exibe_contagem=row.get('exibe_contagem')
-            )
-            pendencias.append(pendencia)
+        unicas = len({p.hash_consulta for p in pendencias})
+        if unicas < len(pendencias):
+            self.logger.info(f"{len(pendencias)} pendências share {unicas} distinct queries")
         
         return pendencias
     
-    def executar_todas_consultas(self) -> Optional[ResumoExecucao]:
-        self.logger.info("Starting execution of all pendência queries")
+    @staticmethod
+    def _hash_consulta(consulta: Optional[str]) -> str:
+        """Hash do SQL normalizado: fora de literais, espaços colapsados e caixa ignorada; sem ';' final"""
+        partes = _LITERAL_SQL.split(consulta or '')
+        # Índices pares estão fora de literais '...'; dentro deles a caixa e os espaços importam
+        normalizada = ''.join(
+            parte if i % 2 else re.sub(r'\s+', ' ', parte).lower()
+            for i, parte in enumerate(partes)
+        ).strip().rstrip(';').rstrip()
+        return hashlib.sha1(normalizada.encode('utf-8')).hexdigest()
+    
+    def executar_todas_consultas(
+        self,
+        grupos: Optional[Iterable[int]] = None,
+        apenas_vencidas: bool = False,
+        distribuicao: Optional[ExecucaoDistribuida] = None
+    ) -> Optional[ResumoExecucao]:
+        """Executa as consultas de pendências.
+
+        Com ``grupos``, apenas as desses id_grupo; com ``apenas_vencidas``, apenas as
+        que a cadência de atualização (``PlanoCadencias``) considera vencidas. Com
+        ``distribuicao``, as consultas são divididas com os outros nós por leases e só
+        o nó dono do resumo grava o arquivo de resultados da execução completa.
+        
+        Fora do modo distribuído a execução só começa com a trava do ambiente
+        (``trava_execucao``); se outra execução estiver ativa, levanta
+        ``ExecucaoEmAndamento`` (na hora, ou após ``trava_espera`` segundos). Se a
+        trava se perder no meio da execução, os workers param antes da consulta
+        seguinte e o progresso fica no checkpoint.
+        """
+        # No modo distribuído os nós dividem a mesma execução de propósito: os leases já evitam trabalho duplicado
+        trava = self._criar_trava() if distribuicao is None else None
+        if trava is None:
+            return self._executar_consultas(grupos, apenas_vencidas, distribuicao)
+        with trava.adquirir(espera=float(APP_CONFIG.get('trava_espera', 0))):
+            return self._executar_consultas(grupos, apenas_vencidas, distribuicao, trava)
+    
+    def _criar_trava(self) -> Optional[TravaExecucao]:
+        return criar_trava(
+            APP_CONFIG.get('trava_execucao', 'arquivo'),
+            db_service=self.db_service,
+            caminho=Path(APP_CONFIG.get('trava_arquivo', self.output_dir / 'execucao.lock')),
+            recurso=APP_CONFIG.get('trava_recurso', 'pendencias_execucao'),
+            ttl=float(APP_CONFIG.get('trava_ttl', 120))
+        )
+    
+    def _executar_consultas(
+        self,
+        grupos: Optional[Iterable[int]],
+        apenas_vencidas: bool,
+        distribuicao: Optional[ExecucaoDistribuida],
+        trava: Optional[TravaExecucao] = None
+    ) -> Optional[ResumoExecucao]:
+        preparo = self._preparar_execucao(grupos, apenas_vencidas, distribuicao)
+        if preparo is None:
+            return None
+        preparo.trava = trava
+        
+        try:
+            if distribuicao is not None:
+                # Mesmo sem nada a executar, o nó registra a execução para poder disputar o resumo
+                resultados = self._executar_distribuido(preparo.pendencias, distribuicao, preparo.max_workers)
+            elif not preparo.pendencias:
+                self.logger.info("All pendências are fresh - nothing to execute")
+                resultados = []
+            elif preparo.max_workers > 1:
+                resultados = self._executar_concorrente(preparo.pendencias, preparo.max_workers, preparo.checkpoint, preparo)
+            else:
+                resultados = self._executar_sequencial(preparo.pendencias, preparo.checkpoint, preparo)
+            if trava is not None and trava.perdida:
+                # Outro processo detém o ambiente agora: nada de resumo, arquivo ou cadências desta execução
+                raise TravaPerdida(f"Run stopped after losing the run lock ({len(resultados)} queries executed)")
+        except Exception as e:
+            self._registrar_falha_critica(preparo, e)
+            return None
+        
+        return self._finalizar_execucao(preparo, resultados)
+    
+    def _preparar_execucao(
+        self,
+        grupos: Optional[Iterable[int]],
+        apenas_vencidas: bool,
+        distribuicao: Optional[ExecucaoDistribuida] = None
+    ) -> Optional["_PreparoExecucao"]:
+        """Extração, filtros, modo incremental, checkpoint e ordenação: tudo antes de executar as consultas"""
+        inicio_execucao = time.perf_counter()
+        momento_inicio = datetime.now()
+        grupos = sorted(set(grupos)) if grupos is not None else None
+        if grupos is None:
+            self.logger.info("Starting execution of all pendência queries")
+        else:
+            self.logger.info(f"Starting partial execution for groups {grupos}")
         self.logger.info("=" * 60)
         
-        # Extrair pendências
+        # Extrair pendências (com novas tentativas em caso de falha de conexão)
         pendencias = self.extrair_pendencias()
+        max_retries = int(APP_CONFIG.get('max_retries', 3))
+        for tentativa in range(1, max_retries + 1):
+            if pendencias:
+                break
+            self.logger.warning(f"Retrying pendência extraction in {APP_CONFIG.get('retry_delay', 5)}s (attempt {tentativa}/{max_retries})")
+            time.sleep(float(APP_CONFIG.get('retry_delay', 5)))
+            pendencias = self.extrair_pendencias()
         if not pendencias:
             return None
         
+        if grupos is not None:
+            selecionados = set(grupos)
+            pendencias = [p for p in pendencias if p.id_grupo in selecionados]
+            if not pendencias:
+                self.logger.warning(f"No pendência queries found for groups {grupos}")
+                return None
+        
+        parcial = grupos is not None
+        if apenas_vencidas:
+            disponiveis = len(pendencias)
+            pendencias = self._plano_cadencias().vencidas(pendencias, self._estado_cadencias(), momento_inicio)
+            self.logger.info(f"{len(pendencias)} of {disponiveis} pendência queries are due by their refresh cadence")
+            if not pendencias:
+                return None
+            parcial = parcial or len(pendencias) < disponiveis
+        
         self.logger.info(f" Total de consultas para executar: {len(pendencias)}")
         self.logger.info("-" * 60)
         
-        resultados = []
-        consultas_executadas = 0
-        consultas_com_erro = 0
+        total_consultas = len(pendencias)
+        selecionadas = {p.id: p for p in pendencias}
         
-        # Executar com conexão única
-        try:
-            self.logger.info("Opening database connection for batch execution...")
-            with self.db_service.get_connection() as conn:
-                self.logger.info("Database connection opened successfully - starting query execution")
-                
-                for i, pendencia in enumerate(pendencias, 1):
-                    self.logger.info(f"Executing query {i}/{len(pendencias)}: {pendencia.nome_pendencia}")
-                    
-                    try:
-                        resultado = self._executar_consulta_individual(
-                            conn, pendencia, i, len(pendencias)
-                        )
-                        resultados.append(resultado)
-                        
-                        if resultado.status == 'sucesso':
-                            consultas_executadas += 1
-                            self.logger.info(f"Query {i} completed successfully - {resultado.quantidade} records")
-                        else:
-                            consultas_com_erro += 1
-                            self.logger.warning(f"Query {i} failed: {resultado.erro}")
-                            
-                        # Progress log every 10 queries
-                        if i % 10 == 0:
-                            self.logger.info(f"Progress: {i}/{len(pendencias)} queries processed ({(i/len(pendencias)*100):.1f}%)")
-                            
-                    except KeyboardInterrupt:
-                        self.logger.info(f"Execution interrupted by user at query {i}")
-                        break
-                    except Exception as e:
-                        self.logger.error(f"Error executing query {i}: {str(e)}")
-                        consultas_com_erro += 1
-                        
-                self.logger.info("Batch execution completed - closing database connection")
+        # Modo incremental: pendências já atualizadas hoje e sem alteração usam a contagem gravada
+        reaproveitados: List[ResultadoExecucao] = []
+        # Na execução por cadência o plano já decidiu o que precisa ser atualizado
+        if APP_CONFIG.get('modo_incremental', False) and not apenas_vencidas:
+            pendencias, reaproveitados = self._separar_pendencias_atualizadas(pendencias)
         
-        except Exception as e:
-            self.logger.error(f"Critical execution error: {e}")
-            import traceback
-            self.logger.error(f"Full traceback: {traceback.format_exc()}")
-            return None
+        # Checkpoint: retomar uma execução de hoje que foi interrompida
+        checkpoint = None
+        concluidos: Dict[int, ResultadoExecucao] = {}
+        # Execuções parciais (grupos ou cadência) não usam checkpoint: não podem retomar nem descartar o da execução completa
+        # Na execução distribuída a tabela de itens já guarda o progresso
+        if not parcial and distribuicao is None and APP_CONFIG.get('checkpoint_habilitado', True):
+            checkpoint = CheckpointExecucao(self.output_dir / 'checkpoint_execucao.jsonl')
+            concluidos = checkpoint.iniciar(retomar=APP_CONFIG.get('retomar_execucao', True))
+            if concluidos:
+                for r in concluidos.values():
+                    r.pendencia = selecionadas.get(r.id)
+                pendencias = [p for p in pendencias if p.id not in concluidos]
+                # O que a execução interrompida concluiu já tem histórico de hoje e seria reaproveitado
+                # pelo modo incremental: o checkpoint prevalece para não contar a pendência duas vezes
+                reaproveitados = [r for r in reaproveitados if r.id not in concluidos]
+                self.logger.info(f"Resuming interrupted run: {len(concluidos)} done, {len(pendencias)} remaining")
+        
+        pendencias = self._ordenar_execucao(pendencias)
+        
+        if pendencias or concluidos:
+            # Mapeamento completo de responsáveis em uma única consulta
+            self._carregar_usuarios_responsaveis()
+        if concluidos:
+            self._regravar_historico(list(concluidos.values()))
+        
+        return _PreparoExecucao(
+            inicio_execucao=inicio_execucao,
+            momento_inicio=momento_inicio,
+            grupos=grupos,
+            parcial=parcial,
+            pendencias=pendencias,
+            total_consultas=total_consultas,
+            reaproveitados=reaproveitados,
+            concluidos=concluidos,
+            checkpoint=checkpoint,
+            max_workers=min(self.max_workers, max(len(pendencias), 1)),
+            distribuicao=distribuicao
+        )
+    
+    def _registrar_falha_critica(self, preparo: "_PreparoExecucao", erro: BaseException) -> None:
+        self.logger.error(f"Critical execution error: {erro}")
+        import traceback
+        self.logger.error(f"Full traceback: {traceback.format_exc()}")
+        if preparo.checkpoint is not None:
+            preparo.checkpoint.fechar()
+            self.logger.info("Progress kept in checkpoint - the next run will resume from it")
+    
+    def _finalizar_execucao(self, preparo: "_PreparoExecucao", resultados: List[ResultadoExecucao]) -> ResumoExecucao:
+        """Resumo, anomalias, arquivo de resultados, cadências e checkpoint de uma execução concluída"""
+        distribuicao = preparo.distribuicao
+        reaproveitados = preparo.reaproveitados
+        total_consultas = preparo.total_consultas
+        parcial = preparo.parcial
+        
+        self.db_service.log_pool_stats()
+        self.historico_duracoes.atualizar(resultados)
+        self.circuit_breaker.salvar()
+        
+        dono_resumo = True
+        if distribuicao is not None:
+            dono_resumo = distribuicao.coordenador.reivindicar_resumo(
+                distribuicao.execucao, distribuicao.no, distribuicao.lease_ttl
+            )
+            if dono_resumo:
+                por_id = {p.id: p for p in preparo.pendencias}
+                resultados = self._aguardar_execucao_distribuida(por_id, distribuicao, preparo.max_workers)
+                # Contagens reaproveitadas entram só se nenhum nó executou a consulta nesta execução
+                executados = {r.id for r in resultados}
+                reaproveitados = [r for r in reaproveitados if r.id not in executados]
+            else:
+                self.logger.info(f"Run {distribuicao.execucao} summary is owned by another node - keeping only this node's share")
+                total_consultas = len(resultados) + len(reaproveitados)
+                parcial = True
+        resultados.extend(reaproveitados)
+        resultados.extend(preparo.concluidos.values())
         
         # Criar resumo
         resumo = self._criar_resumo_execucao(
-            resultados, len(pendencias), consultas_executadas, consultas_com_erro
+            resultados, total_consultas, duracao_total=time.perf_counter() - preparo.inicio_execucao
         )
+        resumo.grupos_executados = preparo.grupos
+        resumo.parcial = parcial
         
-        # Salvar resultados
-        self._salvar_resultados(resumo)
+        if dono_resumo and APP_CONFIG.get('anomalias_habilitadas', True):
+            resumo.anomalias = self._detectar_anomalias(resumo)
+        
+        # Salvar resultados (na execução distribuída, só o dono do resumo grava o arquivo)
+        if dono_resumo:
+            self._salvar_resultados(resumo)
+        self._registrar_cadencias(resumo, preparo.momento_inicio)
+        
+        if preparo.checkpoint is not None:
+            if len(resultados) >= total_consultas and not preparo.historico_pendente:
+                preparo.checkpoint.concluir()
+            else:
+                # Execução interrompida ou histórico incompleto: manter o checkpoint para retomar depois
+                preparo.checkpoint.fechar()
+                if preparo.historico_pendente:
+                    self.logger.warning("History was not fully written - checkpoint kept so the next run re-writes it")
         
         return resumo
     
+    def _carregar_historico_hoje(self) -> Optional[Dict[int, Tuple[int, datetime]]]:
+        """Última contagem gravada hoje por idPendencia, em uma única consulta"""
+        hoje = datetime.now()
+        try:
+            with self.db_service.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT idPendencia, qtd, hora FROM amm_histPendencias WHERE data = ?",
+                    (hoje.strftime('%Y-%m-%d'),)
+                )
+                registros: Dict[int, Tuple[int, datetime]] = {}
+                for id_pendencia, qtd, hora in cursor.fetchall():
+                    momento = self._combinar_data_hora(hoje, hora)
+                    if momento is None:
+                        continue
+                    atual = registros.get(id_pendencia)
+                    if atual is None or momento > atual[1]:
+                        registros[id_pendencia] = (qtd, momento)
+                return registros
+        except Exception as e:
+            self.logger.warning(f"Could not load today's history for incremental mode: {e}")
+            return None
+    
+    @staticmethod
+    def _combinar_data_hora(dia: datetime, hora: Any) -> Optional[datetime]:
+        if isinstance(hora, datetime):
+            return datetime.combine(dia.date(), hora.time())
+        if isinstance(hora, dt_time):
+            return datetime.combine(dia.date(), hora)
+        if isinstance(hora, str):
+            try:
+                return datetime.combine(dia.date(), datetime.strptime(hora.strip()[:8], '%H:%M:%S').time())
+            except ValueError:
+                return None
+        return None
+    
+    def _separar_pendencias_atualizadas(
+        self, pendencias: List[Pendencia]
+    ) -> Tuple[List[Pendencia], List[ResultadoExecucao]]:
+        registros = self._carregar_historico_hoje()
+        if not registros:
+            return pendencias, []
+        
+        janela = timedelta(minutes=int(APP_CONFIG.get('janela_frescor_minutos', 60)))
+        limite = datetime.now() - janela
+        
+        a_executar: List[Pendencia] = []
+        reaproveitados: List[ResultadoExecucao] = []
+        for pendencia in pendencias:
+            registro = registros.get(pendencia.id_pendencia)
+            if registro is not None:
+                qtd, momento = registro
+                alterada = pendencia.dt_modificacao is not None and pendencia.dt_modificacao > momento
+                if momento >= limite and not alterada:
+                    reaproveitados.append(ResultadoExecucao(
+                        id=pendencia.id,
+                        id_pendencia=pendencia.id_pendencia,
+                        nome_pendencia=pendencia.nome_pendencia,
+                        id_grupo=pendencia.id_grupo,
+                        quantidade=qtd,
+                        status='sucesso',
+                        exibe_contagem=pendencia.exibe_contagem,
+                        do_historico=True,
+                        pendencia=pendencia
+                    ))
+                    continue
+            a_executar.append(pendencia)
+        
+        if reaproveitados:
+            self.logger.info(
+                f"Incremental mode: {len(reaproveitados)} pendências refreshed in the last "
+                f"{janela} served from amm_histPendencias, {len(a_executar)} to execute"
+            )
+        return a_executar, reaproveitados
+    
+    def _regravar_historico(self, resultados: List[ResultadoExecucao]) -> None:
+        """Regrava o histórico das pendências do checkpoint.
+        
+        Linhas que ainda estavam no buffer do writer quando a execução caiu se
+        perderam; o upsert é idempotente, então regravar todas é seguro.
+        """
+        sucessos = [r for r in resultados if r.status == 'sucesso' and not r.do_historico]
+        if not sucessos:
+            return
+        try:
+            with self.db_service.get_connection() as conn:
+                writer = self._criar_writer_historico(conn)
+                for r in sucessos:
+                    self._inserir_historico_pendencia(conn, r.id_pendencia, r.quantidade or 0, writer=writer)
+                if writer is not None:
+                    writer.flush()
+            self.logger.info(f"History re-written for {len(sucessos)} pendências restored from checkpoint")
+        except Exception as e:
+            self.logger.warning(f"Could not re-write history for checkpointed pendências: {e}")
+    
+    def _ordenar_execucao(self, pendencias: List[Pendencia]) -> List[Pendencia]:
+        estrategia = APP_CONFIG.get('ordem_execucao', 'custo')
+        if estrategia not in ESTRATEGIAS_ORDENACAO:
+            self.logger.warning(f"Unknown execution order '{estrategia}' - using 'id'")
+            estrategia = 'id'
+        
+        self.logger.info(f"Execution order strategy: {estrategia}")
+        pendencias = ordenar_pendencias(pendencias, estrategia, self.historico_duracoes)
+        
+        # Consultas com falhas recentes vão para o fim da fila
+        return self.circuit_breaker.ordenar(pendencias)
+    
+    def _executar_sequencial(
+        self,
+        pendencias: List[Pendencia],
+        checkpoint: Optional[CheckpointExecucao] = None,
+        preparo: Optional["_PreparoExecucao"] = None
+    ) -> List[ResultadoExecucao]:
+        fila = self._criar_fila(pendencias)
+        resultados: List[Optional[ResultadoExecucao]] = [None] * len(pendencias)
+        progresso = _ProgressoExecucao(len(pendencias), checkpoint, preparo.trava if preparo is not None else None)
+        
+        # Executar com conexão única
+        self.logger.info("Opening database connection for batch execution...")
+        try:
+            self._executar_worker(0, fila, resultados, progresso)
+        except KeyboardInterrupt:
+            self.logger.info(f"Execution interrupted by user after {progresso.concluidas} queries")
+        finally:
+            self._propagar_historico_pendente(progresso, preparo)
+        
+        self.logger.info("Batch execution completed - closing database connection")
+        return [r for r in resultados if r is not None]
+    
+    def _executar_concorrente(
+        self,
+        pendencias: List[Pendencia],
+        max_workers: int,
+        checkpoint: Optional[CheckpointExecucao] = None,
+        preparo: Optional["_PreparoExecucao"] = None
+    ) -> List[ResultadoExecucao]:
+        """Distribui as consultas entre workers, cada um com a sua própria conexão"""
+        fila = self._criar_fila(pendencias)
+        resultados: List[Optional[ResultadoExecucao]] = [None] * len(pendencias)
+        progresso = _ProgressoExecucao(len(pendencias), checkpoint, preparo.trava if preparo is not None else None)
+        
+        self.logger.info(f"Starting concurrent execution with {max_workers} workers")
+        falhas = []
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pendencias') as executor:
+            futuros = [
+                executor.submit(self._executar_worker, n, fila, resultados, progresso)
+                for n in range(1, max_workers + 1)
+            ]
+            try:
+                for futuro in as_completed(futuros):
+                    try:
+                        futuro.result()
+                    except Exception as e:
+                        self.logger.error(f"Worker failed: {e}")
+                        falhas.append(e)
+                        # As linhas de histórico no writer do worker se perderam
+                        progresso.historico_pendente = True
+            except KeyboardInterrupt:
+                self.logger.info("Execution interrupted by user - waiting for running queries to finish")
+                progresso.interromper.set()
+        self._propagar_historico_pendente(progresso, preparo)
+        
+        if len(falhas) == max_workers:
+            # Nenhum worker conseguiu trabalhar: mesma semântica da falha de conexão sequencial
+            raise falhas[0]
+        
+        self.logger.info("Concurrent execution completed")
+        return [r for r in resultados if r is not None]
+    
+    def _propagar_historico_pendente(self, progresso: "_ProgressoExecucao", preparo: Optional["_PreparoExecucao"]) -> None:
+        if progresso.historico_pendente and preparo is not None:
+            preparo.historico_pendente = True
+    
+    def _executar_distribuido(
+        self, pendencias: List[Pendencia], distribuicao: ExecucaoDistribuida, max_workers: int
+    ) -> List[ResultadoExecucao]:
+        """Executa, em lotes reivindicados na tabela de coordenação, a parte deste nó"""
+        distribuicao.coordenador.preparar(distribuicao.execucao, [p.id for p in pendencias])
+        fila = distribuicao.ordenar(pendencias)
+        tamanho_lote = max_workers * 2
+        
+        resultados: List[ResultadoExecucao] = []
+        for inicio in range(0, len(fila), tamanho_lote):
+            resultados.extend(self._executar_reivindicadas(fila[inicio:inicio + tamanho_lote], distribuicao, max_workers))
+        self.logger.info(f"Node {distribuicao.no} executed {len(resultados)} of {len(pendencias)} queries of run {distribuicao.execucao}")
+        return resultados
+    
+    def _executar_reivindicadas(
+        self, candidatas: List[Pendencia], distribuicao: ExecucaoDistribuida, max_workers: int
+    ) -> List[ResultadoExecucao]:
+        coordenador, execucao, no = distribuicao.coordenador, distribuicao.execucao, distribuicao.no
+        obtidas = set(coordenador.reivindicar(execucao, no, [p.id for p in candidatas], distribuicao.lease_ttl))
+        lote = [p for p in candidatas if p.id in obtidas]
+        if not lote:
+            return []
+        
+        workers = min(max_workers, len(lote))
+        try:
+            resultados = self._executar_concorrente(lote, workers) if workers > 1 else self._executar_sequencial(lote)
+        except Exception:
+            coordenador.liberar(execucao, no, [p.id for p in lote])
+            raise
+        
+        coordenador.concluir(execucao, no, resultados)
+        executadas = {r.id for r in resultados}
+        nao_executadas = [p.id for p in lote if p.id not in executadas]
+        if nao_executadas:
+            # Interrupção no meio do lote: devolver para outro nó assumir
+            coordenador.liberar(execucao, no, nao_executadas)
+        return resultados
+    
+    def _aguardar_execucao_distribuida(
+        self, por_id: Dict[int, Pendencia], distribuicao: ExecucaoDistribuida, max_workers: int
+    ) -> List[ResultadoExecucao]:
+        """Dono do resumo: espera os outros nós, assume leases vencidos e lê todos os resultados"""
+        coordenador, execucao = distribuicao.coordenador, distribuicao.execucao
+        por_id = dict(por_id)
+        inexistentes: Set[int] = set()
+        limite = time.monotonic() + distribuicao.espera_max
+        while True:
+            pendentes = [i for i in coordenador.pendentes(execucao) if i not in inexistentes]
+            if not pendentes:
+                break
+            if time.monotonic() >= limite:
+                self.logger.warning(f"Run {execucao}: {len(pendentes)} queries still unfinished by other nodes - summarizing without them")
+                break
+            desconhecidas = [i for i in pendentes if i not in por_id]
+            if desconhecidas:
+                self._completar_pendencias(por_id, desconhecidas, inexistentes)
+            # Itens de um nó que caiu voltam a ficar disponíveis quando o lease vence
+            candidatas = [por_id[i] for i in pendentes if i in por_id]
+            if not self._executar_reivindicadas(candidatas, distribuicao, max_workers):
+                coordenador.reivindicar_resumo(execucao, distribuicao.no, distribuicao.lease_ttl)
+                time.sleep(distribuicao.intervalo_espera)
+        
+        resultados = coordenador.resultados(execucao)
+        for r in resultados:
+            r.pendencia = por_id.get(r.id)
+        return resultados
+    
+    def _completar_pendencias(self, por_id: Dict[int, Pendencia], ids: List[int], inexistentes: Set[int]) -> None:
+        """Busca as pendências de itens que outro nó registrou na execução e que este nó não selecionou.
+        
+        Os filtros (incremental, cadência) rodam em cada nó: o dono do resumo pode não
+        conhecer itens de um nó que caiu. Ids que não existem mais vão para ``inexistentes``.
+        """
+        extraidas = self.extrair_pendencias()
+        if not extraidas:
+            # Extração falhou: tentar de novo na próxima volta da espera
+            return
+        for pendencia in extraidas:
+            por_id.setdefault(pendencia.id, pendencia)
+        faltando = [i for i in ids if i not in por_id]
+        if faltando:
+            self.logger.warning(f"Run items {faltando} are no longer in amm_consulta_pendencias - they will not be executed")
+            inexistentes.update(faltando)
+    
+    def _criar_fila(self, pendencias: List[Pendencia]) -> "queue.Queue":
+        """Cada item da fila é um grupo de (índice, pendência) que compartilham o mesmo SQL"""
+        fila: "queue.Queue" = queue.Queue()
+        for grupo in self._agrupar_consultas(pendencias):
+            fila.put(grupo)
+        return fila
+    
+    def _agrupar_consultas(self, pendencias: List[Pendencia]) -> List[List[Tuple[int, Pendencia]]]:
+        deduplicar = APP_CONFIG.get('deduplicar_consultas', True)
+        grupos: Dict[Any, List[Tuple[int, Pendencia]]] = {}
+        for i, pendencia in enumerate(pendencias, 1):
+            chave = pendencia.hash_consulta if deduplicar and pendencia.hash_consulta else ('id', i)
+            grupos.setdefault(chave, []).append((i, pendencia))
+        
+        if len(grupos) < len(pendencias):
+            self.logger.info(f"Deduplicated {len(pendencias)} pendências into {len(grupos)} distinct queries")
+        
+        # Dicionários preservam a ordem de inserção: o grupo entra na posição do primeiro membro
+        return list(grupos.values())
+    
+    def _executar_worker(
+        self,
+        numero: int,
+        fila: "queue.Queue",
+        resultados: List[Optional[ResultadoExecucao]],
+        progresso: "_ProgressoExecucao"
+    ) -> None:
+        """Consome a fila com uma conexão própria até esvaziá-la (numero 0 = modo sequencial).
+        
+        Se a conexão cair, reconecta e continua até ``max_retries`` tentativas
+        seguidas, esperando ``retry_delay`` segundos entre elas.
+        """
+        prefixo = f"[worker {numero}] " if numero else ""
+        max_retries = int(APP_CONFIG.get('max_retries', 3))
+        retry_delay = float(APP_CONFIG.get('retry_delay', 5))
+        writer = self._criar_writer_historico(None)
+        tentativas = 0
+        
+        while True:
+            inicio_conexao = time.perf_counter()
+            concluidas_antes = progresso.concluidas
+            try:
+                with self.db_service.get_connection() as conn:
+                    # O tempo de conexão é atribuído à primeira consulta executada nela
+                    tempo_conexao = time.perf_counter() - inicio_conexao
+                    self.logger.info(f"{prefixo}Database connection opened successfully - starting query execution")
+                    if writer is not None:
+                        writer.conn = conn
+                    
+                    try:
+                        self._consumir_fila(conn, fila, resultados, progresso, writer, tempo_conexao, prefixo)
+                    except BaseException as e:
+                        # Com a conexão perdida as linhas ficam no writer para depois da reconexão
+                        if writer is not None and not self.db_service.is_connection_error(e):
+                            writer.flush()
+                        raise
+                    
+                    if writer is not None and not writer.flush():
+                        if writer.ultimo_erro is not None and self.db_service.is_connection_error(writer.ultimo_erro):
+                            raise writer.ultimo_erro
+                        self.logger.error(f"{prefixo}{len(writer)} history rows were not written to amm_histPendencias")
+                        progresso.historico_pendente = True
+                return
+            
+            except Exception as e:
+                if not self.db_service.is_connection_error(e):
+                    raise
+                if progresso.concluidas > concluidas_antes:
+                    tentativas = 0
+                if tentativas >= max_retries:
+                    self.logger.error(f"{prefixo}Connection lost and {max_retries} reconnection attempts failed: {e}")
+                    if writer is not None and len(writer):
+                        progresso.historico_pendente = True
+                    raise
+                tentativas += 1
+                self.logger.warning(
+                    f"{prefixo}Database connection lost ({e}) - reconnecting in {retry_delay:.0f}s "
+                    f"(attempt {tentativas}/{max_retries})"
+                )
+                time.sleep(retry_delay)
+    
+    def _consumir_fila(
+        self,
+        conn,
+        fila: "queue.Queue",
+        resultados: List[Optional[ResultadoExecucao]],
+        progresso: "_ProgressoExecucao",
+        writer: Optional[HistoricoBatchWriter],
+        tempo_conexao: float,
+        prefixo: str
+    ) -> None:
+        total = progresso.total
+        while not progresso.deve_parar():
+            try:
+                grupo = fila.get_nowait()
+            except queue.Empty:
+                break
+            
+            i, pendencia = grupo[0]
+            self.logger.info(f"{prefixo}Executing query {i}/{total}: {pendencia.nome_pendencia}")
+            try:
+                resultado = self._executar_consulta_individual(
+                    conn, pendencia, i, total, writer, tempo_conexao
+                )
+            except Exception as e:
+                if self.db_service.is_connection_error(e):
+                    # Devolver o grupo à fila para ser refeito após a reconexão
+                    fila.put(grupo)
+                    raise
+                self.logger.error(f"Error executing query {i}: {str(e)}")
+                resultado = self._resultado_erro(pendencia, e)
+            tempo_conexao = 0.0
+            
+            concluidos = [(i, resultado)]
+            # Mesmo SQL em outras pendências: reaproveitar a contagem
+            for j, membro in grupo[1:]:
+                concluidos.append((j, self._replicar_resultado(conn, resultado, membro, writer)))
+            
+            for j, r in concluidos:
+                resultados[j - 1] = r
+                with progresso.lock:
+                    progresso.concluidas += 1
+                    if progresso.checkpoint is not None:
+                        progresso.checkpoint.registrar(r)
+                    self._registrar_progresso(r, j, progresso.concluidas, total)
+    
+    def _replicar_resultado(
+        self,
+        conn,
+        origem: ResultadoExecucao,
+        pendencia: Pendencia,
+        writer: Optional[HistoricoBatchWriter] = None
+    ) -> ResultadoExecucao:
+        """Resultado de uma pendência cujo SQL é idêntico ao de outra já executada"""
+        if origem.status == 'erro':
+            resultado = self._resultado_erro(pendencia, origem.erro)
+        elif origem.status == 'ignorada':
+            resultado = self._resultado_ignorado(pendencia, origem.erro)
+        else:
+            tempos = {'conexao': 0.0, 'execucao': 0.0, 'busca': 0.0, 'usuarios': 0.0, 'historico': 0.0}
+            inicio = time.perf_counter()
+            self._inserir_historico_pendencia(conn, pendencia.id_pendencia, origem.quantidade, writer=writer, tempos=tempos)
+            tempos['total'] = time.perf_counter() - inicio
+            resultado = ResultadoExecucao(
+                id=pendencia.id,
+                id_pendencia=pendencia.id_pendencia,
+                nome_pendencia=pendencia.nome_pendencia,
+                id_grupo=pendencia.id_grupo,
+                quantidade=origem.quantidade,
+                status='sucesso',
+                exibe_contagem=pendencia.exibe_contagem,
+                pendencia=pendencia,
+                tempos={fase: round(valor, 4) for fase, valor in tempos.items()}
+            )
+        
+        resultado.id_consulta_origem = origem.id
+        return resultado
+    
+    def _registrar_progresso(self, resultado: ResultadoExecucao, i: int, concluidas: int, total: int) -> None:
+        if resultado.status == 'sucesso':
+            self.logger.info(f"Query {i} completed successfully - {resultado.quantidade} records")
+        elif resultado.status == 'ignorada':
+            self.logger.warning(f"Query {i} skipped: {resultado.erro}")
+        else:
+            self.logger.warning(f"Query {i} failed: {resultado.erro}")
+        
+        # Progress log every 10 queries
+        if concluidas % 10 == 0:
+            self.logger.info(f"Progress: {concluidas}/{total} queries processed ({(concluidas/total*100):.1f}%)")
+    
+    def _resultado_erro(self, pendencia: Pendencia, erro: Any) -> ResultadoExecucao:
+        return ResultadoExecucao(
+            id=pendencia.id,
+            id_pendencia=pendencia.id_pendencia,
+            nome_pendencia=pendencia.nome_pendencia,
+            id_grupo=pendencia.id_grupo,
+            quantidade=None,
+            status='erro',
+            exibe_contagem=pendencia.exibe_contagem,
+            erro=str(erro),
+            pendencia=pendencia
+        )
+    
+    def _resultado_ignorado(self, pendencia: Pendencia, motivo: str) -> ResultadoExecucao:
+        return ResultadoExecucao(
+            id=pendencia.id,
+            id_pendencia=pendencia.id_pendencia,
+            nome_pendencia=pendencia.nome_pendencia,
+            id_grupo=pendencia.id_grupo,
+            quantidade=None,
+            status='ignorada',
+            exibe_contagem=pendencia.exibe_contagem,
+            erro=motivo,
+            pendencia=pendencia
+        )
+    
     def _executar_consulta_individual(
         self, 
         conn, 
         pendencia: Pendencia, 
         index: int, 
-        total: int
+        total: int,
+        writer: Optional[HistoricoBatchWriter] = None,
+        tempo_conexao: float = 0.0
     ) -> ResultadoExecucao:
         nome_display = pendencia.nome_pendencia or f"Pendência {pendencia.id_pendencia}"
         
+        if not self.circuit_breaker.permitir(pendencia.id_pendencia):
+            motivo = self.circuit_breaker.motivo_bloqueio(pendencia.id_pendencia) or "Circuit open"
+            return self._resultado_ignorado(pendencia, motivo)
+        
+        # Tempos por fase, em segundos
+        tempos = {'conexao': tempo_conexao, 'execucao': 0.0, 'busca': 0.0, 'usuarios': 0.0, 'historico': 0.0}
+        inicio_total = time.perf_counter()
+        resultado = self._executar_e_registrar(conn, pendencia, nome_display, writer, tempos)
+        tempos['total'] = tempo_conexao + (time.perf_counter() - inicio_total)
+        resultado.tempos = {fase: round(valor, 4) for fase, valor in tempos.items()}
+        return resultado
+    
+    def _executar_e_registrar(
+        self,
+        conn,
+        pendencia: Pendencia,
+        nome_display: str,
+        writer: Optional[HistoricoBatchWriter],
+        tempos: Dict[str, float]
+    ) -> ResultadoExecucao:
+        inicio = time.perf_counter()
+        timeout_anterior = None
+        fase_consulta = True
         try:
             self.logger.debug(f"Creating cursor for {nome_display}")
             cursor = conn.cursor()
             
+            if self.query_timeout > 0:
+                timeout_anterior = self.db_service.set_query_timeout(conn, self.query_timeout)
+            
             self.logger.debug(f"Executing SQL for {nome_display}: {pendencia.consulta_pendencia[:100]}...")
             cursor.execute(pendencia.consulta_pendencia)
+            inicio_busca = time.perf_counter()
+            tempos['execucao'] = inicio_busca - inicio
             
             self.logger.debug(f"Fetching results for {nome_display}")
             row = cursor.fetchone()
+            tempos['busca'] = time.perf_counter() - inicio_busca
+            
+            fase_consulta = False
+            if timeout_anterior is not None:
+                self.db_service.set_query_timeout(conn, timeout_anterior)
+            self.circuit_breaker.registrar_sucesso(pendencia.id_pendencia, time.perf_counter() - inicio)
             
             if row and len(row) > 0:
                 quantidade = int(row[0]) if row[0] is not None else 0
                 self.logger.debug(f"Query result for {nome_display}: {quantidade} records")
                 
                 self.logger.debug(f"Inserting history for {nome_display}")
-                self._inserir_historico_pendencia(conn, pendencia.id_pendencia, quantidade)
+                self._inserir_historico_pendencia(conn, pendencia.id_pendencia, quantidade, writer=writer, tempos=tempos)
                 
                 return ResultadoExecucao(
                     id=pendencia.id,
@@ -238,12 +977,12 @@ class PendenciasService:
                     quantidade=quantidade,
                     status='sucesso',
                     exibe_contagem=pendencia.exibe_contagem,
-                    consulta_preview=pendencia.consulta_pendencia[:100] + "..." if len(pendencia.consulta_pendencia) > 100 else pendencia.consulta_pendencia
+                    pendencia=pendencia
                 )
             else:
                 self.logger.warning(f"No results for query: {nome_display}")
                 
-                self._inserir_historico_pendencia(conn, pendencia.id_pendencia, 0)
+                self._inserir_historico_pendencia(conn, pendencia.id_pendencia, 0, writer=writer, tempos=tempos)
                 
                 return ResultadoExecucao(
                     id=pendencia.id,
@@ -252,38 +991,40 @@ class PendenciasService:
                     id_grupo=pendencia.id_grupo,
                     quantidade=0,
                     status='sucesso',
-                    exibe_contagem=pendencia.exibe_contagem
+                    exibe_contagem=pendencia.exibe_contagem,
+                    pendencia=pendencia
                 )
                 
         except Exception as e:
+            if self.db_service.is_connection_error(e):
+                raise
+            if fase_consulta:
+                tempos['execucao'] = time.perf_counter() - inicio
+                if timeout_anterior is not None:
+                    self.db_service.set_query_timeout(conn, timeout_anterior)
+                timeout = self.db_service.is_timeout_error(e)
+                self.circuit_breaker.registrar_falha(pendencia.id_pendencia, tempos['execucao'], timeout=timeout)
+                if timeout:
+                    self.logger.error(f"Query timeout after {self.query_timeout}s for {nome_display}")
+                    return self._resultado_erro(pendencia, f"Query timeout after {self.query_timeout}s: {e}")
             self.logger.error(f"Error executing query for {nome_display}: {str(e)}")
-            return ResultadoExecucao(
-                id=pendencia.id,
-                id_pendencia=pendencia.id_pendencia,
-                nome_pendencia=pendencia.nome_pendencia,
-                id_grupo=pendencia.id_grupo,
-                quantidade=None,
-                status='erro',
-                exibe_contagem=pendencia.exibe_contagem,
-                erro=str(e),
-                consulta_preview=pendencia.consulta_pendencia[:100] + "..." if len(pendencia.consulta_pendencia) > 100 else pendencia.consulta_pendencia
-            )
+            return self._resultado_erro(pendencia, e)
     
     def _criar_resumo_execucao(
         self, 
         resultados: List[ResultadoExecucao], 
         total: int, 
-        executadas: int, 
-        erros: int
+        duracao_total: Optional[float] = None
     ) -> ResumoExecucao:
-        # Calcular estatísticas
-        resultados_com_dados = [r for r in resultados if r.status == 'sucesso' and r.quantidade and r.quantidade > 0]
-        total_pendencias = sum(r.quantidade for r in resultados_com_dados)
+        # Estatísticas calculadas sobre a visão colunar dos resultados
+        tabela = TabelaResultados(resultados)
+        top_n = int(APP_CONFIG.get('profile_top_n', 10))
+        est = calcular_estatisticas(resultados, tabela, top_n=5, top_lentas=top_n)
         
         # Top 5 pendências
-        top_pendencias = sorted(resultados_com_dados, key=lambda x: x.quantidade, reverse=True)[:5]
         top_list = []
-        for i, pend in enumerate(top_pendencias, 1):
+        for i, idx in enumerate(est.indices_top, 1):
+            pend = resultados[idx]
             nome_display = pend.nome_pendencia or f"Pendência {pend.id_pendencia}"
             top_list.append({
                 'posicao': i,
@@ -292,21 +1033,61 @@ class PendenciasService:
                 'quantidade': pend.quantidade
             })
         
+        # Consultas mais lentas
+        lentas_list = []
+        for i, idx in enumerate(est.indices_lentas, 1):
+            r = resultados[idx]
+            lentas_list.append({
+                'posicao': i,
+                'id': r.id,
+                'nome': r.nome_pendencia or f"Pendência {r.id_pendencia}",
+                'status': r.status,
+                'tempos': r.tempos
+            })
+        
         return ResumoExecucao(
             timestamp=datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
             total_consultas=total,
-            consultas_executadas=executadas,
-            consultas_com_erro=erros,
-            total_pendencias_encontradas=total_pendencias,
+            consultas_executadas=est.executadas,
+            consultas_com_erro=est.erros,
+            consultas_ignoradas=est.ignoradas,
+            consultas_reaproveitadas=est.reaproveitadas,
+            total_pendencias_encontradas=est.total_pendencias,
             resultados=resultados,
-            top_pendencias=top_list
+            top_pendencias=top_list,
+            duracao_total=round(duracao_total, 3) if duracao_total is not None else None,
+            tempos_por_fase={fase: round(valor, 3) for fase, valor in est.tempos_por_fase.items()},
+            consultas_mais_lentas=lentas_list,
+            grupos=est.grupos,
+            tabela=tabela
         )
     
+    def _detectar_anomalias(self, resumo: ResumoExecucao) -> List[Anomalia]:
+        """Compara as contagens desta execução com o histórico recente de cada consulta"""
+        tabela = resumo.tabela
+        if tabela is None:
+            return []
+        try:
+            detector = DetectorAnomalias(
+                SerieHistorica(self.output_dir / NOME_SERIE),
+                janela_dias=APP_CONFIG.get('anomalias_janela_dias', 30),
+                limite=APP_CONFIG.get('anomalias_limite', 3.5),
+                minimo_dias=APP_CONFIG.get('anomalias_minimo_dias', 7),
+                variacao_minima=APP_CONFIG.get('anomalias_variacao_minima', 0.2)
+            )
+            validas = tabela.mascara_status('sucesso') & tabela.tem_quantidade
+            nomes = {r.id: r.nome_pendencia for r in resumo.resultados if r.nome_pendencia}
+            return detector.detectar(
+                datetime.now().date(), tabela.ids[validas], tabela.quantidade[validas], nomes
+            )
+        except Exception as e:
+            self.logger.warning(f"Anomaly detection failed: {e}")
+            return []
+    
     def _salvar_resultados(self, resumo: ResumoExecucao) -> None:
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"resultados_execucao_pendencias_{timestamp}.json"
-            filepath = self.output_dir / filename
+            caminho_base = self.output_dir / f"resultados_execucao_pendencias_{timestamp}"
             
             # Converter resultados para dict
             data = {
@@ -314,9 +1095,42 @@ class PendenciasService:
                 'total_consultas': resumo.total_consultas,
                 'consultas_executadas': resumo.consultas_executadas,
                 'consultas_com_erro': resumo.consultas_com_erro,
+                'consultas_ignoradas': resumo.consultas_ignoradas,
+                'consultas_reaproveitadas': resumo.consultas_reaproveitadas,
                 'total_pendencias_encontradas': resumo.total_pendencias_encontradas,
                 'taxa_sucesso': resumo.taxa_sucesso,
                 'top_pendencias': resumo.top_pendencias,
+                'duracao_total_segundos': resumo.duracao_total,
+                'tempos_por_fase': resumo.tempos_por_fase,
+                'consultas_mais_lentas': resumo.consultas_mais_lentas,
+                'execucao_parcial': resumo.parcial,
+                'grupos_executados': resumo.grupos_executados,
+                'anomalias': [
+                    {
+                        'id': a.id,
+                        'nome_pendencia': a.nome_pendencia,
+                        'tipo': a.tipo,
+                        'quantidade': a.quantidade,
+                        'mediana': a.mediana,
+                        'desvio_mad': a.desvio,
+                        'escore': a.escore,
+                        'dias_historico': a.dias_historico
+                    }
+                    for a in resumo.anomalias
+                ],
+                'grupos': [
+                    {
+                        'id_grupo': g.id_grupo,
+                        'consultas': g.consultas,
+                        'executadas': g.executadas,
+                        'erros': g.erros,
+                        'ignoradas': g.ignoradas,
+                        'total_pendencias': g.total_pendencias,
+                        'taxa_sucesso': g.taxa_sucesso,
+                        'duracao_segundos': round(g.duracao, 3)
+                    }
+                    for g in resumo.grupos
+                ],
                 'resultados': {
                     str(r.id): {
                         'id': r.id,
@@ -327,25 +1141,69 @@ class PendenciasService:
                         'exibe_contagem': r.exibe_contagem,
                         'status': r.status,
                         'erro': r.erro,
-                        'consulta_preview': r.consulta_preview
+                        'consulta_preview': r.consulta_preview,
+                        'tempos': r.tempos,
+                        'id_consulta_origem': r.id_consulta_origem,
+                        'do_historico': r.do_historico
                     }
                     for r in resumo.resultados
                 }
             }
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            filepath = salvar_resultados(
+                caminho_base, data,
+                formato=APP_CONFIG.get('formato_resultados', 'json'),
+                compressao=APP_CONFIG.get('compressao_resultados', 'nenhuma')
+            )
             
+            self._registrar_no_catalogo(filepath, data)
+            self._registrar_na_serie(resumo)
             
         except Exception as e:
             self.logger.error(f"Error saving results: {e}")
     
+    def _registrar_no_catalogo(self, filepath: Path, data: Dict[str, Any]) -> None:
+        # O arquivo já está salvo; uma falha no índice não invalida a execução
+        try:
+            CatalogoExecucoes(self.output_dir / NOME_CATALOGO).registrar(filepath, data)
+        except Exception as e:
+            self.logger.warning(f"Could not register {filepath.name} in the run catalog: {e}")
+    
+    def _registrar_na_serie(self, resumo: ResumoExecucao) -> None:
+        if resumo.tabela is None:
+            return
+        try:
+            SerieHistorica(self.output_dir / NOME_SERIE).adicionar(datetime.now().date(), resumo.tabela)
+        except Exception as e:
+            self.logger.warning(f"Could not append run to the history series: {e}")
+    
+    def _plano_cadencias(self) -> PlanoCadencias:
+        return PlanoCadencias.carregar(
+            Path(APP_CONFIG.get('cadencias_arquivo', 'config/cadencias.json')),
+            padrao=APP_CONFIG.get('cadencia_padrao', 'diaria'),
+            espalhar=APP_CONFIG.get('espalhar_cadencias', True)
+        )
+    
+    def _estado_cadencias(self) -> EstadoCadencias:
+        return EstadoCadencias(self.output_dir / NOME_ESTADO_CADENCIAS)
+    
+    def _registrar_cadencias(self, resumo: ResumoExecucao, momento: datetime) -> None:
+        # Toda execução (completa, por grupo ou por cadência) conta como atualização das consultas com sucesso
+        try:
+            self._estado_cadencias().registrar((r.id for r in resumo.resultados if r.status == 'sucesso'), momento)
+        except Exception as e:
+            self.logger.warning(f"Could not update refresh cadence state: {e}")
+    
     def imprimir_resumo_final(self, resumo: ResumoExecucao) -> None:
         print("\n" + "=" * 60)
         print("EXECUTION SUMMARY")
         print("=" * 60)
         print(f"Successful queries: {resumo.consultas_executadas}")
         print(f"Failed queries: {resumo.consultas_com_erro}")
+        if resumo.consultas_ignoradas:
+            print(f"Skipped queries (circuit open): {resumo.consultas_ignoradas}")
+        if resumo.consultas_reaproveitadas:
+            print(f"Served from today's history (incremental): {resumo.consultas_reaproveitadas}")
         print(f"Success rate: {resumo.taxa_sucesso:.1f}%")
         print(f"Total pendências found: {resumo.total_pendencias_encontradas}")
         
@@ -354,4 +1212,81 @@ class PendenciasService:
             for top in resumo.top_pendencias:
                 print(f"   {top['posicao']}. ID {top['id']} - {top['nome']}: {top['quantidade']} items")
         
-        print("Reports saved successfully!")
\ No newline at end of file
+        if len(resumo.grupos) > 1:
+            print(f"\nPENDÊNCIAS BY GROUP:")
+            for g in resumo.grupos:
+                nome_grupo = f"Group {g.id_grupo}" if g.id_grupo is not None else "No group"
+                print(
+                    f"   {nome_grupo}: {g.total_pendencias} items in {g.consultas} queries "
+                    f"({g.executadas} ok, {g.erros} failed, {g.taxa_sucesso:.1f}% success)"
+                )
+        
+        if resumo.anomalias:
+            print(f"\nANOMALIES ({len(resumo.anomalias)} pendências outside their recent range):")
+            for a in resumo.anomalias:
+                nome = a.nome_pendencia or f"ID {a.id}"
+                print(
+                    f"   [{a.tipo}] ID {a.id} - {nome}: {a.quantidade:,.0f} items "
+                    f"(median {a.mediana:,.0f} over {a.dias_historico} days, score {a.escore:+.1f})"
+                )
+        
+        if resumo.duracao_total is not None:
+            print(f"\nTotal execution time: {resumo.duracao_total:.1f}s")
+        if resumo.tempos_por_fase:
+            fases = ", ".join(f"{fase}: {valor:.1f}s" for fase, valor in resumo.tempos_por_fase.items() if fase != 'total')
+            print(f"Time per phase (summed over queries): {fases}")
+        
+        if resumo.consultas_mais_lentas:
+            print(f"\nTOP {len(resumo.consultas_mais_lentas)} SLOWEST QUERIES:")
+            for lenta in resumo.consultas_mais_lentas:
+                t = lenta['tempos']
+                print(
+                    f"   {lenta['posicao']}. ID {lenta['id']} - {lenta['nome']}: {t.get('total', 0):.2f}s "
+                    f"(execute {t.get('execucao', 0):.2f}s, fetch {t.get('busca', 0):.2f}s, "
+                    f"users {t.get('usuarios', 0):.2f}s, history {t.get('historico', 0):.2f}s)"
+                )
+        
+        print("Reports saved successfully!")
+
+
+# Literais de string SQL ('...' com '' como escape)
+_LITERAL_SQL = re.compile(r"('(?:[^']|'')*')")
+
+
+@dataclass
+class _PreparoExecucao:
+    """Estado de uma execução entre a preparação e a finalização (compartilhado pelos caminhos síncrono e assíncrono)"""
+    inicio_execucao: float
+    momento_inicio: datetime
+    grupos: Optional[List[int]]
+    parcial: bool
+    pendencias: List[Pendencia]
+    total_consultas: int
+    reaproveitados: List[ResultadoExecucao]
+    concluidos: Dict[int, ResultadoExecucao]
+    checkpoint: Optional[CheckpointExecucao]
+    max_workers: int
+    distribuicao: Optional[ExecucaoDistribuida] = None
+    # Linhas de histórico não gravadas: o checkpoint fica para a próxima execução regravá-las
+    historico_pendente: bool = False
+    trava: Optional[TravaExecucao] = None
+
+
+class _ProgressoExecucao:
+    """Estado compartilhado entre os workers de uma execução"""
+    
+    def __init__(self, total: int, checkpoint: Optional[CheckpointExecucao] = None, trava: Optional[TravaExecucao] = None):
+        self.total = total
+        self.checkpoint = checkpoint
+        self.trava = trava
+        self.concluidas = 0
+        self.lock = threading.Lock()
+        self.interromper = threading.Event()
+        # Linhas de histórico que algum worker não conseguiu gravar
+        self.historico_pendente = False
+    
+    def deve_parar(self) -> bool:
+        """Interrupção pedida ou trava perdida: nenhum worker começa outra consulta"""
+        if self.trava is not None and self.trava.perdida:
+            self.interromper.set()
+        return self.interromper.is_set()
@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.models.pendencia import Pendencia, ResultadoExecucao, ResumoExecucao
+from app.services.distribuicao import ExecucaoDistribuida
+from app.services.historico import HistoricoBatchWriter
+from app.services.pendencias import PendenciasService, _PreparoExecucao
+from app.services.trava_execucao import TravaExecucao, TravaPerdida
+
+try:
+    from config.settings import APP_CONFIG
+except ImportError:
+    APP_CONFIG = {'output_dir': 'output'}
+
+
+class PendenciasServiceAsync:
+    """Execução das consultas de pendências num event loop asyncio.
+
+    O pyodbc é bloqueante, então cada consulta roda num ``ThreadPoolExecutor``
+    limitado; um ``asyncio.Semaphore`` controla quantas instruções ficam no banco ao
+    mesmo tempo (``max_concorrencia``, limitado ao tamanho do pool), e o restante
+    espera no loop sem ocupar thread nem conexão. Cada thread acumula as linhas de
+    histórico num writer próprio, gravado em lote ao atingir ``history_flush_size``
+    e ao final da execução; a preparação e a serialização dos resultados também
+    saem do loop, que continua livre para atender ``status()`` durante a execução.
+
+    Cancelar a task da execução (ou chamar ``cancelar()``) descarta as consultas
+    que ainda não começaram, espera as que estão no banco terminarem e mantém o
+    checkpoint para a próxima execução retomar de onde parou.
+    """
+
+    def __init__(self, servico: Optional[PendenciasService] = None, max_concorrencia: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.servico = servico or PendenciasService()
+        self.max_concorrencia = self.servico.db_service.limitar_ao_pool(max(1, int(
+            max_concorrencia or APP_CONFIG.get('async_max_concorrencia') or APP_CONFIG.get('max_workers', 4)
+        )), 'ASYNC_MAX_CONCURRENCY')
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concorrencia, thread_name_prefix='pendencias-async')
+        self._lock_checkpoint = threading.Lock()
+        self._tarefa: Optional[asyncio.Task] = None
+        self._status: Dict[str, Any] = self._status_inicial()
+
+    @staticmethod
+    def _status_inicial() -> Dict[str, Any]:
+        return {'em_execucao': False, 'fase': 'ociosa', 'total': 0, 'concluidas': 0, 'erros': 0, 'iniciada_em': None}
+
+    def status(self) -> Dict[str, Any]:
+        """Progresso da execução atual (leitura barata, sem acesso ao banco)"""
+        return dict(self._status)
+
+    @property
+    def em_execucao(self) -> bool:
+        return self._tarefa is not None and not self._tarefa.done()
+
+    def cancelar(self) -> bool:
+        """Cancela a execução em andamento; deve ser chamado no thread do event loop"""
+        if not self.em_execucao:
+            return False
+        self.logger.info("Cancelling async run")
+        self._status['fase'] = 'cancelando'
+        self._tarefa.cancel()
+        return True
+
+    def fechar(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def executar_todas_consultas(
+        self,
+        grupos: Optional[Iterable[int]] = None,
+        apenas_vencidas: bool = False,
+        distribuicao: Optional[ExecucaoDistribuida] = None
+    ) -> Optional[ResumoExecucao]:
+        """Mesmo contrato de ``PendenciasService.executar_todas_consultas``, aguardável.
+
+        A execução distribuída já divide o trabalho por leases entre os nós e roda no
+        caminho síncrono, num thread do executor.
+        """
+        if self.em_execucao:
+            raise RuntimeError("An async run is already in progress on this service")
+        loop = asyncio.get_running_loop()
+        self._tarefa = asyncio.current_task()
+        self._status = {**self._status_inicial(), 'em_execucao': True, 'fase': 'preparando',
+                        'iniciada_em': datetime.now().isoformat(timespec='seconds')}
+        try:
+            if distribuicao is not None:
+                self._status['fase'] = 'executando'
+                return await self._aguardar_thread(loop.run_in_executor(
+                    self._executor, self.servico.executar_todas_consultas, grupos, apenas_vencidas, distribuicao
+                ))
+
+            trava = self.servico._criar_trava()
+            if trava is None:
+                return await self._executar_consultas(loop, grupos, apenas_vencidas)
+            try:
+                await self._aguardar_thread(loop.run_in_executor(
+                    self._executor, trava.adquirir, float(APP_CONFIG.get('trava_espera', 0))
+                ))
+                return await self._executar_consultas(loop, grupos, apenas_vencidas, trava)
+            finally:
+                # Sem efeito se a trava não foi obtida; cobre também o cancelamento durante a espera
+                await asyncio.shield(loop.run_in_executor(self._executor, trava.liberar))
+        finally:
+            self._status['em_execucao'] = False
+            self._status['fase'] = 'ociosa'
+            self._tarefa = None
+
+    async def _executar_consultas(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        grupos: Optional[Iterable[int]],
+        apenas_vencidas: bool,
+        trava: Optional[TravaExecucao] = None
+    ) -> Optional[ResumoExecucao]:
+        preparo: Optional[_PreparoExecucao] = await self._aguardar_thread(loop.run_in_executor(
+            self._executor, self.servico._preparar_execucao, grupos, apenas_vencidas
+        ))
+        if preparo is None:
+            return None
+        preparo.trava = trava
+
+        self._status.update(fase='executando', total=len(preparo.pendencias))
+        try:
+            resultados = await self._executar_pendencias(loop, preparo)
+        except asyncio.CancelledError:
+            if preparo.checkpoint is not None:
+                preparo.checkpoint.fechar()
+            self.logger.info(
+                f"Async run cancelled after {self._status['concluidas']}/{self._status['total']} queries"
+                + (" - progress kept in checkpoint" if preparo.checkpoint is not None else "")
+            )
+            raise
+        except Exception as e:
+            self.servico._registrar_falha_critica(preparo, e)
+            return None
+
+        # Resumo, anomalias e serialização do arquivo de resultados fora do loop
+        self._status['fase'] = 'finalizando'
+        return await self._aguardar_thread(loop.run_in_executor(
+            self._executor, self.servico._finalizar_execucao, preparo, resultados
+        ))
+
+    async def _executar_pendencias(
+        self, loop: asyncio.AbstractEventLoop, preparo: _PreparoExecucao
+    ) -> List[ResultadoExecucao]:
+        if not preparo.pendencias:
+            self.logger.info("All pendências are fresh - nothing to execute")
+            return []
+
+        # Criado aqui: no Python 3.9 o semáforo se liga ao loop ativo na criação
+        semaforo = asyncio.Semaphore(self.max_concorrencia)
+        total = len(preparo.pendencias)
+        resultados: List[Optional[ResultadoExecucao]] = [None] * total
+        # Um writer de histórico por thread do executor, usado só por ela enquanto tem uma conexão
+        writers: Dict[int, HistoricoBatchWriter] = {}
+        tarefas = [
+            loop.create_task(self._executar_grupo(loop, semaforo, grupo, preparo, resultados, writers))
+            for grupo in self.servico._agrupar_consultas(preparo.pendencias)
+        ]
+        self.logger.info(f"Starting async execution of {len(tarefas)} distinct queries with up to {self.max_concorrencia} concurrent statements")
+        try:
+            await asyncio.gather(*tarefas)
+        except BaseException:
+            # Cancelamento ou falha de conexão definitiva: nada novo começa, o que está no banco termina
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.wait(tarefas)
+            await self._aguardar_thread(loop.run_in_executor(
+                self._executor, self._gravar_historico, preparo, list(writers.values())
+            ))
+            raise
+
+        await self._aguardar_thread(loop.run_in_executor(
+            self._executor, self._gravar_historico, preparo, list(writers.values())
+        ))
+        self.logger.info("Async execution completed")
+        return [r for r in resultados if r is not None]
+
+    async def _executar_grupo(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        semaforo: asyncio.Semaphore,
+        grupo: List[Tuple[int, Pendencia]],
+        preparo: _PreparoExecucao,
+        resultados: List[Optional[ResultadoExecucao]],
+        writers: Dict[int, HistoricoBatchWriter]
+    ) -> None:
+        """Executa um grupo de pendências com o mesmo SQL, reconectando até ``max_retries`` vezes"""
+        max_retries = int(APP_CONFIG.get('max_retries', 3))
+        retry_delay = float(APP_CONFIG.get('retry_delay', 5))
+        tentativas = 0
+        while True:
+            try:
+                async with semaforo:
+                    if preparo.trava is not None and preparo.trava.perdida:
+                        # Outro processo detém o ambiente: as consultas restantes não começam
+                        raise TravaPerdida(f"Run stopped after losing the run lock (query {grupo[0][0]} not started)")
+                    concluidos = await self._aguardar_thread(loop.run_in_executor(
+                        self._executor, self._executar_grupo_bloqueante, grupo, preparo, writers
+                    ))
+                break
+            except Exception as e:
+                if not self.servico.db_service.is_connection_error(e) or tentativas >= max_retries:
+                    raise
+                tentativas += 1
+                self.logger.warning(
+                    f"Database connection lost ({e}) - retrying query {grupo[0][0]} in {retry_delay:.0f}s "
+                    f"(attempt {tentativas}/{max_retries})"
+                )
+                await asyncio.sleep(retry_delay)
+
+        for j, r in concluidos:
+            resultados[j - 1] = r
+            self._status['concluidas'] += 1
+            if r.status == 'erro':
+                self._status['erros'] += 1
+            self.servico._registrar_progresso(r, j, self._status['concluidas'], len(resultados))
+
+    def _executar_grupo_bloqueante(
+        self, grupo: List[Tuple[int, Pendencia]], preparo: _PreparoExecucao, writers: Dict[int, HistoricoBatchWriter]
+    ) -> List[Tuple[int, ResultadoExecucao]]:
+        servico = self.servico
+        total = len(preparo.pendencias)
+        i, pendencia = grupo[0]
+        inicio_conexao = time.perf_counter()
+        with servico.db_service.get_connection() as conn:
+            tempo_conexao = time.perf_counter() - inicio_conexao
+            writer = writers.get(threading.get_ident())
+            if writer is None:
+                writer = servico._criar_writer_historico(conn)
+                if writer is not None:
+                    writers[threading.get_ident()] = writer
+            else:
+                writer.conn = conn
+            self.logger.info(f"Executing query {i}/{total}: {pendencia.nome_pendencia}")
+            try:
+                resultado = servico._executar_consulta_individual(conn, pendencia, i, total, writer, tempo_conexao)
+            except Exception as e:
+                if servico.db_service.is_connection_error(e):
+                    raise
+                self.logger.error(f"Error executing query {i}: {str(e)}")
+                resultado = servico._resultado_erro(pendencia, e)
+
+            concluidos = [(i, resultado)]
+            # Mesmo SQL em outras pendências: reaproveitar a contagem
+            for j, membro in grupo[1:]:
+                concluidos.append((j, servico._replicar_resultado(conn, resultado, membro, writer)))
+
+        if preparo.checkpoint is not None:
+            with self._lock_checkpoint:
+                for _, r in concluidos:
+                    preparo.checkpoint.registrar(r)
+        return concluidos
+
+    def _gravar_historico(self, preparo: _PreparoExecucao, writers: List[HistoricoBatchWriter]) -> None:
+        """Grava numa conexão do pool as linhas de histórico que ficaram nos writers dos threads.
+
+        Se alguma linha não puder ser gravada, o checkpoint é mantido ao final da
+        execução: a próxima execução do dia o retoma e regrava o histórico.
+        """
+        pendentes = [w for w in writers if len(w)]
+        if not pendentes:
+            return
+        max_retries = int(APP_CONFIG.get('max_retries', 3))
+        retry_delay = float(APP_CONFIG.get('retry_delay', 5))
+        db_service = self.servico.db_service
+        tentativas = 0
+        while True:
+            try:
+                with db_service.get_connection() as conn:
+                    for writer in pendentes:
+                        writer.conn = conn
+                        if not writer.flush() and writer.ultimo_erro is not None \
+                                and db_service.is_connection_error(writer.ultimo_erro):
+                            raise writer.ultimo_erro
+                break
+            except Exception as e:
+                if not db_service.is_connection_error(e) or tentativas >= max_retries:
+                    self.logger.error(f"Could not write history batch: {e}")
+                    break
+                tentativas += 1
+                self.logger.warning(
+                    f"Database connection lost ({e}) - retrying history write in {retry_delay:.0f}s "
+                    f"(attempt {tentativas}/{max_retries})"
+                )
+                time.sleep(retry_delay)
+
+        # O writer mantém as linhas que falharam
+        nao_gravadas = sum(len(w) for w in pendentes)
+        if nao_gravadas:
+            preparo.historico_pendente = True
+            self.logger.error(f"{nao_gravadas} history rows were not written to amm_histPendencias")
+
+    @staticmethod
+    async def _aguardar_thread(futuro: "asyncio.Future") -> Any:
+        """Aguarda um trabalho no executor; se cancelado, espera o thread terminar antes de propagar"""
+        try:
+            return await asyncio.shield(futuro)
+        except asyncio.CancelledError:
+            # O thread não pode ser interrompido (a instrução já está no banco); cancelamentos repetidos não encurtam a espera
+            while not futuro.done():
+                try:
+                    await asyncio.wait([futuro])
+                except asyncio.CancelledError:
+                    pass
+            if not futuro.cancelled():
+                futuro.exception()
+            raise
@@ -0,0 +1,180 @@
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+import pandas as pd
+
+from app.models.pendencia import ResultadoExecucao, ResumoGrupo, TabelaResultados
+
+T = TypeVar('T')
+
+
+def top_k(itens: Iterable[T], k: int, chave: Callable[[T], Any]) -> List[T]:
+    """Os k maiores itens por ``chave`` com um heap de tamanho k (empates na ordem original)"""
+    if k <= 0:
+        return []
+    return heapq.nlargest(k, itens, key=chave)
+
+
+def indices_maiores(valores: np.ndarray, mascara: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos k maiores valores dentro da máscara, do maior para o menor (empates na ordem original)"""
+    candidatos = np.flatnonzero(mascara)
+    if k <= 0 or len(candidatos) == 0:
+        return candidatos[:0]
+    selecionados = valores[candidatos]
+    if k < len(candidatos):
+        # argpartition separa os k maiores em O(N); só os candidatos empatados ou acima do corte são ordenados
+        corte = selecionados[np.argpartition(selecionados, len(selecionados) - k)[len(selecionados) - k]]
+        acima = selecionados >= corte
+        candidatos, selecionados = candidatos[acima], selecionados[acima]
+    ordem = np.argsort(-selecionados, kind='stable')
+    return candidatos[ordem[:k]]
+
+
+class _TopK:
+    """Top-K incremental: heap mínimo de (valor, -índice) limitado a k entradas"""
+
+    __slots__ = ('k', '_heap')
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[float, int]] = []
+
+    def adicionar(self, valor: float, indice: int) -> None:
+        if self.k <= 0:
+            return
+        # Com valores iguais, -índice faz o heap descartar primeiro o item mais recente
+        item = (valor, -indice)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def indices(self) -> List[int]:
+        return [-i for _, i in sorted(self._heap, reverse=True)]
+
+
+@dataclass
+class EstatisticasExecucao:
+    """Agregados de uma execução; os top-K são índices na lista de resultados"""
+    executadas: int = 0
+    erros: int = 0
+    ignoradas: int = 0
+    reaproveitadas: int = 0
+    total_pendencias: int = 0
+    indices_top: List[int] = field(default_factory=list)
+    indices_lentas: List[int] = field(default_factory=list)
+    tempos_por_fase: Dict[str, float] = field(default_factory=dict)
+    grupos: List[ResumoGrupo] = field(default_factory=list)
+
+
+def calcular_estatisticas(
+    resultados: Sequence[ResultadoExecucao],
+    tabela: Optional[TabelaResultados] = None,
+    top_n: int = 5,
+    top_lentas: int = 10
+) -> EstatisticasExecucao:
+    """Totais, contagens por status, subtotais por id_grupo e top-K de uma execução.
+
+    Com a tabela colunar disponível, tudo é calculado com operações NumPy;
+    sem ela, em uma única passada sobre os resultados.
+    """
+    if tabela is not None:
+        return _estatisticas_tabela(tabela, top_n, top_lentas)
+    return _estatisticas_iterativas(resultados, top_n, top_lentas)
+
+
+def _estatisticas_iterativas(
+    resultados: Sequence[ResultadoExecucao], top_n: int, top_lentas: int
+) -> EstatisticasExecucao:
+    est = EstatisticasExecucao()
+    top = _TopK(top_n)
+    lentas = _TopK(top_lentas)
+    grupos: Dict[Optional[int], ResumoGrupo] = {}
+
+    for i, r in enumerate(resultados):
+        grupo = grupos.get(r.id_grupo)
+        if grupo is None:
+            grupo = grupos[r.id_grupo] = ResumoGrupo(id_grupo=r.id_grupo)
+        grupo.consultas += 1
+
+        if r.status == 'sucesso':
+            est.executadas += 1
+            grupo.executadas += 1
+            if r.quantidade is not None and r.quantidade > 0:
+                est.total_pendencias += r.quantidade
+                grupo.total_pendencias += r.quantidade
+                top.adicionar(r.quantidade, i)
+        elif r.status == 'ignorada':
+            est.ignoradas += 1
+            grupo.ignoradas += 1
+        else:
+            est.erros += 1
+            grupo.erros += 1
+
+        if r.do_historico:
+            est.reaproveitadas += 1
+
+        if r.tempos:
+            for fase, valor in r.tempos.items():
+                est.tempos_por_fase[fase] = est.tempos_por_fase.get(fase, 0.0) + valor
+            total = r.tempos.get('total')
+            if total is not None:
+                grupo.duracao += total
+                lentas.adicionar(total, i)
+
+    est.indices_top = top.indices()
+    est.indices_lentas = lentas.indices()
+    est.grupos = _ordenar_grupos(grupos.values())
+    return est
+
+
+def _estatisticas_tabela(tabela: TabelaResultados, top_n: int, top_lentas: int) -> EstatisticasExecucao:
+    est = EstatisticasExecucao()
+    if len(tabela) == 0:
+        return est
+
+    por_status = np.bincount(tabela.status, minlength=len(TabelaResultados.STATUS))
+    est.executadas = int(por_status[TabelaResultados.STATUS.index('sucesso')])
+    est.ignoradas = int(por_status[TabelaResultados.STATUS.index('ignorada')])
+    est.erros = int(por_status[TabelaResultados.STATUS.index('erro')])
+    est.reaproveitadas = int(tabela.do_historico.sum())
+
+    com_dados = tabela.mascara_com_dados()
+    quantidade = np.where(com_dados, tabela.quantidade, 0)
+    est.total_pendencias = int(quantidade.sum())
+
+    tempo_total = tabela.coluna_tempo('total')
+    medidos = ~np.isnan(tempo_total)
+    est.indices_top = indices_maiores(tabela.quantidade, com_dados, top_n).tolist()
+    est.indices_lentas = indices_maiores(tempo_total, medidos, top_lentas).tolist()
+    est.tempos_por_fase = tabela.soma_tempos()
+
+    # Subtotais por grupo: factorize agrupa por hash (O(N)); só os G grupos distintos são ordenados depois
+    codigos, ids_grupo = pd.factorize(tabela.id_grupo)
+    n_grupos = len(ids_grupo)
+    n_status = len(TabelaResultados.STATUS)
+    consultas = np.bincount(codigos, minlength=n_grupos)
+    status_grupo = np.bincount(codigos * n_status + tabela.status, minlength=n_grupos * n_status).reshape(n_grupos, n_status)
+    pendencias_grupo = np.bincount(codigos, weights=quantidade, minlength=n_grupos)
+    duracao_grupo = np.bincount(codigos, weights=np.where(medidos, tempo_total, 0.0), minlength=n_grupos)
+
+    est.grupos = _ordenar_grupos(
+        ResumoGrupo(
+            id_grupo=None if ids_grupo[g] == TabelaResultados.SEM_GRUPO else int(ids_grupo[g]),
+            consultas=int(consultas[g]),
+            executadas=int(status_grupo[g, TabelaResultados.STATUS.index('sucesso')]),
+            erros=int(status_grupo[g, TabelaResultados.STATUS.index('erro')]),
+            ignoradas=int(status_grupo[g, TabelaResultados.STATUS.index('ignorada')]),
+            total_pendencias=int(pendencias_grupo[g]),
+            duracao=float(duracao_grupo[g])
+        )
+        for g in range(n_grupos)
+    )
+    return est
+
+
+def _ordenar_grupos(grupos: Iterable[ResumoGrupo]) -> List[ResumoGrupo]:
+    """Por id_grupo, com as pendências sem grupo no fim"""
+    return sorted(grupos, key=lambda g: (g.id_grupo is None, g.id_grupo or 0))
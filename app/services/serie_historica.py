@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.models.pendencia import TabelaResultados
+from app.services.formato_resultados import carregar_resultados
+
+NOME_SERIE = "serie_pendencias.bin"
+
+# Um registro por consulta por execução; a última gravação do dia prevalece na leitura
+DTYPE_SERIE = np.dtype([
+    ('data', 'datetime64[D]'),
+    ('id', '<i8'),
+    ('id_pendencia', '<i8'),
+    ('quantidade', '<f8'),
+])
+
+
+class SerieHistorica:
+    """Série diária das contagens por consulta em um arquivo binário colunar.
+
+    Cada execução acrescenta ao fim do arquivo um bloco de registros
+    ``DTYPE_SERIE``; a leitura usa ``np.memmap``, de modo que analisar centenas
+    de dias não exige abrir um JSON por execução. Os nomes das consultas ficam
+    num JSON pequeno ao lado do arquivo.
+    """
+
+    def __init__(self, caminho: Path):
+        self.logger = logging.getLogger(__name__)
+        self.caminho = Path(caminho)
+        self.caminho_nomes = self.caminho.with_name(self.caminho.stem + '_nomes.json')
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        if not self.caminho.exists():
+            return 0
+        return self.caminho.stat().st_size // DTYPE_SERIE.itemsize
+
+    def adicionar(self, dia: date, tabela: TabelaResultados) -> int:
+        """Acrescenta as contagens bem-sucedidas de uma execução"""
+        validas = tabela.mascara_status('sucesso') & tabela.tem_quantidade
+        registros = np.empty(int(validas.sum()), dtype=DTYPE_SERIE)
+        registros['data'] = np.datetime64(dia, 'D')
+        registros['id'] = tabela.ids[validas]
+        registros['id_pendencia'] = tabela.id_pendencia[validas]
+        registros['quantidade'] = tabela.quantidade[validas]
+
+        nomes = {
+            str(r.id): r.nome_pendencia
+            for r, valida in zip(tabela.resultados, validas) if valida and r.nome_pendencia
+        }
+        self._acrescentar(registros, nomes)
+        return len(registros)
+
+    def adicionar_registros(self, dia: date, resultados: Dict[str, dict]) -> int:
+        """Acrescenta uma execução a partir do dicionário ``resultados`` de um JSON salvo"""
+        linhas = []
+        nomes = {}
+        for chave, info in resultados.items():
+            id_consulta = int(info.get('id', chave))
+            if info.get('nome_pendencia'):
+                nomes[str(id_consulta)] = info['nome_pendencia']
+            # Compatibilidade com formatos antigos (quantidade) e novos (total_registros)
+            quantidade = info.get('total_registros', info.get('quantidade'))
+            if info.get('status', 'sucesso') == 'sucesso' and quantidade is not None:
+                linhas.append((id_consulta, int(info.get('id_pendencia') or 0), float(quantidade)))
+        registros = np.empty(len(linhas), dtype=DTYPE_SERIE)
+        registros['data'] = np.datetime64(dia, 'D')
+        if linhas:
+            colunas = np.array(linhas, dtype=np.float64)
+            registros['id'] = colunas[:, 0]
+            registros['id_pendencia'] = colunas[:, 1]
+            registros['quantidade'] = colunas[:, 2]
+
+        self._acrescentar(registros, nomes)
+        return len(registros)
+
+    def _acrescentar(self, registros: np.ndarray, nomes: Dict[str, str]) -> None:
+        with self._lock:
+            self._descartar_registro_parcial()
+            with open(self.caminho, 'ab') as f:
+                f.write(registros.tobytes())
+            if nomes:
+                atuais = self.nomes()
+                atuais.update(nomes)
+                temporario = self.caminho_nomes.with_suffix('.tmp')
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    json.dump(atuais, f, ensure_ascii=False)
+                os.replace(temporario, self.caminho_nomes)
+
+    def _descartar_registro_parcial(self) -> None:
+        # Uma queda no meio de uma gravação pode deixar um registro incompleto no fim do arquivo
+        if not self.caminho.exists():
+            return
+        tamanho = self.caminho.stat().st_size
+        excedente = tamanho % DTYPE_SERIE.itemsize
+        if excedente:
+            self.logger.warning(f"Truncating {excedente} trailing bytes from {self.caminho.name}")
+            with open(self.caminho, 'r+b') as f:
+                f.truncate(tamanho - excedente)
+
+    def limpar(self) -> None:
+        with self._lock:
+            for caminho in (self.caminho, self.caminho_nomes):
+                if caminho.exists():
+                    caminho.unlink()
+
+    def reconstruir(self, arquivos: Iterable[Tuple[date, Path]]) -> int:
+        """Refaz a série a partir de arquivos de resultado JSON (em ordem cronológica)"""
+        self.limpar()
+        total = 0
+        for dia, caminho in arquivos:
+            try:
+                resultados = carregar_resultados(caminho).get('resultados', {})
+            except Exception as e:
+                self.logger.warning(f"Skipping unreadable result file {caminho.name}: {e}")
+                continue
+            if isinstance(resultados, list):
+                resultados = {str(r['id']): r for r in resultados}
+            total += self.adicionar_registros(dia, resultados)
+        self.logger.info(f"History series rebuilt: {total} records")
+        return total
+
+    def nomes(self) -> Dict[str, str]:
+        if not self.caminho_nomes.exists():
+            return {}
+        try:
+            with open(self.caminho_nomes, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Could not read query names {self.caminho_nomes}: {e}")
+            return {}
+
+    def carregar(self, inicio: Optional[date] = None, fim: Optional[date] = None) -> np.ndarray:
+        """Registros do intervalo [inicio, fim], um por (data, id)"""
+        total = len(self)
+        if total == 0:
+            return np.empty(0, dtype=DTYPE_SERIE)
+
+        serie = np.memmap(self.caminho, dtype=DTYPE_SERIE, mode='r', shape=(total,))
+        datas = serie['data']
+        mascara = np.ones(total, dtype=bool)
+        if inicio is not None:
+            mascara &= datas >= np.datetime64(inicio, 'D')
+        if fim is not None:
+            mascara &= datas <= np.datetime64(fim, 'D')
+        registros = np.array(serie[mascara])
+        del serie
+
+        # Várias execuções no mesmo dia: manter o último registro gravado de cada (data, id).
+        # Com o array invertido e lexsort estável, o primeiro de cada chave é o mais recente.
+        invertidos = registros[::-1]
+        ordenados = invertidos[np.lexsort((invertidos['id'], invertidos['data']))]
+        primeiro_da_chave = np.ones(len(ordenados), dtype=bool)
+        primeiro_da_chave[1:] = (
+            (ordenados['data'][1:] != ordenados['data'][:-1]) | (ordenados['id'][1:] != ordenados['id'][:-1])
+        )
+        return ordenados[primeiro_da_chave]
+
+    def matriz(
+        self, inicio: Optional[date] = None, fim: Optional[date] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pivot (ids × dias) das contagens; NaN onde a consulta não tem registro no dia"""
+        registros = self.carregar(inicio, fim)
+        if len(registros) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype='datetime64[D]'), np.empty((0, 0))
+
+        primeiro = np.datetime64(inicio, 'D') if inicio is not None else registros['data'].min()
+        ultimo = np.datetime64(fim, 'D') if fim is not None else registros['data'].max()
+        dias = np.arange(primeiro, ultimo + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+
+        ids, linha = np.unique(registros['id'], return_inverse=True)
+        coluna = (registros['data'] - primeiro).astype(np.int64)
+        valores = np.full((len(ids), len(dias)), np.nan)
+        valores[linha, coluna] = registros['quantidade']
+        return ids, dias, valores
+
@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+class ExecucaoEmAndamento(Exception):
+    """Outra execução já detém a trava do ambiente"""
+
+    def __init__(self, mensagem: str, dono: Optional[dict] = None):
+        super().__init__(mensagem)
+        self.dono = dono
+
+
+class TravaPerdida(Exception):
+    """A trava foi perdida durante a execução (outro processo assumiu ou a sessão caiu)"""
+
+
+class TravaExecucao(ABC):
+    """Trava de execução com lease: adquirida antes de uma execução e renovada por heartbeat.
+
+    ``adquirir(espera=0)`` falha na hora com ``ExecucaoEmAndamento`` se outra
+    execução estiver ativa; com ``espera`` > 0 fica na fila por até esse número de
+    segundos. Enquanto a trava é mantida, uma thread renova o lease a cada
+    ``ttl / 3`` segundos; se o processo morrer, o lease expira e outro processo assume.
+    Se o heartbeat descobrir que a trava se perdeu, ``perdida`` passa a True e a
+    execução deve parar entre as consultas.
+    """
+
+    # Intervalo entre tentativas ao esperar a trava
+    INTERVALO_TENTATIVA = 5.0
+
+    def __init__(self, ttl: float = 120, dono: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.ttl = ttl
+        self.dono = dono or f"{socket.gethostname()}:{os.getpid()}"
+        self.token = uuid.uuid4().hex
+        self._parar_heartbeat = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._perdida = threading.Event()
+        self.adquirida = False
+
+    # --- específico de cada implementação ---
+
+    @abstractmethod
+    def _tentar(self, espera: float) -> bool:
+        """Tenta obter a trava, esperando até ``espera`` segundos"""
+
+    @abstractmethod
+    def _renovar(self) -> None:
+        """Heartbeat: mantém o lease da trava obtida"""
+
+    @abstractmethod
+    def _liberar(self) -> None:
+        """Libera a trava obtida"""
+
+    def dono_atual(self) -> Optional[dict]:
+        return None
+
+    @property
+    def perdida(self) -> bool:
+        return self._perdida.is_set()
+
+    def _marcar_perdida(self, motivo: str) -> None:
+        if not self._perdida.is_set():
+            self.logger.error(f"Run lock lost: {motivo} - stopping the run")
+        self._perdida.set()
+
+    # --- ciclo de vida ---
+
+    def adquirir(self, espera: float = 0) -> 'TravaExecucao':
+        if not self._tentar(espera):
+            dono = self.dono_atual()
+            descricao = f" (held by {dono.get('dono')} since {dono.get('inicio')})" if dono else ""
+            raise ExecucaoEmAndamento(f"Another run is already active{descricao}", dono)
+
+        self.adquirida = True
+        self._perdida.clear()
+        self._parar_heartbeat.clear()
+        self._heartbeat = threading.Thread(target=self._renovar_periodicamente, name='trava-heartbeat', daemon=True)
+        self._heartbeat.start()
+        self.logger.info(f"Run lock acquired by {self.dono}")
+        return self
+
+    def _renovar_periodicamente(self) -> None:
+        while not self._parar_heartbeat.wait(self.ttl / 3):
+            try:
+                self._renovar()
+            except Exception as e:
+                self.logger.error(f"Run lock heartbeat failed: {e}")
+
+    def liberar(self) -> None:
+        if not self.adquirida:
+            return
+        self._parar_heartbeat.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+        try:
+            self._liberar()
+            self.logger.info("Run lock released")
+        except Exception as e:
+            self.logger.warning(f"Could not release run lock: {e}")
+        self.adquirida = False
+
+    def __enter__(self) -> 'TravaExecucao':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.liberar()
+
+
+class TravaArquivo(TravaExecucao):
+    """Trava num arquivo criado com O_EXCL; o mtime do arquivo é o heartbeat.
+
+    Um arquivo cujo mtime tem mais de ``ttl`` segundos pertence a um processo que
+    morreu: ele é renomeado (só um processo consegue) e a criação é tentada de novo.
+    """
+
+    def __init__(self, caminho: Path, ttl: float = 120, dono: Optional[str] = None):
+        super().__init__(ttl=ttl, dono=dono)
+        self.caminho = Path(caminho)
+
+    def _tentar(self, espera: float) -> bool:
+        limite = time.monotonic() + espera
+        while True:
+            if self._criar():
+                return True
+            if self._expirada(self.caminho):
+                self._remover_expirada()
+                if self._criar():
+                    return True
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return False
+            time.sleep(min(self.INTERVALO_TENTATIVA, restante))
+
+    def _criar(self) -> bool:
+        try:
+            fd = os.open(str(self.caminho), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({
+                'dono': self.dono,
+                'token': self.token,
+                'inicio': datetime.now().isoformat(timespec='seconds')
+            }, f)
+        return True
+
+    def _expirada(self, caminho: Path) -> bool:
+        try:
+            return time.time() - os.stat(caminho).st_mtime > self.ttl
+        except FileNotFoundError:
+            return False
+
+    def _remover_expirada(self) -> None:
+        dono = self.dono_atual()
+        descartada = self.caminho.with_name(f"{self.caminho.name}.expirada.{os.getpid()}.{threading.get_ident()}")
+        try:
+            os.rename(self.caminho, descartada)
+        except FileNotFoundError:
+            # Outro processo assumiu primeiro
+            return
+        if not self._expirada(descartada):
+            # Entre a verificação e o rename o arquivo foi recriado por outro processo: devolvê-lo
+            try:
+                os.link(descartada, self.caminho)
+            except OSError:
+                pass
+        else:
+            self.logger.warning(f"Taking over stale run lock from {dono.get('dono') if dono else 'unknown owner'}")
+        os.remove(descartada)
+
+    def _renovar(self) -> None:
+        dono = self.dono_atual()
+        if not dono or dono.get('token') != self.token:
+            # Renovar agora tomaria de volta uma trava que outro processo já usa
+            self._marcar_perdida("lock file was taken over by another process")
+            return
+        os.utime(self.caminho)
+
+    def _liberar(self) -> None:
+        dono = self.dono_atual()
+        if dono and dono.get('token') == self.token:
+            os.remove(self.caminho)
+
+    def dono_atual(self) -> Optional[dict]:
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+class TravaBanco(TravaExecucao):
+    """Trava no SQL Server com ``sp_getapplock`` de sessão, numa conexão dedicada.
+
+    O SQL Server libera a trava sozinho se a conexão cair, então um processo que
+    morre não deixa trava órfã; o heartbeat só mantém a conexão ativa. A espera é
+    feita pelo próprio servidor (``@LockTimeout``).
+    """
+
+    ADQUIRIR = (
+        "SET NOCOUNT ON; DECLARE @resultado INT; "
+        "EXEC @resultado = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', "
+        "@LockOwner = 'Session', @LockTimeout = ?; "
+        "SELECT @resultado"
+    )
+    LIBERAR = "EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'"
+
+    def __init__(self, db_service, recurso: str, ttl: float = 120, dono: Optional[str] = None):
+        super().__init__(ttl=ttl, dono=dono)
+        self.db_service = db_service
+        self.recurso = recurso
+        self._conexao = None
+
+    def _tentar(self, espera: float) -> bool:
+        # Fora do pool: a trava vive enquanto esta conexão estiver aberta
+        conexao = self.db_service.new_connection()
+        try:
+            cursor = conexao.cursor()
+            cursor.execute(self.ADQUIRIR, (self.recurso, int(espera * 1000)))
+            resultado = cursor.fetchone()[0]
+        except Exception:
+            conexao.close()
+            raise
+        # 0 = concedida, 1 = concedida após espera; negativos = timeout/cancelada/deadlock
+        if resultado is not None and resultado >= 0:
+            self._conexao = conexao
+            return True
+        conexao.close()
+        return False
+
+    def _renovar(self) -> None:
+        try:
+            self._conexao.cursor().execute("SELECT 1").fetchone()
+        except Exception as e:
+            # Sessão encerrada: o SQL Server já liberou a trava para outro processo
+            if self.db_service.is_connection_error(e):
+                self._marcar_perdida(f"lock session was closed ({e})")
+            raise
+
+    def _liberar(self) -> None:
+        try:
+            self._conexao.cursor().execute(self.LIBERAR, (self.recurso,))
+            self._conexao.commit()
+        finally:
+            self._conexao.close()
+            self._conexao = None
+
+
+def criar_trava(tipo: str, db_service=None, caminho: Optional[Path] = None, recurso: str = 'pendencias_execucao',
+                ttl: float = 120) -> Optional[TravaExecucao]:
+    """Trava configurada (``arquivo``, ``banco``) ou None quando ``desativada``"""
+    if tipo == 'desativada':
+        return None
+    if tipo == 'arquivo':
+        return TravaArquivo(caminho or Path('output') / 'execucao.lock', ttl=ttl)
+    if tipo == 'banco':
+        return TravaBanco(db_service, recurso, ttl=ttl)
+    raise ValueError(f"Unknown run lock type '{tipo}' (use arquivo, banco or desativada)")
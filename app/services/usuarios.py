@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class UsuariosResponsaveisCache:
+    """Índice em memória id_pendencia -> usuários responsáveis, carregado com uma única consulta"""
+
+    QUERY_MAPEAMENTO = """
+    SELECT uxp.idPendencia, uxp.idUsu, u.nome
+    FROM amm_usuarios_x_pendencias uxp
+    JOIN amm_usuarios u ON u.id = uxp.idUsu
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.logger = logging.getLogger(__name__)
+        self.ttl = ttl
+        self._indice: Optional[Dict[int, List[Dict[str, Any]]]] = None
+        self._carregado_em = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def valido(self) -> bool:
+        if self._indice is None:
+            return False
+        if self.ttl <= 0:
+            return False
+        return (time.monotonic() - self._carregado_em) < self.ttl
+
+    def carregar(self, conn, forcar: bool = False) -> bool:
+        """Carrega o mapeamento completo, reaproveitando o índice atual se ainda estiver no TTL"""
+        with self._lock:
+            if not forcar and self.valido:
+                self.logger.info(f"Responsible users cache still valid - reusing {len(self._indice)} pendências")
+                return True
+
+            try:
+                cursor = conn.cursor()
+                cursor.execute(self.QUERY_MAPEAMENTO)
+
+                indice: Dict[int, List[Dict[str, Any]]] = {}
+                total = 0
+                for id_pendencia, id_usuario, nome in cursor.fetchall():
+                    indice.setdefault(id_pendencia, []).append({
+                        'id_usuario': id_usuario,
+                        'nome_usuario': nome
+                    })
+                    total += 1
+
+                self._indice = indice
+                self._carregado_em = time.monotonic()
+                self.logger.info(f"Responsible users cache loaded: {total} assignments for {len(indice)} pendências")
+                return True
+
+            except Exception as e:
+                self.logger.error(f"Error loading responsible users cache: {e}")
+                self._indice = None
+                return False
+
+    def obter(self, id_pendencia: int) -> Optional[List[Dict[str, Any]]]:
+        """Retorna os usuários da pendência, ou None quando o índice não está carregado (cache miss).
+
+        Com o índice carregado, uma pendência ausente não tem responsáveis: lista vazia,
+        sem consulta individual de fallback.
+        """
+        indice = self._indice
+        if indice is None:
+            return None
+        return indice.get(id_pendencia, [])
+
+    def registrar(self, id_pendencia: int, usuarios: List[Dict[str, Any]]) -> None:
+        """Guarda no índice o resultado de uma consulta individual feita após um miss"""
+        with self._lock:
+            if self._indice is not None:
+                self._indice[id_pendencia] = usuarios
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._indice = None
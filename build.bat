@@ -25,15 +25,32 @@ pyinstaller --name=PendenciasScheduler ^
     --icon=NONE ^
     --add-data ".env;." ^
     --hidden-import=pyodbc ^
-    --hidden-import=schedule ^
+    --hidden-import=numpy ^
     --hidden-import=pandas ^
     --hidden-import=dotenv ^
     --hidden-import=app.services.pendencias ^
     --hidden-import=app.services.database ^
+    --hidden-import=app.services.agendador ^
+    --hidden-import=app.services.analisador_tendencias ^
+    --hidden-import=app.services.anomalias ^
+    --hidden-import=app.services.cadencias ^
+    --hidden-import=app.services.catalogo ^
+    --hidden-import=app.services.checkpoint ^
+    --hidden-import=app.services.circuit_breaker ^
+    --hidden-import=app.services.comparacao ^
+    --hidden-import=app.services.connection_pool ^
+    --hidden-import=app.services.distribuicao ^
+    --hidden-import=app.services.duracoes ^
+    --hidden-import=app.services.formato_resultados ^
+    --hidden-import=app.services.historico ^
+    --hidden-import=app.services.pendencias_async ^
+    --hidden-import=app.services.resumo ^
+    --hidden-import=app.services.serie_historica ^
+    --hidden-import=app.services.trava_execucao ^
+    --hidden-import=app.services.usuarios ^
     --hidden-import=app.models ^
     --hidden-import=app.core ^
     --hidden-import=app.utils ^
-    --collect-all schedule ^
     --collect-all pyodbc ^
     --collect-all pandas ^
     app.py
@@ -3,6 +3,7 @@ Configurações da aplicação
 Arquivo de configuração centralizado para o sistema
 """
 import os
+import socket
 from typing import Dict, Any
 
 # Configurações do banco de dados
@@ -13,7 +14,12 @@ DATABASE_CONFIG: Dict[str, Any] = {
     'password': os.getenv('DB_PASSWORD', 'kFN2IEqOupim0KieNDDmbqD'),
     'driver': os.getenv('DB_DRIVER', '{ODBC Driver 18 for SQL Server}'),
     'port': int(os.getenv('DB_PORT', '1433')),
-    'timeout': int(os.getenv('DB_TIMEOUT', '30'))
+    'timeout': int(os.getenv('DB_TIMEOUT', '30')),
+    'pool_enabled': os.getenv('DB_POOL_ENABLED', 'true').lower() == 'true',
+    'pool_max_size': int(os.getenv('DB_POOL_MAX_SIZE', '8')),
+    'pool_idle_timeout': int(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')),  # segundos
+    'pool_health_check': os.getenv('DB_POOL_HEALTH_CHECK', 'true').lower() == 'true',
+    'fetch_batch_size': int(os.getenv('DB_FETCH_BATCH_SIZE', '500'))  # linhas por fetchmany
 }
 
 # Configurações da aplicação
@@ -23,6 +29,56 @@ APP_CONFIG: Dict[str, Any] = {
     'retry_delay': int(os.getenv('RETRY_DELAY', '5')),  # segundos
     'output_dir': os.getenv('OUTPUT_DIR', 'output'),
     'user_id': int(os.getenv('USER_ID', '1')),  # ID do usuário para histórico
+    'max_workers': int(os.getenv('MAX_WORKERS', '4')),  # consultas simultâneas (1 = sequencial; limitado a DB_POOL_MAX_SIZE)
+    'history_flush_size': int(os.getenv('HISTORY_FLUSH_SIZE', '500')),  # 0 = gravação linha a linha
+    'usuarios_cache_ttl': int(os.getenv('USUARIOS_CACHE_TTL', '0')),  # segundos (0 = recarregar a cada execução)
+    'query_timeout': int(os.getenv('QUERY_TIMEOUT', '300')),  # segundos por consulta (0 = sem limite)
+    'circuit_breaker_timeouts': int(os.getenv('CIRCUIT_BREAKER_TIMEOUTS', '3')),  # timeouts seguidos até suspender
+    'circuit_breaker_pausa': int(os.getenv('CIRCUIT_BREAKER_PAUSA', '3600')),  # segundos de suspensão
+    'profile_top_n': int(os.getenv('PROFILE_TOP_N', '10')),  # consultas mais lentas no resumo
+    'ordem_execucao': os.getenv('ORDEM_EXECUCAO', 'custo'),  # id | custo | grupo
+    'deduplicar_consultas': os.getenv('DEDUPLICAR_CONSULTAS', 'true').lower() == 'true',
+    'modo_incremental': os.getenv('INCREMENTAL_MODE', 'false').lower() == 'true',  # opt-in: reaproveitar contagens gravadas há menos de FRESHNESS_WINDOW_MINUTES
+    'janela_frescor_minutos': int(os.getenv('FRESHNESS_WINDOW_MINUTES', '60')),
+    'checkpoint_habilitado': os.getenv('CHECKPOINT_ENABLED', 'true').lower() == 'true',
+    'retomar_execucao': os.getenv('RESUME_RUN', 'true').lower() == 'true',  # retomar checkpoint do dia
+    'formato_resultados': os.getenv('RESULTS_FORMAT', 'json'),  # json | jsonl | msgpack
+    'compressao_resultados': os.getenv('RESULTS_COMPRESSION', 'nenhuma'),  # nenhuma | gzip | zstd
+    'fonte_analise': os.getenv('ANALYSIS_SOURCE', 'auto'),  # auto | banco | arquivos (analisador de tendências)
+    'anomalias_habilitadas': os.getenv('ANOMALY_DETECTION', 'true').lower() == 'true',
+    'anomalias_janela_dias': int(os.getenv('ANOMALY_WINDOW_DAYS', '30')),  # histórico usado como referência
+    'anomalias_minimo_dias': int(os.getenv('ANOMALY_MIN_DAYS', '7')),  # dias de histórico exigidos por consulta
+    'anomalias_limite': float(os.getenv('ANOMALY_THRESHOLD', '3.5')),  # escore robusto (mediana/MAD)
+    'anomalias_variacao_minima': float(os.getenv('ANOMALY_MIN_CHANGE', '0.2')),  # fração da mediana
+    # Agendamento (expressões cron de 5 campos: minuto hora dia mês dia-da-semana; vazio = desativado)
+    'agenda_execucao_completa': os.getenv('SCHEDULE_FULL_RUN', '0 22 * * *'),
+    'agenda_intradiaria': os.getenv('SCHEDULE_INTRADAY', ''),
+    'agenda_intradiaria_grupos': [
+        int(g) for g in os.getenv('SCHEDULE_INTRADAY_GROUPS', '').split(',') if g.strip()
+    ],
+    'agenda_analise_tendencias': os.getenv('SCHEDULE_TREND_ANALYSIS', ''),
+    'executar_ao_iniciar': os.getenv('RUN_ON_START', 'true').lower() == 'true',
+    # Cadências de atualização por id_grupo / id_pendencia (horaria, diaria, semanal, mensal ou 30m, 4h, 2d)
+    'agenda_cadencias': os.getenv('SCHEDULE_CADENCE_TICK', ''),  # ex.: '*/15 * * * *'
+    'cadencias_arquivo': os.getenv('CADENCES_FILE', 'config/cadencias.json'),
+    'cadencia_padrao': os.getenv('DEFAULT_CADENCE', 'diaria'),
+    'espalhar_cadencias': os.getenv('SPREAD_CADENCES', 'true').lower() == 'true',
+    # Distribuição entre várias instâncias do agendador (desativado, hash ou lease)
+    'modo_distribuicao': os.getenv('DISTRIBUTION_MODE', 'desativado'),
+    'no_id': os.getenv('NODE_ID', '') or socket.gethostname(),
+    'coordenacao': os.getenv('COORDINATION_STORE', 'sqlserver'),  # sqlserver ou sqlite
+    'coordenacao_sqlite': os.getenv('COORDINATION_SQLITE_PATH', os.path.join(os.getenv('OUTPUT_DIR', 'output'), 'coordenacao.db')),
+    'lease_ttl': int(os.getenv('LEASE_TTL', '900')),  # segundos
+    'no_ttl': int(os.getenv('NODE_TTL', '900')),  # segundos sem heartbeat até o nó sair do anel
+    'distribuicao_espera_max': int(os.getenv('DISTRIBUTED_WAIT_MAX', '3600')),  # espera do dono do resumo
+    # Trava de execução: uma execução ativa por ambiente (arquivo, banco = sp_getapplock, ou desativada)
+    'trava_execucao': os.getenv('RUN_LOCK', 'arquivo'),
+    'trava_arquivo': os.getenv('RUN_LOCK_FILE', os.path.join(os.getenv('OUTPUT_DIR', 'output'), 'execucao.lock')),
+    'trava_recurso': os.getenv('RUN_LOCK_RESOURCE', 'pendencias_execucao'),
+    'trava_ttl': int(os.getenv('RUN_LOCK_TTL', '120')),  # segundos sem heartbeat até a trava ser considerada órfã
+    'trava_espera': int(os.getenv('RUN_LOCK_WAIT', '0')),  # 0 = falhar na hora; > 0 = esperar até N segundos
+    'execucao_async': os.getenv('ASYNC_EXECUTION', 'false').lower() == 'true',  # consultas num event loop asyncio
+    'async_max_concorrencia': int(os.getenv('ASYNC_MAX_CONCURRENCY', os.getenv('MAX_WORKERS', '4'))),  # instruções simultâneas no banco
     'version': '2.0.0'
 }
 
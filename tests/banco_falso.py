@@ -0,0 +1,82 @@
+"""Conexão e cursor em memória com a interface DB-API usada pelos serviços.
+
+O ``responder(sql, parametros)`` decide o resultado de cada instrução: uma lista
+de linhas, um ``Resultado`` (com nomes de colunas) ou uma exceção lançada por ele.
+"""
+from typing import Any, Callable, List, Optional, Sequence
+
+
+class Resultado:
+    def __init__(self, colunas: Sequence[str], linhas: List[tuple]):
+        self.colunas = list(colunas)
+        self.linhas = list(linhas)
+
+
+class CursorFalso:
+    def __init__(self, conexao: 'ConexaoFalsa'):
+        self.conexao = conexao
+        self.description = None
+        self.rowcount = -1
+        self.fast_executemany = False
+        self.fechado = False
+        self._linhas: List[tuple] = []
+
+    def execute(self, sql: str, *parametros):
+        if self.conexao.fechada:
+            raise RuntimeError('connection was closed')
+        parametros = tuple(parametros[0]) if parametros else ()
+        self.conexao.executadas.append((sql, parametros))
+        resposta = self.conexao.responder(sql, parametros)
+        if isinstance(resposta, Resultado):
+            self.description = [(c, None, None, None, None, None, None) for c in resposta.colunas]
+            self._linhas = list(resposta.linhas)
+        else:
+            self.description = [('coluna', None, None, None, None, None, None)] if resposta else None
+            self._linhas = list(resposta or [])
+        self.rowcount = len(self._linhas)
+        return self
+
+    def executemany(self, sql: str, sequencia):
+        for parametros in sequencia:
+            self.execute(sql, parametros)
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._linhas.pop(0) if self._linhas else None
+
+    def fetchmany(self, tamanho: int) -> List[tuple]:
+        self.conexao.fetchmany_chamadas += 1
+        lote, self._linhas = self._linhas[:tamanho], self._linhas[tamanho:]
+        return lote
+
+    def fetchall(self) -> List[tuple]:
+        linhas, self._linhas = self._linhas, []
+        return linhas
+
+    def close(self) -> None:
+        self.fechado = True
+
+
+class ConexaoFalsa:
+    def __init__(self, responder: Optional[Callable[[str, tuple], Any]] = None):
+        self.responder = responder or (lambda sql, parametros: [])
+        self.executadas: List[tuple] = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.fetchmany_chamadas = 0
+        self.fechada = False
+        self.timeout = 0
+
+    def cursor(self) -> CursorFalso:
+        return CursorFalso(self)
+
+    def commit(self) -> None:
+        self.commits += 1
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def close(self) -> None:
+        self.fechada = True
+
+    def instrucoes(self, trecho: str) -> List[tuple]:
+        return [(sql, p) for sql, p in self.executadas if trecho in sql]
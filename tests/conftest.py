@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os testes importam ``app`` e ``config`` a partir da raiz do projeto, como o app.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
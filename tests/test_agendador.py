@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.services.agendador import Agendador, ExpressaoCron
+
+
+@pytest.mark.parametrize('expressao, apos, esperado', [
+    ('0 22 * * *', datetime(2024, 3, 10, 21, 59), datetime(2024, 3, 10, 22, 0)),
+    ('0 22 * * *', datetime(2024, 3, 10, 22, 0), datetime(2024, 3, 11, 22, 0)),
+    ('*/15 * * * *', datetime(2024, 3, 10, 8, 7, 30), datetime(2024, 3, 10, 8, 15)),
+    # Dias úteis, de 2 em 2 horas entre 8h e 18h: sexta 18h -> segunda 8h
+    ('0 8-18/2 * * 1-5', datetime(2024, 3, 8, 18, 0), datetime(2024, 3, 11, 8, 0)),
+    ('30 6 1,15 * *', datetime(2024, 3, 2, 0, 0), datetime(2024, 3, 15, 6, 30)),
+    ('0 0 * * 7', datetime(2024, 3, 10, 0, 0), datetime(2024, 3, 17, 0, 0)),  # 7 = domingo
+    ('@monthly', datetime(2024, 12, 31, 23, 59), datetime(2025, 1, 1, 0, 0)),
+    ('0 0 29 2 *', datetime(2024, 3, 1), datetime(2028, 2, 29, 0, 0)),
+])
+def test_proxima_execucao(expressao, apos, esperado):
+    assert ExpressaoCron(expressao).proxima(apos) == esperado
+
+
+def test_dia_do_mes_e_da_semana_restritos_casam_por_ou():
+    # Dia 13 ou qualquer sexta-feira: 2024-03-08 é sexta
+    cron = ExpressaoCron('0 12 13 * 5')
+    assert cron.proxima(datetime(2024, 3, 1, 13, 0)) == datetime(2024, 3, 8, 12, 0)
+    assert cron.proxima(datetime(2024, 3, 8, 13, 0)) == datetime(2024, 3, 13, 12, 0)
+
+
+def test_passo_no_dia_do_mes_nao_conta_como_restrito():
+    # '*/2' começa com '*': dias ímpares E segunda-feira (segundas de março/2024: 4, 11, 18, 25)
+    cron = ExpressaoCron('0 22 */2 * 1')
+    assert cron.proxima(datetime(2024, 3, 1, 0, 0)) == datetime(2024, 3, 11, 22, 0)
+    assert cron.proxima(datetime(2024, 3, 11, 22, 0)) == datetime(2024, 3, 25, 22, 0)
+    # O mesmo para um passo no dia da semana: dia 13 em qualquer dia da semana
+    assert ExpressaoCron('0 12 13 * */1').proxima(datetime(2024, 3, 1)) == datetime(2024, 3, 13, 12, 0)
+
+
+@pytest.mark.parametrize('expressao', ['', '* * * *', '60 * * * *', '0 24 * * *', '5-1 * * * *', '*/0 * * * *', 'x * * * *'])
+def test_expressao_invalida(expressao):
+    with pytest.raises(ValueError):
+        ExpressaoCron(expressao)
+
+
+def test_expressao_que_nunca_dispara():
+    with pytest.raises(ValueError):
+        ExpressaoCron('0 0 31 2 *').proxima(datetime(2024, 1, 1))
+
+
+def test_parar_antes_de_executar_nao_e_descartado():
+    agendador = Agendador()
+    agendador.parar()
+
+    laco = threading.Thread(target=agendador.executar)
+    laco.start()
+    laco.join(timeout=2)
+
+    assert not laco.is_alive()
+    assert not agendador.em_execucao
+
+
+def test_parar_acorda_o_laco_e_tarefa_vencida_roda_uma_vez():
+    agendador = Agendador()
+    execucoes = []
+    tarefa = agendador.adicionar('job', '0 0 1 1 *', lambda: execucoes.append(1))
+    tarefa.proxima = datetime(2000, 1, 1)  # vencida
+
+    laco = threading.Thread(target=agendador.executar)
+    laco.start()
+    try:
+        for _ in range(200):
+            if execucoes:
+                break
+            threading.Event().wait(0.01)
+        assert agendador.em_execucao
+    finally:
+        agendador.parar()
+        laco.join(timeout=2)
+
+    assert not laco.is_alive()
+    assert execucoes == [1]
+    assert tarefa.execucoes == 1
+    assert tarefa.proxima > datetime.now()
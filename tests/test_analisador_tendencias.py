@@ -0,0 +1,29 @@
+import json
+from datetime import datetime, timedelta
+
+import app.services.analisador_tendencias as modulo
+from app.services.analisador_tendencias import AnalisadorTendencias
+
+
+def _salvar(pasta, dia, contagens):
+    resultados = {str(i): {'nome_pendencia': f"P{i}", 'total_registros': qtd} for i, qtd in contagens.items()}
+    caminho = pasta / f"resultados_execucao_pendencias_{dia:%Y%m%d}_220000.json"
+    caminho.write_text(json.dumps({'resultados': resultados}), encoding='utf-8')
+
+
+def test_compara_ontem_e_hoje_a_partir_dos_arquivos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(modulo.APP_CONFIG, 'fonte_analise', 'arquivos')
+    saida = tmp_path / 'output'
+    saida.mkdir()
+    hoje = datetime.now()
+    _salvar(saida, hoje - timedelta(days=1), {1: 10, 2: 5, 3: 8})
+    _salvar(saida, hoje, {1: 4, 2: 5, 3: 9})
+
+    resumo = AnalisadorTendencias().resumir_comparacao(hoje - timedelta(days=1), hoje)
+
+    assert resumo is not None
+    assert resumo.total_reducoes == 1
+    assert resumo.total_aumentos == 1
+    assert resumo.total_consultas == 3
+    assert [r.consulta_id for r in resumo.top_reducoes] == [1]
@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.anomalias import DetectorAnomalias
+from app.services.serie_historica import SerieHistorica
+
+HOJE = date(2024, 3, 31)
+
+
+@pytest.fixture
+def serie(tmp_path):
+    """Dez dias de histórico: 1 oscila em torno de 100, 2 é constante em 50, 3 tem só 3 dias"""
+    serie = SerieHistorica(tmp_path / 'serie.bin')
+    oscilacao = [96, 104, 98, 102, 100, 97, 103, 99, 101, 100]
+    for n, valor in enumerate(oscilacao):
+        registros = {
+            '1': {'nome_pendencia': 'Oscilante', 'total_registros': valor},
+            '2': {'nome_pendencia': 'Constante', 'total_registros': 50},
+        }
+        if n >= 7:
+            registros['3'] = {'nome_pendencia': 'Nova', 'total_registros': 10}
+        serie.adicionar_registros(HOJE - timedelta(days=10 - n), registros)
+    return serie
+
+
+def _detectar(serie, quantidades, **opcoes):
+    detector = DetectorAnomalias(serie, janela_dias=30, minimo_dias=7, **opcoes)
+    ids = np.array(sorted(quantidades), dtype=np.int64)
+    return detector.detectar(HOJE, ids, np.array([quantidades[i] for i in ids], dtype=float))
+
+
+def test_contagens_dentro_da_faixa_nao_sao_sinalizadas(serie):
+    assert _detectar(serie, {1: 103, 2: 50}) == []
+
+
+def test_mediana_e_mad_do_historico(serie):
+    anomalia, = _detectar(serie, {1: 160})
+
+    assert anomalia.tipo == 'aumento'
+    assert anomalia.mediana == 100.0
+    # |desvios| da mediana: 4 4 2 2 0 3 3 1 1 0 -> MAD 2
+    assert anomalia.desvio == 2.0
+    assert anomalia.escore == round(60 / (1.4826 * 2), 2)
+    assert anomalia.dias_historico == 10
+
+
+def test_zerada_e_sempre_sinalizada_e_vem_primeiro(serie):
+    anomalias = _detectar(serie, {1: 40, 2: 0})
+
+    assert [(a.id, a.tipo) for a in anomalias] == [(2, 'zerada'), (1, 'queda')]
+
+
+def test_serie_constante_exige_variacao_minima(serie):
+    # MAD 0: a escala mínima é 1, mas 55 é só 10% acima da mediana 50
+    assert _detectar(serie, {2: 55}) == []
+    assert [a.tipo for a in _detectar(serie, {2: 70})] == ['aumento']
+
+
+def test_historico_curto_ou_ausente_e_ignorado(serie):
+    assert _detectar(serie, {3: 1000, 99: 5}) == []
+
+
+def test_detectar_no_historico(serie):
+    serie.adicionar_registros(HOJE, {'1': {'total_registros': 100}, '2': {'total_registros': 0}})
+
+    anomalias = DetectorAnomalias(serie).detectar_no_historico(HOJE)
+
+    assert [(a.id, a.tipo, a.nome_pendencia) for a in anomalias] == [(2, 'zerada', 'Constante')]
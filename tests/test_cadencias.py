@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.pendencia import Pendencia
+from app.services.cadencias import EstadoCadencias, PlanoCadencias, intervalo_cadencia
+
+
+def _pendencia(id_, grupo=1):
+    return Pendencia(id=id_, id_pendencia=100 + id_, consulta_pendencia=f"SELECT {id_}", id_grupo=grupo)
+
+
+@pytest.mark.parametrize('valor, esperado', [
+    ('horaria', timedelta(hours=1)),
+    ('Diaria', timedelta(days=1)),
+    ('semanal', timedelta(weeks=1)),
+    ('30m', timedelta(minutes=30)),
+    ('4h', timedelta(hours=4)),
+    ('2d', timedelta(days=2)),
+])
+def test_intervalo_cadencia(valor, esperado):
+    assert intervalo_cadencia(valor) == esperado
+
+
+@pytest.mark.parametrize('valor', ['', 'quinzenal', '0h', '10s', '-1d'])
+def test_intervalo_cadencia_invalido(valor):
+    with pytest.raises(ValueError):
+        intervalo_cadencia(valor)
+
+
+def test_pendencia_prevalece_sobre_grupo_e_padrao():
+    plano = PlanoCadencias(padrao='diaria', por_grupo={2: 'horaria'}, por_pendencia={103: 'semanal'})
+
+    assert plano.cadencia(_pendencia(1)) == timedelta(days=1)
+    assert plano.cadencia(_pendencia(2, grupo=2)) == timedelta(hours=1)
+    assert plano.cadencia(_pendencia(3, grupo=2)) == timedelta(weeks=1)
+
+
+def test_janela_sem_espalhar_alinha_no_inicio_do_intervalo():
+    plano = PlanoCadencias(padrao='horaria', espalhar=False)
+
+    assert plano.inicio_janela(_pendencia(1), datetime(2024, 3, 10, 14, 37)) == datetime(2024, 3, 10, 14, 0)
+
+
+def test_espalhar_distribui_as_consultas_dentro_da_janela():
+    plano = PlanoCadencias(padrao='diaria', espalhar=True)
+    agora = datetime(2024, 3, 10, 12, 0)
+    inicios = [plano.inicio_janela(_pendencia(i), agora) for i in range(1, 201)]
+
+    assert all(agora - timedelta(days=1) < inicio <= agora for inicio in inicios)
+    # Deslocamento fixo por id: horas distintas ao longo do dia
+    assert len({inicio.hour for inicio in inicios}) == 24
+    assert plano.inicio_janela(_pendencia(7), agora) == plano.inicio_janela(_pendencia(7), agora)
+
+
+def test_vencidas_usa_a_ultima_atualizacao(tmp_path):
+    plano = PlanoCadencias(padrao='diaria', por_grupo={2: 'horaria'}, espalhar=False)
+    estado = EstadoCadencias(tmp_path / 'estado.json')
+    agora = datetime(2024, 3, 10, 14, 30)
+    estado.registrar([1, 2], datetime(2024, 3, 10, 9, 0))
+
+    vencidas = plano.vencidas([_pendencia(1), _pendencia(2, grupo=2), _pendencia(3)], estado, agora)
+
+    # 1: diária já feita hoje; 2: horária feita às 9h; 3: nunca atualizada
+    assert [p.id for p in vencidas] == [2, 3]
+
+
+def test_estado_persiste_e_nao_volta_no_tempo(tmp_path):
+    caminho = tmp_path / 'estado.json'
+    estado = EstadoCadencias(caminho)
+    estado.registrar([1], datetime(2024, 3, 10, 12, 0))
+    estado.registrar([1], datetime(2024, 3, 10, 8, 0))
+
+    assert EstadoCadencias(caminho).ultima(1) == datetime(2024, 3, 10, 12, 0)
+    assert list(tmp_path.iterdir()) == [caminho]
+
+
+def test_estado_ilegivel_deixa_tudo_vencido(tmp_path):
+    caminho = tmp_path / 'estado.json'
+    caminho.write_text('{corrompido', encoding='utf-8')
+
+    assert EstadoCadencias(caminho).ultima(1) is None
+
+
+def test_carregar_plano_do_arquivo(tmp_path):
+    caminho = tmp_path / 'cadencias.json'
+    caminho.write_text(json.dumps({'padrao': 'semanal', 'grupos': {'2': '4h'}, 'pendencias': {'101': 'horaria'}}), encoding='utf-8')
+
+    plano = PlanoCadencias.carregar(caminho)
+
+    assert plano.cadencia(_pendencia(1)) == timedelta(hours=1)
+    assert plano.cadencia(_pendencia(2, grupo=2)) == timedelta(hours=4)
+    assert plano.cadencia(_pendencia(3)) == timedelta(weeks=1)
+    assert PlanoCadencias.carregar(tmp_path / 'inexistente.json').padrao == timedelta(days=1)
+
+
+def test_gravacoes_de_instancias_diferentes_sao_mescladas(tmp_path):
+    caminho = tmp_path / 'estado.json'
+    # Dois nós carregaram o estado antes de qualquer um gravar
+    no_a = EstadoCadencias(caminho)
+    no_b = EstadoCadencias(caminho)
+
+    no_a.registrar([1, 2], datetime(2024, 3, 10, 12, 0))
+    no_b.registrar([2, 3], datetime(2024, 3, 10, 11, 0))
+
+    estado = EstadoCadencias(caminho)
+    assert estado.ultima(1) == datetime(2024, 3, 10, 12, 0)
+    # Vale o momento mais recente, não o da última gravação
+    assert estado.ultima(2) == datetime(2024, 3, 10, 12, 0)
+    assert estado.ultima(3) == datetime(2024, 3, 10, 11, 0)
+
+
+def test_registros_concorrentes_nao_se_perdem(tmp_path):
+    caminho = tmp_path / 'estado.json'
+    momento = datetime(2024, 3, 10, 12, 0)
+
+    def registrar(inicio):
+        for id_consulta in range(inicio, inicio + 20):
+            EstadoCadencias(caminho).registrar([id_consulta], momento)
+
+    threads = [threading.Thread(target=registrar, args=(n * 100,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    estado = EstadoCadencias(caminho)
+    assert all(estado.ultima(n * 100 + i) == momento for n in range(4) for i in range(20))
+    assert list(tmp_path.iterdir()) == [caminho]
+
+
+def test_trava_orfa_e_removida(tmp_path):
+    caminho = tmp_path / 'estado.json'
+    estado = EstadoCadencias(caminho)
+    estado.caminho_trava.touch()
+    antigo = time.time() - EstadoCadencias.TRAVA_ORFA - 5
+    os.utime(estado.caminho_trava, (antigo, antigo))
+
+    estado.registrar([1], datetime(2024, 3, 10, 12, 0))
+
+    assert EstadoCadencias(caminho).ultima(1) == datetime(2024, 3, 10, 12, 0)
+    assert not estado.caminho_trava.exists()
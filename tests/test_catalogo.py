@@ -0,0 +1,79 @@
+import json
+import sqlite3
+from datetime import datetime
+
+from app.services.catalogo import NOME_CATALOGO, CatalogoExecucoes
+
+
+def _salvar(pasta, momento, parcial=False):
+    caminho = pasta / f"resultados_execucao_pendencias_{momento:%Y%m%d_%H%M%S}.json"
+    dados = {'total_consultas': 2, 'taxa_sucesso': 100.0, 'resultados': {}}
+    if parcial:
+        dados['execucao_parcial'] = True
+    caminho.write_text(json.dumps(dados), encoding='utf-8')
+    return caminho, dados
+
+
+def test_busca_a_ultima_execucao_completa_do_dia(tmp_path):
+    catalogo = CatalogoExecucoes(tmp_path / NOME_CATALOGO)
+    for momento, parcial in (
+        (datetime(2024, 3, 9, 22, 0), False),
+        (datetime(2024, 3, 10, 8, 0), False),
+        (datetime(2024, 3, 10, 14, 0), False),
+        (datetime(2024, 3, 10, 18, 0), True),
+    ):
+        catalogo.registrar(*_salvar(tmp_path, momento, parcial))
+
+    encontrado = catalogo.buscar_mais_recente(datetime(2024, 3, 10))
+
+    # A parcial das 18h é mais recente, mas a completa das 14h prevalece
+    assert encontrado.name == "resultados_execucao_pendencias_20240310_140000.json"
+    assert catalogo.buscar_mais_recente(datetime(2024, 3, 9)).name.endswith("20240309_220000.json")
+    assert catalogo.buscar_mais_recente(datetime(2024, 3, 11)) is None
+
+
+def test_parcial_e_usada_quando_nao_ha_completa(tmp_path):
+    catalogo = CatalogoExecucoes(tmp_path / NOME_CATALOGO)
+    catalogo.registrar(*_salvar(tmp_path, datetime(2024, 3, 10, 18, 0), parcial=True))
+
+    assert catalogo.buscar_mais_recente(datetime(2024, 3, 10)).name.endswith("20240310_180000.json")
+
+
+def test_entrada_sem_arquivo_e_removida(tmp_path):
+    catalogo = CatalogoExecucoes(tmp_path / NOME_CATALOGO)
+    antigo, dados = _salvar(tmp_path, datetime(2024, 3, 10, 8, 0))
+    catalogo.registrar(antigo, dados)
+    catalogo.registrar(*_salvar(tmp_path, datetime(2024, 3, 10, 14, 0)))
+    (tmp_path / "resultados_execucao_pendencias_20240310_140000.json").unlink()
+
+    assert catalogo.buscar_mais_recente(datetime(2024, 3, 10)) == antigo
+    assert [linha['arquivo'] for linha in catalogo.listar()] == [antigo.name]
+
+
+def test_reconstruir_indexa_os_arquivos_do_diretorio(tmp_path):
+    _salvar(tmp_path, datetime(2024, 3, 10, 22, 0))
+    _salvar(tmp_path, datetime(2024, 3, 9, 22, 0), parcial=True)
+    (tmp_path / "resultados_execucao_pendencias_20240311_220000.json").write_text('{corrompido', encoding='utf-8')
+    (tmp_path / "outro_arquivo.json").write_text('{}', encoding='utf-8')
+    catalogo = CatalogoExecucoes(tmp_path / NOME_CATALOGO)
+    assert catalogo.vazio()
+
+    assert catalogo.reconstruir() == 2
+
+    linhas = catalogo.listar()
+    assert [(linha['data'], linha['parcial']) for linha in linhas] == [('2024-03-09', 1), ('2024-03-10', 0)]
+    assert [dia.isoformat() for dia, _ in catalogo.arquivos()] == ['2024-03-09', '2024-03-10']
+
+
+def test_catalogo_antigo_ganha_a_coluna_parcial(tmp_path):
+    caminho = tmp_path / NOME_CATALOGO
+    with sqlite3.connect(str(caminho)) as conn:
+        conn.execute("CREATE TABLE execucoes (arquivo TEXT PRIMARY KEY, data TEXT NOT NULL, momento TEXT NOT NULL)")
+        conn.execute("INSERT INTO execucoes VALUES ('resultados_execucao_pendencias_20240310_220000.json', '2024-03-10', '2024-03-10 22:00:00')")
+    conn.close()
+    _salvar(tmp_path, datetime(2024, 3, 10, 22, 0))
+
+    catalogo = CatalogoExecucoes(caminho)
+
+    assert catalogo.listar()[0]['parcial'] == 0
+    assert catalogo.buscar_mais_recente(datetime(2024, 3, 10)).name.endswith("20240310_220000.json")
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timedelta
+
+from app.models.pendencia import Pendencia, ResultadoExecucao
+from app.services.checkpoint import CheckpointExecucao
+
+
+def _resultado(id_, quantidade=5):
+    return ResultadoExecucao(
+        id=id_, id_pendencia=100 + id_, nome_pendencia=f"Pendência {id_}", id_grupo=1,
+        quantidade=quantidade, status='sucesso', exibe_contagem=True,
+        pendencia=Pendencia(id=id_, id_pendencia=100 + id_, consulta_pendencia=f"SELECT {id_}")
+    )
+
+
+def test_retomada_devolve_os_resultados_registrados(tmp_path):
+    caminho = tmp_path / 'checkpoint_execucao.jsonl'
+    checkpoint = CheckpointExecucao(caminho)
+    assert checkpoint.iniciar() == {}
+    checkpoint.registrar(_resultado(1, 5))
+    checkpoint.registrar(_resultado(2, 7))
+    checkpoint.fechar()
+
+    retomado = CheckpointExecucao(caminho)
+    concluidos = retomado.iniciar(retomar=True)
+    retomado.registrar(_resultado(3, 9))
+    retomado.fechar()
+
+    assert {i: r.quantidade for i, r in concluidos.items()} == {1: 5, 2: 7}
+    # A Pendencia (com o SQL) não vai para o arquivo: é religada por quem retoma
+    assert all(r.pendencia is None for r in concluidos.values())
+    assert sorted(CheckpointExecucao(caminho).iniciar()) == [1, 2, 3]
+
+
+def test_sem_retomar_o_checkpoint_e_reiniciado(tmp_path):
+    caminho = tmp_path / 'checkpoint_execucao.jsonl'
+    checkpoint = CheckpointExecucao(caminho)
+    checkpoint.iniciar()
+    checkpoint.registrar(_resultado(1))
+    checkpoint.fechar()
+
+    novo = CheckpointExecucao(caminho)
+    assert novo.iniciar(retomar=False) == {}
+    novo.fechar()
+    assert CheckpointExecucao(caminho).iniciar() == {}
+
+
+def test_checkpoint_de_outro_dia_e_descartado(tmp_path):
+    caminho = tmp_path / 'checkpoint_execucao.jsonl'
+    ontem = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    caminho.write_text(
+        json.dumps({'tipo': 'inicio', 'data': ontem}) + '\n'
+        + json.dumps({'tipo': 'resultado', 'id': 1, 'id_pendencia': 101, 'nome_pendencia': 'x',
+                      'id_grupo': 1, 'quantidade': 5, 'status': 'sucesso'}) + '\n',
+        encoding='utf-8'
+    )
+
+    assert CheckpointExecucao(caminho).iniciar() == {}
+
+
+def test_linha_truncada_e_ignorada(tmp_path):
+    caminho = tmp_path / 'checkpoint_execucao.jsonl'
+    checkpoint = CheckpointExecucao(caminho)
+    checkpoint.iniciar()
+    checkpoint.registrar(_resultado(1))
+    checkpoint.fechar()
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write('{"tipo": "resultado", "id": 2, "quant')
+
+    assert sorted(CheckpointExecucao(caminho).iniciar()) == [1]
+
+
+def test_concluir_remove_o_arquivo(tmp_path):
+    caminho = tmp_path / 'checkpoint_execucao.jsonl'
+    checkpoint = CheckpointExecucao(caminho)
+    checkpoint.iniciar()
+    checkpoint.concluir()
+    assert not caminho.exists()
@@ -0,0 +1,103 @@
+import pytest
+
+import app.services.circuit_breaker as modulo
+from app.models.pendencia import Pendencia
+from app.services.circuit_breaker import CircuitBreaker
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1_700_000_000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(modulo.time, 'time', relogio)
+    return relogio
+
+
+def test_abre_apos_timeouts_seguidos(relogio):
+    breaker = CircuitBreaker(limite_timeouts=3, pausa=600)
+
+    for _ in range(2):
+        breaker.registrar_falha(7, 30.0, timeout=True)
+        assert breaker.permitir(7)
+    breaker.registrar_falha(7, 30.0, timeout=True)
+
+    assert not breaker.permitir(7)
+    assert 'after 3 consecutive timeouts' in breaker.motivo_bloqueio(7)
+    # Outras consultas não são afetadas
+    assert breaker.permitir(8)
+
+
+def test_falhas_sem_timeout_nao_abrem(relogio):
+    breaker = CircuitBreaker(limite_timeouts=2)
+    for _ in range(5):
+        breaker.registrar_falha(7, 1.0)
+    assert breaker.permitir(7)
+
+
+def test_sucesso_zera_a_contagem(relogio):
+    breaker = CircuitBreaker(limite_timeouts=3, pausa=600)
+    breaker.registrar_falha(7, 30.0, timeout=True)
+    breaker.registrar_falha(7, 30.0, timeout=True)
+    breaker.registrar_sucesso(7, 2.0)
+    breaker.registrar_falha(7, 30.0, timeout=True)
+    breaker.registrar_falha(7, 30.0, timeout=True)
+
+    assert breaker.permitir(7)
+
+
+def test_meio_aberto_apos_a_pausa_e_reabre_no_proximo_timeout(relogio):
+    breaker = CircuitBreaker(limite_timeouts=2, pausa=600)
+    breaker.registrar_falha(7, 30.0, timeout=True)
+    breaker.registrar_falha(7, 30.0, timeout=True)
+    assert not breaker.permitir(7)
+
+    relogio.agora += 601
+    assert breaker.permitir(7)
+    assert breaker.motivo_bloqueio(7) is None
+
+    # Uma tentativa só: o próximo timeout reabre sem esperar outros dois
+    breaker.registrar_falha(7, 30.0, timeout=True)
+    assert not breaker.permitir(7)
+
+
+def test_estado_persistido_entre_execucoes(tmp_path, relogio):
+    caminho = tmp_path / 'circuit_breaker.json'
+
+    # Uma execução por noite, cada uma num processo novo
+    for noite in range(3):
+        breaker = CircuitBreaker(limite_timeouts=3, pausa=3600, caminho=caminho)
+        assert breaker.permitir(7)
+        breaker.registrar_falha(7, 300.0, timeout=True)
+        breaker.salvar()
+        relogio.agora += 600
+
+    breaker = CircuitBreaker(limite_timeouts=3, pausa=3600, caminho=caminho)
+    assert not breaker.permitir(7)
+    assert breaker.duracao_media(7) == 300.0
+
+    relogio.agora += 3600
+    assert CircuitBreaker(limite_timeouts=3, pausa=3600, caminho=caminho).permitir(7)
+
+
+def test_arquivo_invalido_comeca_vazio(tmp_path):
+    caminho = tmp_path / 'circuit_breaker.json'
+    caminho.write_text('{corrompido', encoding='utf-8')
+
+    assert CircuitBreaker(caminho=caminho).permitir(7)
+
+
+def test_ordenar_move_falhas_para_o_fim(relogio):
+    breaker = CircuitBreaker()
+    pendencias = [Pendencia(id=i, id_pendencia=i, consulta_pendencia=f"SELECT {i}") for i in range(1, 5)]
+    breaker.registrar_falha(2, 1.0)
+    breaker.registrar_falha(3, 1.0)
+    breaker.registrar_sucesso(3, 1.0)
+
+    assert [p.id for p in breaker.ordenar(pendencias)] == [1, 3, 4, 2]
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from app.services.comparacao import TabelaComparacao
+
+
+def _execucao(contagens, monetarias=()):
+    return {
+        str(id_): {'nome_pendencia': f"Pendência {id_}", 'total_registros': contagem,
+                   'exibe_contagem': 2 if id_ in monetarias else 1}
+        for id_, contagem in contagens.items()
+    }
+
+
+def test_totais_e_alinhamento_por_id():
+    anterior = _execucao({1: 10, 2: 5, 3: 8, 4: None, 5: 3})
+    atual = _execucao({1: 4, 2: 5, 3: 12, 4: 7, 6: 1})
+
+    tabela = TabelaComparacao(anterior, atual)
+
+    # 4 sem contagem anterior e 5/6 presentes em uma só execução ficam de fora
+    assert sorted(tabela.ids.tolist()) == [1, 2, 3]
+    assert (tabela.total_reducoes, tabela.total_aumentos, tabela.total_inalteradas) == (1, 1, 1)
+
+
+def test_top_reducoes_absolutas_e_percentuais():
+    anterior = _execucao({1: 100, 2: 10, 3: 50, 4: 20, 5: 7})
+    atual = _execucao({1: 70, 2: 1, 3: 20, 4: 25, 5: 7})
+
+    resumo = TabelaComparacao(anterior, atual).resumir(limite=2)
+
+    assert [r.consulta_id for r in resumo.top_reducoes] == [1, 3]
+    assert [r.consulta_id for r in resumo.top_reducoes_percentuais] == [2, 3]
+    assert resumo.top_reducoes[0].diferenca == 30
+    assert resumo.top_reducoes_percentuais[0].percentual_reducao == 90.0
+
+
+def test_empates_mantem_a_ordem_da_execucao_atual():
+    anterior = _execucao({3: 10, 1: 10, 2: 10})
+    atual = _execucao({3: 5, 1: 5, 2: 5})
+
+    resumo = TabelaComparacao(anterior, atual).resumir(limite=2)
+
+    assert [r.consulta_id for r in resumo.top_reducoes] == [3, 1]
+
+
+def test_economia_monetaria_soma_so_reducoes_monetarias():
+    anterior = _execucao({1: 100.5, 2: 40, 3: 10}, monetarias={1, 3})
+    atual = _execucao({1: 80.25, 2: 10, 3: 15}, monetarias={1, 3})
+
+    tabela = TabelaComparacao(anterior, atual)
+    resultado = tabela.materializar(tabela.top_reducoes(1))[0]
+
+    assert tabela.economia_monetaria == Decimal('20.25')
+    assert resultado.consulta_id == 2 and not resultado.eh_monetario
+
+
+def test_formato_antigo_com_quantidade():
+    anterior = {'1': {'nome_pendencia': 'A', 'quantidade': 9}}
+    atual = {'1': {'nome_pendencia': 'A', 'quantidade': 4}}
+
+    assert TabelaComparacao(anterior, atual).resumir().top_reducoes[0].diferenca == 5
@@ -0,0 +1,103 @@
+import json
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import app.services.analisador_tendencias as modulo
+from app.services.analisador_tendencias import AnalisadorTendencias
+from banco_falso import ConexaoFalsa
+
+Linha = namedtuple('Linha', [
+    'idPendencia', 'id', 'nome_pendencia', 'exibe_contagem', 'qtd_anterior', 'qtd_atual', 'diferenca',
+    'percentual', 'pos_abs', 'pos_perc', 'total_consultas', 'total_reducoes', 'total_aumentos', 'economia'
+])
+
+ONTEM = datetime(2024, 3, 9)
+HOJE = datetime(2024, 3, 10)
+
+
+class BancoFalso:
+    def __init__(self, responder):
+        self.conexao = ConexaoFalsa(responder)
+
+    @contextmanager
+    def get_connection(self):
+        yield self.conexao
+
+
+def _linha(id_pendencia, anterior, atual, pos_abs, pos_perc, id_=None, exibe=1):
+    diferenca = anterior - atual
+    percentual = diferenca * 100.0 / anterior if anterior > 0 else 0
+    return Linha(id_pendencia, id_, f"P{id_pendencia}" if id_ else None, exibe, anterior, atual, diferenca,
+                 percentual, pos_abs, pos_perc, 5, 3, 1, 250.5)
+
+
+@pytest.fixture
+def analisador(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return AnalisadorTendencias()
+
+
+def test_resumo_calculado_no_servidor(analisador, monkeypatch):
+    monkeypatch.setitem(modulo.APP_CONFIG, 'fonte_analise', 'banco')
+    linhas = [
+        _linha(501, 100, 40, pos_abs=1, pos_perc=2, id_=1, exibe=2),
+        _linha(502, 10, 1, pos_abs=2, pos_perc=1, id_=2),
+        # Fora do top absoluto, mas entre as maiores reduções percentuais
+        _linha(503, 4, 0, pos_abs=3, pos_perc=3),
+    ]
+    analisador.database_service = BancoFalso(lambda sql, parametros: linhas)
+
+    resumo = analisador.resumir_comparacao(ONTEM, HOJE, limite=2)
+
+    sql, parametros = analisador.database_service.conexao.executadas[0]
+    assert 'LAG(qtd)' in sql
+    assert parametros == ('2024-03-09', '2024-03-10', '2024-03-10', '2024-03-09', 2, 2)
+    assert resumo.fonte == 'banco'
+    assert (resumo.total_consultas, resumo.total_reducoes, resumo.total_aumentos, resumo.total_inalteradas) == (5, 3, 1, 1)
+    assert resumo.economia_monetaria == Decimal('250.5')
+    assert [r.consulta_id for r in resumo.top_reducoes] == [1, 2]
+    assert [r.consulta_id for r in resumo.top_reducoes_percentuais] == [2, 1]
+    assert resumo.top_reducoes[0].eh_monetario
+    assert resumo.top_reducoes[0].diferenca == 60
+
+
+def test_pendencia_sem_consulta_usa_o_id_do_historico(analisador, monkeypatch):
+    monkeypatch.setitem(modulo.APP_CONFIG, 'fonte_analise', 'banco')
+    analisador.database_service = BancoFalso(lambda sql, parametros: [_linha(503, 4, 0, pos_abs=1, pos_perc=1)])
+
+    resumo = analisador.resumir_comparacao(ONTEM, HOJE)
+
+    assert resumo.top_reducoes[0].consulta_id == 503
+    assert resumo.top_reducoes[0].nome_pendencia == "Pendência 503"
+
+
+def _responder_com_erro(sql, parametros):
+    raise RuntimeError('08S01 communication link failure')
+
+
+def test_fonte_banco_nao_recorre_aos_arquivos(analisador, monkeypatch):
+    monkeypatch.setitem(modulo.APP_CONFIG, 'fonte_analise', 'banco')
+    analisador.database_service = BancoFalso(_responder_com_erro)
+    analisador.comparar_tabelas = lambda *args: pytest.fail('arquivos não deveriam ser lidos')
+
+    assert analisador.resumir_comparacao(ONTEM, HOJE) is None
+
+
+@pytest.mark.parametrize('responder', [_responder_com_erro, lambda sql, parametros: []])
+def test_auto_recorre_aos_arquivos(analisador, monkeypatch, responder):
+    monkeypatch.setitem(modulo.APP_CONFIG, 'fonte_analise', 'auto')
+    analisador.database_service = BancoFalso(responder)
+    for dia, contagens in ((ONTEM, {1: 10, 2: 5}), (HOJE, {1: 4, 2: 6})):
+        resultados = {str(i): {'nome_pendencia': f"P{i}", 'total_registros': qtd} for i, qtd in contagens.items()}
+        caminho = analisador.output_dir / f"resultados_execucao_pendencias_{dia:%Y%m%d}_220000.json"
+        caminho.write_text(json.dumps({'resultados': resultados}), encoding='utf-8')
+    analisador.reconstruir_indices()
+
+    resumo = analisador.resumir_comparacao(ONTEM, HOJE)
+
+    assert resumo.fonte == 'arquivos'
+    assert (resumo.total_reducoes, resumo.total_aumentos) == (1, 1)
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+import app.services.connection_pool as modulo
+from app.services.connection_pool import ConnectionPool, PoolTimeoutError
+from banco_falso import ConexaoFalsa
+
+
+class Fabrica:
+    """Função de conexão que registra as conexões abertas"""
+
+    def __init__(self, responder=None):
+        self.responder = responder
+        self.abertas = []
+
+    def __call__(self):
+        conexao = ConexaoFalsa(self.responder)
+        self.abertas.append(conexao)
+        return conexao
+
+
+def test_reuso_e_contadores():
+    fabrica = Fabrica()
+    pool = ConnectionPool(fabrica, max_size=2)
+
+    primeira = pool.acquire()
+    pool.release(primeira)
+    segunda = pool.acquire()
+    pool.release(segunda)
+
+    assert segunda is primeira
+    assert len(fabrica.abertas) == 1
+    # A devolução desfaz uma transação deixada aberta
+    assert primeira.rollbacks == 2
+    stats = pool.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 50.0)
+    assert (stats['open'], stats['idle']) == (1, 1)
+
+
+def test_bloqueia_no_limite_ate_o_timeout():
+    pool = ConnectionPool(Fabrica(), max_size=1, acquire_timeout=0.2)
+    emprestada = pool.acquire()
+
+    inicio = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert time.monotonic() - inicio >= 0.2
+
+    pool.release(emprestada)
+    assert pool.acquire() is emprestada
+
+
+def test_espera_uma_conexao_ser_devolvida():
+    pool = ConnectionPool(Fabrica(), max_size=1, acquire_timeout=5)
+    emprestada = pool.acquire()
+    threading.Timer(0.1, pool.release, args=(emprestada,)).start()
+
+    assert pool.acquire() is emprestada
+
+
+def test_fecha_conexoes_ociosas_expiradas(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(modulo.time, 'monotonic', lambda: agora[0])
+    fabrica = Fabrica()
+    pool = ConnectionPool(fabrica, max_size=2, idle_timeout=60)
+
+    antiga = pool.acquire()
+    pool.release(antiga)
+    agora[0] += 61
+    nova = pool.acquire()
+
+    assert nova is not antiga
+    assert antiga.fechada
+    assert pool.stats()['open'] == 1
+
+
+def test_descarta_conexao_que_falha_no_health_check():
+    quebrada = [False]
+
+    def responder(sql, parametros):
+        if quebrada[0]:
+            raise RuntimeError('connection was closed')
+        return [(1,)]
+
+    fabrica = Fabrica(responder)
+    pool = ConnectionPool(fabrica, max_size=1, health_check=True)
+    conexao = pool.acquire()
+    pool.release(conexao)
+    quebrada[0] = True
+
+    nova = pool.acquire()
+
+    assert nova is not conexao
+    assert conexao.fechada
+    assert pool.stats()['discarded'] == 1
+    assert pool.stats()['open'] == 1
+
+
+def test_release_com_discard_nao_devolve_ao_pool():
+    fabrica = Fabrica()
+    pool = ConnectionPool(fabrica, max_size=1)
+    conexao = pool.acquire()
+
+    pool.release(conexao, discard=True)
+
+    assert conexao.fechada
+    assert pool.stats()['idle'] == 0
+    assert pool.stats()['open'] == 0
+    # A vaga foi liberada: uma nova conexão é aberta sem esperar
+    assert pool.acquire() is not conexao
+
+
+def test_excecao_no_bloco_descarta_a_conexao():
+    pool = ConnectionPool(Fabrica(), max_size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as conexao:
+            raise ValueError('erro no meio da consulta')
+
+    assert conexao.fechada
+    assert pool.stats()['discarded'] == 1
+
+
+def test_falha_ao_conectar_libera_a_vaga():
+    def falhar():
+        raise RuntimeError('login failed')
+
+    pool = ConnectionPool(falhar, max_size=1, acquire_timeout=0.1)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+    assert pool.stats()['open'] == 0
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import app.services.database as modulo
+from app.services.connection_pool import ConnectionPool
+from app.services.database import DatabaseService
+from banco_falso import ConexaoFalsa, Resultado
+
+COLUNAS = ['id', 'quantidade', 'valor', 'nome']
+# Lote 1 cabe em int8; o lote 2 exige int16
+LINHAS = [(i, i, i / 2, 'Pedidos' if i % 2 else 'Notas') for i in range(1, 6)] + \
+         [(i, 1000 + i, i / 2, 'Pedidos') for i in range(6, 11)]
+
+
+@pytest.fixture
+def banco():
+    conexoes = []
+
+    def conectar():
+        conexoes.append(ConexaoFalsa(lambda sql, parametros: Resultado(COLUNAS, LINHAS)))
+        return conexoes[-1]
+
+    pool = ConnectionPool(conectar, max_size=1, health_check=False, acquire_timeout=1)
+    servico = DatabaseService(pool=pool)
+    servico.conexoes = conexoes
+    return servico
+
+
+def test_iter_query_entrega_todas_as_linhas_em_lotes(banco):
+    linhas = list(banco.iter_query("SELECT * FROM pedidos", batch_size=4))
+
+    assert linhas == LINHAS
+    # 4 + 4 + 2 e a chamada vazia que encerra
+    assert banco.conexoes[0].fetchmany_chamadas == 4
+    assert banco.pool.stats()['idle'] == 1
+
+
+def test_iter_query_repassa_parametros(banco):
+    list(banco.iter_query("SELECT * FROM pedidos WHERE id > ?", params=[3]))
+    assert banco.conexoes[0].executadas == [("SELECT * FROM pedidos WHERE id > ?", (3,))]
+
+
+def test_fechar_o_iterador_antes_do_fim_devolve_a_conexao(banco):
+    iterador = banco.iter_query("SELECT * FROM pedidos", batch_size=2)
+    assert next(iterador) == LINHAS[0]
+
+    iterador.close()
+
+    conexao = banco.conexoes[0]
+    assert banco.pool.stats()['idle'] == 1
+    assert banco.pool.stats()['discarded'] == 0
+    assert conexao.fetchmany_chamadas == 1
+    # A mesma conexão volta a ser usada (pool de tamanho 1 não fica esgotado)
+    assert list(banco.iter_query("SELECT 1")) == LINHAS
+    assert banco.conexoes == [conexao]
+
+
+def test_erro_durante_a_iteracao_descarta_a_conexao(banco):
+    def falhar(sql, parametros):
+        raise RuntimeError('Invalid object name')
+
+    list(banco.iter_query("SELECT 1"))
+    banco.conexoes[0].responder = falhar
+
+    with pytest.raises(RuntimeError):
+        list(banco.iter_query("SELECT * FROM inexistente"))
+    assert banco.pool.stats()['discarded'] == 1
+
+
+def test_dataframe_com_downcast_depois_da_concatenacao(banco, monkeypatch):
+    # Dois lotes de fetchmany: um com valores de int8 e outro de int16
+    monkeypatch.setitem(modulo.DATABASE_CONFIG, 'fetch_batch_size', 5)
+
+    df = banco.execute_query_to_dataframe("SELECT * FROM pedidos", downcast=True, categorias=['nome'])
+
+    assert banco.conexoes[0].fetchmany_chamadas == 3
+    assert len(df) == 10
+    assert df['id'].dtype == np.int8
+    assert df['quantidade'].dtype == np.int16
+    assert df['valor'].dtype == np.float32
+    assert isinstance(df['nome'].dtype, pd.CategoricalDtype)
+    assert sorted(df['nome'].cat.categories) == ['Notas', 'Pedidos']
+
+
+def test_dataframe_em_lotes(banco):
+    lotes = list(banco.execute_query_to_dataframe("SELECT * FROM pedidos", chunksize=4, dtype={'quantidade': 'float64'}))
+
+    assert [len(df) for df in lotes] == [4, 4, 2]
+    assert all(df['quantidade'].dtype == np.float64 for df in lotes)
+    assert pd.concat(lotes, ignore_index=True)['id'].tolist() == list(range(1, 11))
+
+
+def test_arrays_colunares_de_varios_lotes(banco):
+    arrays = banco.execute_query_to_arrays(
+        "SELECT * FROM pedidos", dtypes={'id': np.int32, 'quantidade': np.int64, 'valor': float}, batch_size=3
+    )
+
+    assert list(arrays) == COLUNAS
+    assert arrays['id'].dtype == np.int32
+    assert arrays['quantidade'].dtype == np.int64
+    assert arrays['nome'].dtype == object
+    assert arrays['quantidade'].tolist() == [q for _, q, _, _ in LINHAS]
+    assert arrays['valor'][-1] == 5.0
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import app.services.pendencias as modulo
+from app.models.pendencia import Pendencia
+from app.services.connection_pool import ConnectionPool
+from app.services.database import DatabaseService
+from app.services.pendencias import PendenciasService
+from banco_falso import ConexaoFalsa
+
+_hash = PendenciasService._hash_consulta
+
+
+@pytest.mark.parametrize('variante', [
+    "SELECT COUNT(*) FROM pedidos WHERE status = 'A'",
+    "select count(*)\n  from PEDIDOS\twhere status = 'A';",
+    "  Select   Count(*) From pedidos Where status = 'A'  ; ",
+])
+def test_variantes_de_espaco_e_caixa_tem_o_mesmo_hash(variante):
+    assert _hash(variante) == _hash("SELECT COUNT(*) FROM pedidos WHERE status = 'A'")
+
+
+@pytest.mark.parametrize('outra', [
+    "SELECT COUNT(*) FROM pedidos WHERE status = 'B'",
+    "SELECT COUNT(*) FROM pedidos WHERE status = 'a'",
+    "SELECT COUNT(*) FROM pedidos WHERE status = 'A '",
+    "SELECT COUNT(*) FROM pedidos WHERE status = 'A' AND id > 10",
+    "SELECT COUNT(*) FROM pedidos WHERE status = 'it''s A'",
+])
+def test_sql_diferente_nao_colide(outra):
+    assert _hash(outra) != _hash("SELECT COUNT(*) FROM pedidos WHERE status = 'A'")
+
+
+def test_literal_com_aspas_escapadas_preserva_o_espaco_interno():
+    assert _hash("SELECT 'a  b'") != _hash("SELECT 'a b'")
+    assert _hash("SELECT 'it''s   x'") == _hash("select   'it''s   x'")
+
+
+def test_consulta_repetida_executa_uma_vez_e_replica_a_contagem(tmp_path, monkeypatch):
+    for chave, valor in {
+        'output_dir': str(tmp_path), 'modo_incremental': False, 'checkpoint_habilitado': False,
+        'anomalias_habilitadas': False, 'trava_execucao': 'desativada', 'query_timeout': 0,
+        'deduplicar_consultas': True,
+    }.items():
+        monkeypatch.setitem(modulo.APP_CONFIG, chave, valor)
+
+    conexoes = []
+
+    def conectar():
+        def responder(sql, parametros):
+            return [(42,)] if 'pedidos' in sql.lower() else [(7,)] if 'notas' in sql else []
+        conexoes.append(ConexaoFalsa(responder))
+        return conexoes[-1]
+
+    consultas = [
+        "SELECT COUNT(*) FROM pedidos",
+        "select count(*)\nFROM   pedidos;",
+        "SELECT COUNT(*) FROM notas",
+        "Select Count(*) From Pedidos",
+    ]
+    pendencias = [
+        Pendencia(id=i, id_pendencia=100 + i, consulta_pendencia=sql, hash_consulta=_hash(sql))
+        for i, sql in enumerate(consultas, 1)
+    ]
+    servico = PendenciasService()
+    servico.db_service = DatabaseService(pool=ConnectionPool(conectar, max_size=2, health_check=False))
+    servico.max_workers = 2
+    servico.extrair_pendencias = lambda: list(pendencias)
+    servico._carregar_usuarios_responsaveis = lambda: None
+
+    resumo = servico.executar_todas_consultas()
+
+    executadas = [sql for c in conexoes for sql, _ in c.executadas if 'COUNT' in sql.upper()]
+    assert sorted(executadas) == ["SELECT COUNT(*) FROM notas", "SELECT COUNT(*) FROM pedidos"]
+    assert {r.id: r.quantidade for r in resumo.resultados} == {1: 42, 2: 42, 3: 7, 4: 42}
+    replicados = {r.id: r.id_consulta_origem for r in resumo.resultados if r.id_consulta_origem is not None}
+    assert replicados == {2: 1, 4: 1}
+    # Cada pendência tem a sua linha de histórico
+    historico = [p[0] for c in conexoes for _, p in c.instrucoes('INSERT INTO #hist_staging')]
+    assert sorted(historico) == [101, 102, 103, 104]
@@ -0,0 +1,141 @@
+import time
+from collections import Counter
+
+import pytest
+
+from app.models.pendencia import Pendencia, ResultadoExecucao
+from app.services.distribuicao import AnelConsistente, CoordenadorExecucao, ExecucaoDistribuida, criar_coordenador
+
+
+@pytest.fixture
+def coordenador(tmp_path):
+    # Mesmo caminho de COORDINATION_STORE=sqlite
+    return criar_coordenador('sqlite', caminho_sqlite=tmp_path / 'coordenacao.db')
+
+
+def _resultado(id_, quantidade):
+    return ResultadoExecucao(
+        id=id_, id_pendencia=100 + id_, nome_pendencia=f"P{id_}", id_grupo=1,
+        quantidade=quantidade, status='sucesso', exibe_contagem=None
+    )
+
+
+# --- anel de hash ---
+
+def test_anel_e_deterministico_e_cobre_todos_os_nos():
+    nos = ['no-a', 'no-b', 'no-c']
+    anel = AnelConsistente(nos)
+    donos = Counter(anel.no_de(chave) for chave in range(3000))
+
+    assert set(donos) == set(nos)
+    assert all(quantidade > 500 for quantidade in donos.values())
+    assert [AnelConsistente(reversed(nos)).no_de(c) for c in range(100)] == [anel.no_de(c) for c in range(100)]
+
+
+def test_novo_no_so_move_as_chaves_do_seu_trecho():
+    antes = AnelConsistente(['no-a', 'no-b', 'no-c'])
+    depois = AnelConsistente(['no-a', 'no-b', 'no-c', 'no-d'])
+    movidas = [c for c in range(4000) if antes.no_de(c) != depois.no_de(c)]
+
+    # Por volta de 1/4 das chaves, e todas para o nó novo
+    assert 0.15 < len(movidas) / 4000 < 0.35
+    assert {depois.no_de(c) for c in movidas} == {'no-d'}
+
+
+def test_anel_vazio():
+    assert AnelConsistente([]).no_de(1) is None
+
+
+# --- coordenação (SQLite) ---
+
+def test_coordenador_base_e_abstrato():
+    with pytest.raises(TypeError):
+        CoordenadorExecucao()
+
+
+def test_preparar_e_idempotente(coordenador):
+    coordenador.preparar('exec-1', [1, 2, 3])
+    coordenador.preparar('exec-1', [2, 3, 4])
+
+    assert sorted(coordenador.pendentes('exec-1')) == [1, 2, 3, 4]
+
+
+def test_cada_item_tem_um_unico_dono(coordenador):
+    coordenador.preparar('exec-1', range(1, 11))
+
+    do_a = coordenador.reivindicar('exec-1', 'no-a', range(1, 7), ttl=60)
+    do_b = coordenador.reivindicar('exec-1', 'no-b', range(1, 11), ttl=60)
+
+    assert do_a == [1, 2, 3, 4, 5, 6]
+    assert do_b == [7, 8, 9, 10]
+    # O próprio dono pode renovar o lease
+    assert coordenador.reivindicar('exec-1', 'no-a', [1], ttl=60) == [1]
+
+
+def test_lease_vencido_pode_ser_assumido_por_outro_no(coordenador):
+    coordenador.preparar('exec-1', [1, 2])
+    coordenador.reivindicar('exec-1', 'no-morto', [1, 2], ttl=0.05)
+    time.sleep(0.1)
+
+    assert coordenador.reivindicar('exec-1', 'no-b', [1, 2], ttl=60) == [1, 2]
+    assert coordenador.reivindicar('exec-1', 'no-morto', [1, 2], ttl=60) == []
+
+
+def test_itens_concluidos_e_liberados(coordenador):
+    coordenador.preparar('exec-1', [1, 2, 3])
+    coordenador.reivindicar('exec-1', 'no-a', [1, 2, 3], ttl=60)
+    coordenador.concluir('exec-1', 'no-a', [_resultado(1, 10), _resultado(2, 20)])
+    coordenador.liberar('exec-1', 'no-a', [3])
+
+    assert coordenador.pendentes('exec-1') == [3]
+    assert {r.id: r.quantidade for r in coordenador.resultados('exec-1')} == {1: 10, 2: 20}
+    # Concluído não volta a ser reivindicado; o liberado fica livre para outro nó
+    assert coordenador.reivindicar('exec-1', 'no-b', [1, 2, 3], ttl=60) == [3]
+
+
+def test_conclusao_de_quem_perdeu_o_lease_e_ignorada(coordenador):
+    coordenador.preparar('exec-1', [1])
+    coordenador.reivindicar('exec-1', 'no-a', [1], ttl=0.05)
+    time.sleep(0.1)
+    coordenador.reivindicar('exec-1', 'no-b', [1], ttl=60)
+    coordenador.concluir('exec-1', 'no-a', [_resultado(1, 99)])
+
+    assert coordenador.pendentes('exec-1') == [1]
+
+
+def test_um_dono_de_resumo_por_execucao(coordenador):
+    coordenador.preparar('exec-1', [1])
+
+    assert coordenador.reivindicar_resumo('exec-1', 'no-a', ttl=0.05)
+    assert not coordenador.reivindicar_resumo('exec-1', 'no-b', ttl=60)
+    time.sleep(0.1)
+    assert coordenador.reivindicar_resumo('exec-1', 'no-b', ttl=60)
+
+
+def test_nos_ativos_respeita_o_ttl(coordenador):
+    coordenador.anunciar('no-a')
+    coordenador.anunciar('no-b')
+    coordenador.anunciar('no-a')
+
+    assert coordenador.nos_ativos(ttl=60) == ['no-a', 'no-b']
+    time.sleep(0.1)
+    assert coordenador.nos_ativos(ttl=0.05) == []
+
+
+def test_modo_hash_coloca_as_consultas_do_no_primeiro(coordenador):
+    coordenador.anunciar('no-b')
+    pendencias = [Pendencia(id=i, id_pendencia=100 + i, consulta_pendencia=f"SELECT {i}") for i in range(1, 41)]
+    distribuicao = ExecucaoDistribuida(coordenador, 'no-a', 'exec-1', modo='hash')
+
+    ordem = distribuicao.ordenar(pendencias)
+    anel = AnelConsistente(['no-a', 'no-b'])
+    proprias = [p.id for p in pendencias if anel.no_de(p.id_pendencia) == 'no-a']
+
+    assert 0 < len(proprias) < len(pendencias)
+    assert [p.id for p in ordem[:len(proprias)]] == proprias
+    assert sorted(p.id for p in ordem) == list(range(1, 41))
+
+
+def test_modo_desconhecido(coordenador):
+    with pytest.raises(ValueError):
+        ExecucaoDistribuida(coordenador, 'no-a', 'exec-1', modo='roleta')
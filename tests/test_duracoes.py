@@ -0,0 +1,72 @@
+import pytest
+
+from app.models.pendencia import Pendencia, ResultadoExecucao
+from app.services.duracoes import HistoricoDuracoes, ordenar_pendencias
+
+
+def _pendencia(id_, grupo=None):
+    return Pendencia(id=id_, id_pendencia=100 + id_, consulta_pendencia=f"SELECT {id_}", id_grupo=grupo)
+
+
+def _resultado(id_, total, conexao=0.0, status='sucesso'):
+    return ResultadoExecucao(
+        id=id_, id_pendencia=100 + id_, nome_pendencia=None, id_grupo=None, quantidade=1, status=status,
+        tempos={'conexao': conexao, 'total': total}
+    )
+
+
+def test_media_movel_exponencial_sem_o_tempo_de_conexao(tmp_path):
+    historico = HistoricoDuracoes(tmp_path / 'duracoes.json', alpha=0.5)
+
+    historico.atualizar([_resultado(1, 11.0, conexao=1.0)])
+    assert historico.obter(1) == 10.0
+
+    historico.atualizar([_resultado(1, 20.0)])
+    assert historico.obter(1) == 15.0
+
+
+def test_ignoradas_e_sem_tempos_nao_entram(tmp_path):
+    historico = HistoricoDuracoes(tmp_path / 'duracoes.json')
+    sem_tempos = _resultado(2, 0.0)
+    sem_tempos.tempos = None
+
+    historico.atualizar([_resultado(1, 5.0, status='ignorada'), sem_tempos])
+
+    assert historico.obter(1) is None
+    assert historico.obter(2) is None
+
+
+def test_historico_persistido(tmp_path):
+    caminho = tmp_path / 'duracoes.json'
+    HistoricoDuracoes(caminho).atualizar([_resultado(1, 3.5), _resultado(2, 0.25)])
+
+    recarregado = HistoricoDuracoes(caminho)
+
+    assert (recarregado.obter(1), recarregado.obter(2)) == (3.5, 0.25)
+
+
+def test_custo_mais_demoradas_primeiro_e_sem_historico_no_fim(tmp_path):
+    historico = HistoricoDuracoes(tmp_path / 'duracoes.json')
+    historico.atualizar([_resultado(1, 2.0), _resultado(2, 30.0), _resultado(4, 2.0), _resultado(5, 9.0)])
+    pendencias = [_pendencia(i) for i in (6, 1, 3, 2, 4, 5)]
+
+    ordenadas = ordenar_pendencias(pendencias, 'custo', historico)
+
+    # Empates e consultas sem histórico mantêm a ordem recebida
+    assert [p.id for p in ordenadas] == [2, 5, 1, 4, 6, 3]
+
+
+@pytest.mark.parametrize('estrategia,esperado', [
+    ('id', [1, 2, 3, 4, 5]),
+    ('grupo', [2, 4, 1, 5, 3]),
+    ('desconhecida', [1, 2, 3, 4, 5]),
+])
+def test_outras_estrategias(estrategia, esperado):
+    pendencias = [_pendencia(3), _pendencia(1, grupo=2), _pendencia(5, grupo=2), _pendencia(4, grupo=1), _pendencia(2, grupo=1)]
+
+    assert [p.id for p in ordenar_pendencias(pendencias, estrategia)] == esperado
+
+
+def test_custo_sem_historico_cai_para_id():
+    pendencias = [_pendencia(3), _pendencia(1), _pendencia(2)]
+    assert [p.id for p in ordenar_pendencias(pendencias, 'custo', None)] == [1, 2, 3]
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import app.services.pendencias as modulo
+from app.models.pendencia import Pendencia, ResultadoExecucao
+from app.services.distribuicao import ExecucaoDistribuida, criar_coordenador
+from app.services.pendencias import PendenciasService
+
+
+def _resultado(pendencia):
+    return ResultadoExecucao(
+        id=pendencia.id, id_pendencia=pendencia.id_pendencia, nome_pendencia=pendencia.nome_pendencia,
+        id_grupo=pendencia.id_grupo, quantidade=pendencia.id * 10, status='sucesso',
+        exibe_contagem=pendencia.exibe_contagem, pendencia=pendencia
+    )
+
+
+def test_dono_do_resumo_assume_itens_que_so_o_no_morto_conhecia(tmp_path, monkeypatch):
+    monkeypatch.setitem(modulo.APP_CONFIG, 'output_dir', str(tmp_path))
+    coordenador = criar_coordenador('sqlite', caminho_sqlite=tmp_path / 'coordenacao.db')
+    todas = [Pendencia(id=i, id_pendencia=100 + i, consulta_pendencia=f"SELECT {i}") for i in range(1, 5)]
+
+    # O nó B registrou a execução com as 4 consultas, reivindicou 3 e 4 e caiu
+    coordenador.preparar('exec-1', [p.id for p in todas])
+    coordenador.reivindicar('exec-1', 'no-b', [3, 4], ttl=0.05)
+
+    servico = PendenciasService()
+    servico.extrair_pendencias = lambda: list(todas)
+    executadas = []
+
+    def executar(lote, checkpoint=None):
+        executadas.extend(p.id for p in lote)
+        return [_resultado(p) for p in lote]
+
+    servico._executar_sequencial = executar
+    distribuicao = ExecucaoDistribuida(
+        coordenador, 'no-a', 'exec-1', lease_ttl=60, espera_max=10, intervalo_espera=0.05
+    )
+
+    # O nó A selecionou só 1 e 2 (ex.: filtro incremental local)
+    locais = todas[:2]
+    servico._executar_distribuido(locais, distribuicao, max_workers=1)
+    assert coordenador.reivindicar_resumo('exec-1', 'no-a', 60)
+
+    inicio = time.monotonic()
+    resultados = servico._aguardar_execucao_distribuida({p.id: p for p in locais}, distribuicao, max_workers=1)
+
+    assert time.monotonic() - inicio < 5
+    assert sorted(executadas) == [1, 2, 3, 4]
+    assert sorted(r.id for r in resultados) == [1, 2, 3, 4]
+    assert all(r.pendencia is not None for r in resultados)
+    assert coordenador.pendentes('exec-1') == []
+
+
+def test_item_de_pendencia_removida_nao_prende_o_dono(tmp_path, monkeypatch):
+    monkeypatch.setitem(modulo.APP_CONFIG, 'output_dir', str(tmp_path))
+    coordenador = criar_coordenador('sqlite', caminho_sqlite=tmp_path / 'coordenacao.db')
+    pendencia = Pendencia(id=1, id_pendencia=101, consulta_pendencia="SELECT 1")
+    coordenador.preparar('exec-1', [1, 99])
+
+    servico = PendenciasService()
+    servico.extrair_pendencias = lambda: [pendencia]
+    servico._executar_sequencial = lambda lote, checkpoint=None: [_resultado(p) for p in lote]
+    distribuicao = ExecucaoDistribuida(coordenador, 'no-a', 'exec-1', espera_max=10, intervalo_espera=0.05)
+
+    inicio = time.monotonic()
+    resultados = servico._aguardar_execucao_distribuida({1: pendencia}, distribuicao, max_workers=1)
+
+    assert time.monotonic() - inicio < 5
+    assert [r.id for r in resultados] == [1]
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import app.services.pendencias as modulo
+from app.models.pendencia import Pendencia
+from app.services.connection_pool import ConnectionPool
+from app.services.database import DatabaseService
+from app.services.pendencias import PendenciasService
+from banco_falso import ConexaoFalsa
+
+
+class ErroConexao(Exception):
+    def __init__(self):
+        super().__init__('08S01', 'Communication link failure')
+
+
+@pytest.fixture
+def configuracao(tmp_path, monkeypatch):
+    for chave, valor in {
+        'output_dir': str(tmp_path), 'modo_incremental': False, 'checkpoint_habilitado': True,
+        'retomar_execucao': True, 'anomalias_habilitadas': False, 'trava_execucao': 'desativada',
+        'history_flush_size': 500, 'query_timeout': 0, 'max_retries': 0, 'retry_delay': 0,
+    }.items():
+        monkeypatch.setitem(modulo.APP_CONFIG, chave, valor)
+    return tmp_path
+
+
+def _servico(responder, max_workers=1, quantidade=3):
+    servico = PendenciasService()
+    servico.db_service = DatabaseService(pool=ConnectionPool(
+        lambda: ConexaoFalsa(responder), max_size=4, health_check=False, acquire_timeout=5
+    ))
+    servico.max_workers = max_workers
+    pendencias = [Pendencia(id=i, id_pendencia=100 + i, consulta_pendencia=f"SELECT {i}") for i in range(1, quantidade + 1)]
+    servico.extrair_pendencias = lambda: list(pendencias)
+    servico._carregar_usuarios_responsaveis = lambda: None
+    return servico
+
+
+def _contagem(sql, parametros):
+    if sql.startswith('SELECT ') and sql[7:].isdigit():
+        return [(int(sql[7:]),)]
+    return []
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_falha_ao_gravar_historico_mantem_o_checkpoint(configuracao, max_workers):
+    def responder(sql, parametros):
+        if 'amm_histPendencias' in sql or 'hist_staging' in sql:
+            raise RuntimeError('permission denied on amm_histPendencias')
+        return _contagem(sql, parametros)
+
+    resumo = _servico(responder, max_workers).executar_todas_consultas()
+
+    assert resumo.consultas_executadas == 3
+    # As contagens foram checkpointadas mas o histórico não: a próxima execução precisa regravá-lo
+    assert (configuracao / 'checkpoint_execucao.jsonl').exists()
+
+
+def test_worker_sem_reconexoes_mantem_o_checkpoint(configuracao):
+    falhou = threading.Event()
+
+    def responder(sql, parametros):
+        if sql == 'SELECT 2' and not falhou.is_set():
+            falhou.set()
+            raise ErroConexao()
+        return _contagem(sql, parametros)
+
+    resumo = _servico(responder, max_workers=3, quantidade=6).executar_todas_consultas()
+
+    assert falhou.is_set()
+    assert resumo.consultas_executadas == 6
+    assert (configuracao / 'checkpoint_execucao.jsonl').exists()
+
+
+def test_execucao_com_historico_gravado_conclui_o_checkpoint(configuracao):
+    resumo = _servico(_contagem, max_workers=3).executar_todas_consultas()
+
+    assert resumo.consultas_executadas == 3
+    assert not (configuracao / 'checkpoint_execucao.jsonl').exists()
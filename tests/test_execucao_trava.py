@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import app.services.pendencias as modulo
+from app.models.pendencia import Pendencia
+from app.services.connection_pool import ConnectionPool
+from app.services.database import DatabaseService
+from app.services.pendencias import PendenciasService
+from app.services.pendencias_async import PendenciasServiceAsync
+from app.services.trava_execucao import TravaArquivo
+from banco_falso import ConexaoFalsa
+
+
+@pytest.fixture
+def configuracao(tmp_path, monkeypatch):
+    for chave, valor in {
+        'output_dir': str(tmp_path), 'modo_incremental': False, 'checkpoint_habilitado': True,
+        'retomar_execucao': True, 'anomalias_habilitadas': False, 'history_flush_size': 500,
+        'query_timeout': 0, 'max_retries': 0, 'retry_delay': 0, 'trava_espera': 0,
+    }.items():
+        monkeypatch.setitem(modulo.APP_CONFIG, chave, valor)
+    return tmp_path
+
+
+def _servico(caminho_trava, max_workers=1, quantidade=9):
+    """Serviço cuja trava é tomada por outro processo durante a 2ª consulta executada"""
+    # ttl longo: o heartbeat é disparado pelo teste, não pela thread
+    trava = TravaArquivo(caminho_trava, ttl=3600, dono='este')
+    executadas = []
+    lock = threading.Lock()
+
+    def responder(sql, parametros):
+        if sql.startswith('SELECT ') and sql[7:].isdigit():
+            # Sob o lock: os outros workers só seguem depois que a perda foi detectada
+            with lock:
+                executadas.append(int(sql[7:]))
+                if len(executadas) == 2:
+                    caminho_trava.write_text(json.dumps({'dono': 'outro', 'token': 'x'}), encoding='utf-8')
+                    trava._renovar()
+            return [(int(sql[7:]),)]
+        return []
+
+    servico = PendenciasService()
+    servico.db_service = DatabaseService(pool=ConnectionPool(
+        lambda: ConexaoFalsa(responder), max_size=4, health_check=False, acquire_timeout=5
+    ))
+    servico.max_workers = max_workers
+    pendencias = [Pendencia(id=i, id_pendencia=100 + i, consulta_pendencia=f"SELECT {i}") for i in range(1, quantidade + 1)]
+    servico.extrair_pendencias = lambda: list(pendencias)
+    servico._carregar_usuarios_responsaveis = lambda: None
+    servico._criar_trava = lambda: trava
+    return servico, trava, executadas
+
+
+def test_renovacao_detecta_trava_tomada(tmp_path):
+    caminho = tmp_path / 'execucao.lock'
+    trava = TravaArquivo(caminho, ttl=3600, dono='este').adquirir()
+    try:
+        assert not trava.perdida
+        caminho.write_text(json.dumps({'dono': 'outro', 'token': 'x'}), encoding='utf-8')
+        antes = caminho.stat().st_mtime
+
+        trava._renovar()
+
+        assert trava.perdida
+        assert caminho.stat().st_mtime == antes
+    finally:
+        trava.liberar()
+    # A trava do outro processo continua lá
+    assert json.loads(caminho.read_text(encoding='utf-8'))['dono'] == 'outro'
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_execucao_para_ao_perder_a_trava(configuracao, max_workers):
+    servico, trava, executadas = _servico(configuracao / 'execucao.lock', max_workers)
+
+    assert servico.executar_todas_consultas() is None
+
+    assert trava.perdida
+    # Só terminam as consultas que já estavam em andamento em cada worker
+    assert len(executadas) <= 2 + (max_workers - 1)
+    # Sem arquivo de resultados; o progresso fica no checkpoint para a próxima execução
+    assert not list(configuracao.glob('resultados_execucao_pendencias_*'))
+    assert (configuracao / 'checkpoint_execucao.jsonl').exists()
+
+
+def test_execucao_async_para_ao_perder_a_trava(configuracao):
+    servico, trava, executadas = _servico(configuracao / 'execucao.lock')
+    servico_async = PendenciasServiceAsync(servico, max_concorrencia=1)
+    try:
+        assert asyncio.run(servico_async.executar_todas_consultas()) is None
+    finally:
+        servico_async.fechar()
+
+    assert len(executadas) == 2
+    assert not list(configuracao.glob('resultados_execucao_pendencias_*'))
+    assert (configuracao / 'checkpoint_execucao.jsonl').exists()
@@ -0,0 +1,58 @@
+import pytest
+
+from app.services import formato_resultados
+from app.services.formato_resultados import (
+    carregar_resultados, eh_arquivo_resultados, identificar, resolver_formato, salvar_resultados
+)
+
+DADOS = {
+    'timestamp': '2024-03-31T22:00:00',
+    'total_consultas': 2,
+    'resultados': {
+        '1': {'id': 1, 'nome_pendencia': 'Pedidos\nem atraso', 'total_registros': 12, 'status': 'sucesso'},
+        '2': {'id': 2, 'nome_pendencia': 'Notas é ção', 'total_registros': None, 'status': 'erro'},
+    },
+}
+
+COMBINACOES = [
+    ('json', 'nenhuma'), ('json', 'gzip'), ('jsonl', 'nenhuma'), ('jsonl', 'gzip'),
+    pytest.param('msgpack', 'nenhuma', marks=pytest.mark.skipif(
+        formato_resultados.msgpack is None, reason="msgpack not installed")),
+    pytest.param('json', 'zstd', marks=pytest.mark.skipif(
+        formato_resultados.zstandard is None, reason="zstandard not installed")),
+]
+
+
+@pytest.mark.parametrize('formato,compressao', COMBINACOES)
+def test_ida_e_volta(tmp_path, formato, compressao):
+    caminho = salvar_resultados(tmp_path / 'resultados_20240331', DADOS, formato, compressao)
+
+    assert identificar(caminho) == (formato, compressao)
+    assert carregar_resultados(caminho) == DADOS
+    # Nenhum temporário fica para trás
+    assert [p.name for p in tmp_path.iterdir()] == [caminho.name]
+
+
+def test_sem_biblioteca_opcional_recorre_a_jsonl_e_gzip(monkeypatch):
+    monkeypatch.setattr(formato_resultados, 'msgpack', None)
+    monkeypatch.setattr(formato_resultados, 'zstandard', None)
+
+    assert resolver_formato('msgpack', 'zstd') == ('jsonl', 'gzip')
+
+
+def test_configuracao_invalida_usa_o_padrao():
+    assert resolver_formato('xml', 'bzip2') == ('json', 'nenhuma')
+    assert resolver_formato('JSONL', 'none') == ('jsonl', 'nenhuma')
+
+
+@pytest.mark.parametrize('nome,esperado', [
+    ('resultados_1.json', True),
+    ('resultados_1.jsonl.gz', True),
+    ('resultados_1.msgpack.zst', True),
+    ('.resultados_1.json.tmp', False),
+    ('.resultados_1.json', False),
+    ('resultados_1.csv', False),
+    ('resultados_1.gz', False),
+])
+def test_eh_arquivo_resultados(nome, esperado):
+    assert eh_arquivo_resultados(nome) is esperado
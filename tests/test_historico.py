@@ -0,0 +1,94 @@
+from app.services.historico import HistoricoBatchWriter
+from banco_falso import ConexaoFalsa
+
+
+def _responder(falhar_em=()):
+    def responder(sql, parametros):
+        for trecho in falhar_em:
+            if trecho in sql:
+                raise RuntimeError(f"failed: {trecho}")
+        return []
+    return responder
+
+
+def _linhas_staging(conexao):
+    return [p for _, p in conexao.instrucoes('INSERT INTO #hist_staging')]
+
+
+def test_ultima_contagem_do_dia_prevalece_antes_do_merge():
+    conexao = ConexaoFalsa(_responder())
+    writer = HistoricoBatchWriter(conexao, flush_size=100)
+    writer.adicionar(101, '2024-03-31', '10:00:00', 7, 5)
+    writer.adicionar(102, '2024-03-31', '10:00:01', 7, 3)
+    writer.adicionar(101, '2024-03-31', '10:05:00', 8, 9)
+    writer.adicionar(101, '2024-03-30', '10:05:00', 8, 1)
+
+    assert len(writer) == 3
+    assert writer.flush()
+
+    assert sorted(_linhas_staging(conexao)) == [
+        (101, '2024-03-30', '10:05:00', 8, 1),
+        (101, '2024-03-31', '10:05:00', 8, 9),
+        (102, '2024-03-31', '10:00:01', 7, 3),
+    ]
+    assert len(conexao.instrucoes('MERGE amm_histPendencias')) == 1
+    assert conexao.commits == 1
+    assert writer.linhas_gravadas == 3
+    assert len(writer) == 0
+
+
+def test_flush_sem_linhas_nao_acessa_o_banco():
+    conexao = ConexaoFalsa(_responder())
+    assert HistoricoBatchWriter(conexao).flush()
+    assert conexao.executadas == []
+
+
+def test_falha_no_lote_recorre_a_gravacao_linha_a_linha():
+    conexao = ConexaoFalsa(_responder(falhar_em=['INSERT INTO #hist_staging']))
+    writer = HistoricoBatchWriter(conexao, flush_size=100)
+    writer.adicionar(101, '2024-03-31', '10:00:00', 7, 5)
+    writer.adicionar(102, '2024-03-31', '10:00:00', 7, 3)
+
+    assert writer.flush()
+
+    assert conexao.rollbacks == 1
+    assert conexao.instrucoes('MERGE') == []
+    # Sem registro do dia (rowcount 0), o UPDATE é seguido de INSERT
+    assert len(conexao.instrucoes('UPDATE amm_histPendencias')) == 2
+    assert sorted(p for _, p in conexao.instrucoes('INSERT INTO amm_histPendencias')) == [
+        (101, '2024-03-31', '10:00:00', 7, 5),
+        (102, '2024-03-31', '10:00:00', 7, 3),
+    ]
+    assert writer.linhas_gravadas == 2
+    assert writer.ultimo_erro is None
+
+
+def test_falha_nas_duas_tentativas_mantem_as_linhas():
+    conexao = ConexaoFalsa(_responder(falhar_em=['#hist_staging', 'amm_histPendencias']))
+    writer = HistoricoBatchWriter(conexao, flush_size=100)
+    writer.adicionar(101, '2024-03-31', '10:00:00', 7, 5)
+
+    assert not writer.flush()
+
+    assert len(writer) == 1
+    assert isinstance(writer.ultimo_erro, RuntimeError)
+    assert writer.linhas_gravadas == 0
+
+    # Uma contagem mais nova adicionada após a falha não é sobrescrita pela antiga no próximo flush
+    writer.adicionar(101, '2024-03-31', '11:00:00', 7, 6)
+    conexao.responder = _responder()
+    assert writer.flush()
+    assert _linhas_staging(conexao) == [(101, '2024-03-31', '11:00:00', 7, 6)]
+    assert writer.ultimo_erro is None
+
+
+def test_flush_automatico_ao_atingir_o_tamanho():
+    conexao = ConexaoFalsa(_responder())
+    writer = HistoricoBatchWriter(conexao, flush_size=3)
+
+    for i in range(7):
+        assert writer.adicionar(100 + i, '2024-03-31', '10:00:00', 7, i)
+
+    assert len(conexao.instrucoes('MERGE')) == 2
+    assert writer.linhas_gravadas == 6
+    assert len(writer) == 1
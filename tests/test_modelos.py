@@ -0,0 +1,46 @@
+import copy
+import pickle
+from dataclasses import FrozenInstanceError
+from datetime import datetime
+
+import pytest
+
+from app.models.pendencia import Pendencia, ResultadoExecucao
+
+PENDENCIA = Pendencia(
+    id=1, id_pendencia=101, consulta_pendencia="SELECT COUNT(*) FROM pedidos", id_grupo=2,
+    nome_pendencia="Pedidos", dt_criacao=datetime(2024, 1, 1), exibe_contagem=1, hash_consulta='abc'
+)
+
+
+def _resultado():
+    return ResultadoExecucao(
+        id=1, id_pendencia=101, nome_pendencia="Pedidos", id_grupo=2, quantidade=7, status='sucesso',
+        tempos={'total': 0.5}, pendencia=PENDENCIA
+    )
+
+
+def test_modelos_sem_dict_por_instancia():
+    assert not hasattr(PENDENCIA, '__dict__')
+    assert not hasattr(_resultado(), '__dict__')
+
+
+@pytest.mark.parametrize('copiar', [copy.copy, copy.deepcopy, lambda o: pickle.loads(pickle.dumps(o))])
+def test_pendencia_copiavel_e_serializavel(copiar):
+    copia = copiar(PENDENCIA)
+
+    assert copia == PENDENCIA
+    assert copia.consulta_preview == PENDENCIA.consulta_preview
+    with pytest.raises(FrozenInstanceError):
+        copia.id = 2
+
+
+@pytest.mark.parametrize('copiar', [copy.copy, copy.deepcopy, lambda o: pickle.loads(pickle.dumps(o))])
+def test_resultado_copiavel_e_serializavel(copiar):
+    original = _resultado()
+
+    copia = copiar(original)
+
+    assert copia == original
+    assert copia.pendencia == PENDENCIA
+    assert copia.tempos == {'total': 0.5}
@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import app.services.pendencias_async as modulo
+from app.services.historico import HistoricoBatchWriter
+from app.services.pendencias import PendenciasService
+from app.services.pendencias_async import PendenciasServiceAsync
+
+
+class _Cursor:
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.rowcount = 0
+
+    def execute(self, sql, *parametros):
+        if self.conexao.falhar:
+            raise self.conexao.falhar
+        if 'MERGE' in sql:
+            self.conexao.merges += 1
+
+    def executemany(self, sql, linhas):
+        self.execute(sql)
+
+
+class _Conexao:
+    def __init__(self, falhar=None):
+        self.falhar = falhar
+        self.merges = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def servico_async(monkeypatch):
+    monkeypatch.setitem(modulo.APP_CONFIG, 'retry_delay', 0)
+    servico = PendenciasService()
+    servico_async = PendenciasServiceAsync(servico, max_concorrencia=2)
+    yield servico_async
+    servico_async.fechar()
+
+
+def _usar_conexao(servico_async, conexao):
+    @contextmanager
+    def get_connection():
+        yield conexao
+    servico_async.servico.db_service.get_connection = get_connection
+
+
+def _writer_com_linhas(quantidade):
+    writer = HistoricoBatchWriter(None, flush_size=500)
+    for i in range(quantidade):
+        writer.adicionar(100 + i, '2024-01-01', '10:00:00', 1, i)
+    return writer
+
+
+def test_historico_dos_threads_gravado_em_lote_ao_final(servico_async):
+    conexao = _Conexao()
+    _usar_conexao(servico_async, conexao)
+    preparo = SimpleNamespace(historico_pendente=False)
+    writers = [_writer_com_linhas(3), _writer_com_linhas(2), _writer_com_linhas(0)]
+
+    servico_async._gravar_historico(preparo, writers)
+
+    assert conexao.merges == 2
+    assert [len(w) for w in writers] == [0, 0, 0]
+    assert not preparo.historico_pendente
+
+
+def test_falha_ao_gravar_historico_e_registrada(servico_async):
+    _usar_conexao(servico_async, _Conexao(falhar=RuntimeError('permission denied')))
+    preparo = SimpleNamespace(historico_pendente=False)
+    writers = [_writer_com_linhas(3)]
+
+    servico_async._gravar_historico(preparo, writers)
+
+    # As linhas continuam no writer e o checkpoint será mantido para regravá-las
+    assert len(writers[0]) == 3
+    assert preparo.historico_pendente
+
+
+def test_concorrencia_limitada_ao_pool():
+    servico = PendenciasService()
+    if servico.db_service.pool is None:
+        pytest.skip("connection pool disabled")
+    servico_async = PendenciasServiceAsync(servico, max_concorrencia=servico.db_service.pool.max_size + 10)
+    try:
+        assert servico_async.max_concorrencia == servico.db_service.pool.max_size
+    finally:
+        servico_async.fechar()
@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.models.pendencia import ResultadoExecucao, TabelaResultados
+from app.services.resumo import calcular_estatisticas, indices_maiores, top_k
+
+
+def _resultados(quantidade=200, semente=7):
+    aleatorio = random.Random(semente)
+    resultados = []
+    for i in range(quantidade):
+        status = aleatorio.choice(['sucesso', 'sucesso', 'sucesso', 'erro', 'ignorada'])
+        resultados.append(ResultadoExecucao(
+            id=i + 1, id_pendencia=1000 + i, nome_pendencia=f"Pendência {i}",
+            id_grupo=aleatorio.choice([1, 2, 3, None]),
+            # Muitos empates para exercitar a ordem de desempate
+            quantidade=aleatorio.randint(0, 20) if status == 'sucesso' else None,
+            status=status,
+            do_historico=aleatorio.random() < 0.1,
+            tempos={'execucao': aleatorio.choice([0.5, 1.0, 2.0]), 'total': aleatorio.choice([1.0, 2.0, 3.0])}
+        ))
+    return resultados
+
+
+def test_top_k_mantem_a_ordem_original_nos_empates():
+    itens = [('a', 3), ('b', 5), ('c', 3), ('d', 5), ('e', 1)]
+    assert top_k(itens, 3, chave=lambda x: x[1]) == [('b', 5), ('d', 5), ('a', 3)]
+    assert top_k(itens, 0, chave=lambda x: x[1]) == []
+
+
+@pytest.mark.parametrize('k', [0, 1, 3, 6, 50])
+def test_indices_maiores_igual_a_ordenacao_completa(k):
+    valores = np.array([4, 9, 1, 9, 4, 7, 4, 0], dtype=float)
+    mascara = np.array([True, True, True, True, True, False, True, True])
+
+    esperado = sorted(np.flatnonzero(mascara), key=lambda i: (-valores[i], i))[:k]
+
+    assert list(indices_maiores(valores, mascara, k)) == esperado
+
+
+def test_indices_maiores_sem_candidatos():
+    assert len(indices_maiores(np.array([1.0, 2.0]), np.array([False, False]), 3)) == 0
+
+
+def test_caminhos_iterativo_e_colunar_concordam():
+    resultados = _resultados()
+
+    iterativo = calcular_estatisticas(resultados, top_n=5, top_lentas=10)
+    colunar = calcular_estatisticas(resultados, tabela=TabelaResultados(resultados), top_n=5, top_lentas=10)
+
+    assert iterativo.executadas == colunar.executadas
+    assert iterativo.erros == colunar.erros
+    assert iterativo.ignoradas == colunar.ignoradas
+    assert iterativo.reaproveitadas == colunar.reaproveitadas
+    assert iterativo.total_pendencias == colunar.total_pendencias
+    assert iterativo.indices_top == list(colunar.indices_top)
+    assert iterativo.indices_lentas == list(colunar.indices_lentas)
+    assert iterativo.tempos_por_fase == pytest.approx(colunar.tempos_por_fase)
+    assert [(g.id_grupo, g.consultas, g.executadas, g.erros, g.total_pendencias) for g in iterativo.grupos] == \
+        [(g.id_grupo, g.consultas, g.executadas, g.erros, g.total_pendencias) for g in colunar.grupos]
+
+
+def test_top_igual_a_ordenacao_completa():
+    resultados = _resultados()
+
+    estatisticas = calcular_estatisticas(resultados, top_n=5)
+
+    positivos = [i for i, r in enumerate(resultados) if r.status == 'sucesso' and r.quantidade]
+    assert estatisticas.indices_top == sorted(positivos, key=lambda i: (-resultados[i].quantidade, i))[:5]
+    assert estatisticas.total_pendencias == sum(resultados[i].quantidade for i in positivos)
+    # Pendências sem grupo ficam no fim
+    assert estatisticas.grupos[-1].id_grupo is None
+
+
+def test_execucao_vazia():
+    estatisticas = calcular_estatisticas([], tabela=TabelaResultados([]))
+    assert estatisticas.executadas == 0
+    assert list(estatisticas.indices_top) == []
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import app.services.pendencias as modulo
+from app.models.pendencia import Pendencia, ResultadoExecucao
+from app.services.checkpoint import CheckpointExecucao
+from app.services.pendencias import PendenciasService
+
+
+def _resultado(pendencia, quantidade):
+    return ResultadoExecucao(
+        id=pendencia.id, id_pendencia=pendencia.id_pendencia, nome_pendencia=pendencia.nome_pendencia,
+        id_grupo=pendencia.id_grupo, quantidade=quantidade, status='sucesso',
+        exibe_contagem=pendencia.exibe_contagem, pendencia=pendencia
+    )
+
+
+@pytest.fixture
+def servico(tmp_path, monkeypatch):
+    for chave, valor in {
+        'output_dir': str(tmp_path), 'modo_incremental': True, 'janela_frescor_minutos': 60,
+        'checkpoint_habilitado': True, 'retomar_execucao': True, 'anomalias_habilitadas': False,
+        'max_workers': 1,
+    }.items():
+        monkeypatch.setitem(modulo.APP_CONFIG, chave, valor)
+
+    pendencias = [Pendencia(id=i, id_pendencia=100 + i, consulta_pendencia=f"SELECT {i}", id_grupo=1) for i in range(1, 5)]
+    servico = PendenciasService()
+    servico.extrair_pendencias = lambda: list(pendencias)
+    servico._carregar_usuarios_responsaveis = lambda: None
+    servico._regravar_historico = lambda resultados: None
+    servico._salvar_resultados = lambda resumo: None
+    servico.pendencias_teste = pendencias
+    return servico
+
+
+def test_retomada_dentro_da_janela_nao_conta_concluidas_duas_vezes(servico, tmp_path):
+    p1, p2, p3, p4 = servico.pendencias_teste
+
+    # Execução anterior caiu depois de concluir p1 e p2: checkpoint e histórico de hoje
+    checkpoint = CheckpointExecucao(tmp_path / 'checkpoint_execucao.jsonl')
+    checkpoint.iniciar(retomar=False)
+    checkpoint.registrar(_resultado(p1, 5))
+    checkpoint.registrar(_resultado(p2, 7))
+    checkpoint.fechar()
+    agora = datetime.now()
+    servico._carregar_historico_hoje = lambda: {p1.id_pendencia: (5, agora), p2.id_pendencia: (7, agora)}
+
+    preparo = servico._preparar_execucao(None, False)
+
+    assert sorted(preparo.concluidos) == [1, 2]
+    assert preparo.reaproveitados == []
+    assert [p.id for p in preparo.pendencias] == [3, 4]
+
+    resumo = servico._finalizar_execucao(preparo, [_resultado(p3, 1), _resultado(p4, 2)])
+
+    assert sorted(r.id for r in resumo.resultados) == [1, 2, 3, 4]
+    assert resumo.total_pendencias_encontradas == 5 + 7 + 1 + 2
+    # Execução completa: o checkpoint foi concluído e removido
+    assert not (tmp_path / 'checkpoint_execucao.jsonl').exists()
+
+
+def test_sem_checkpoint_o_modo_incremental_reaproveita_o_historico(servico):
+    p1, p2, p3, p4 = servico.pendencias_teste
+    servico._carregar_historico_hoje = lambda: {p1.id_pendencia: (5, datetime.now())}
+
+    preparo = servico._preparar_execucao(None, False)
+
+    assert [r.id for r in preparo.reaproveitados] == [1]
+    assert preparo.concluidos == {}
+    assert [p.id for p in preparo.pendencias] == [2, 3, 4]
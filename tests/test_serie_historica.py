@@ -0,0 +1,98 @@
+import json
+from datetime import date
+
+import numpy as np
+
+from app.models.pendencia import ResultadoExecucao, TabelaResultados
+from app.services.serie_historica import DTYPE_SERIE, NOME_SERIE, SerieHistorica
+
+
+def _resultados(contagens, status=None):
+    status = status or {}
+    return {
+        str(i): {'id': i, 'id_pendencia': 100 + i, 'nome_pendencia': f"P{i}", 'total_registros': qtd,
+                 'status': status.get(i, 'sucesso')}
+        for i, qtd in contagens.items()
+    }
+
+
+def test_mesmo_dia_gravado_duas_vezes_prevalece_o_ultimo(tmp_path):
+    serie = SerieHistorica(tmp_path / NOME_SERIE)
+    serie.adicionar_registros(date(2024, 3, 10), _resultados({1: 10, 2: 5}))
+    serie.adicionar_registros(date(2024, 3, 10), _resultados({1: 7}))
+    serie.adicionar_registros(date(2024, 3, 11), _resultados({1: 6, 2: 4}))
+
+    registros = serie.carregar()
+
+    assert len(serie) == 5
+    assert [(str(r['data']), int(r['id']), r['quantidade']) for r in registros] == [
+        ('2024-03-10', 1, 7.0),
+        # Sem regravação no mesmo dia, o registro da primeira execução continua valendo
+        ('2024-03-10', 2, 5.0),
+        ('2024-03-11', 1, 6.0),
+        ('2024-03-11', 2, 4.0),
+    ]
+
+
+def test_matriz_preenche_dias_sem_registro_com_nan(tmp_path):
+    serie = SerieHistorica(tmp_path / NOME_SERIE)
+    serie.adicionar_registros(date(2024, 3, 10), _resultados({1: 10, 2: 5}))
+    serie.adicionar_registros(date(2024, 3, 12), _resultados({1: 8, 2: 3}, status={2: 'erro'}))
+    serie.adicionar_registros(date(2024, 3, 12), _resultados({1: 9}))
+
+    ids, dias, valores = serie.matriz(date(2024, 3, 10), date(2024, 3, 13))
+
+    assert list(ids) == [1, 2]
+    assert [str(d) for d in dias] == ['2024-03-10', '2024-03-11', '2024-03-12', '2024-03-13']
+    np.testing.assert_array_equal(valores, [[10, np.nan, 9, np.nan], [5, np.nan, np.nan, np.nan]])
+
+
+def test_intervalo_e_serie_vazia(tmp_path):
+    serie = SerieHistorica(tmp_path / NOME_SERIE)
+    assert len(serie.carregar()) == 0
+    assert serie.matriz()[2].shape == (0, 0)
+
+    for dia in range(10, 15):
+        serie.adicionar_registros(date(2024, 3, dia), _resultados({1: dia}))
+
+    registros = serie.carregar(date(2024, 3, 11), date(2024, 3, 13))
+    assert list(registros['quantidade']) == [11.0, 12.0, 13.0]
+
+
+def test_adicionar_a_partir_da_tabela_ignora_erros(tmp_path):
+    serie = SerieHistorica(tmp_path / NOME_SERIE)
+    tabela = TabelaResultados([
+        ResultadoExecucao(id=1, id_pendencia=101, nome_pendencia="P1", id_grupo=1, quantidade=3, status='sucesso'),
+        ResultadoExecucao(id=2, id_pendencia=102, nome_pendencia="P2", id_grupo=1, quantidade=None, status='erro'),
+    ])
+
+    assert serie.adicionar(date(2024, 3, 10), tabela) == 1
+    assert [int(i) for i in serie.carregar()['id']] == [1]
+    assert serie.nomes() == {'1': 'P1'}
+
+
+def test_registro_parcial_no_fim_e_descartado(tmp_path):
+    caminho = tmp_path / NOME_SERIE
+    serie = SerieHistorica(caminho)
+    serie.adicionar_registros(date(2024, 3, 10), _resultados({1: 10}))
+    with open(caminho, 'ab') as f:
+        f.write(b'\x00' * (DTYPE_SERIE.itemsize // 2))
+
+    serie.adicionar_registros(date(2024, 3, 11), _resultados({1: 8}))
+
+    assert caminho.stat().st_size == 2 * DTYPE_SERIE.itemsize
+    assert list(serie.carregar()['quantidade']) == [10.0, 8.0]
+
+
+def test_reconstruir_a_partir_dos_arquivos(tmp_path):
+    arquivos = []
+    for dia, contagens in ((date(2024, 3, 10), {1: 10}), (date(2024, 3, 11), {1: 8, 2: 2})):
+        caminho = tmp_path / f"resultados_execucao_pendencias_{dia:%Y%m%d}_220000.json"
+        caminho.write_text(json.dumps({'resultados': _resultados(contagens)}), encoding='utf-8')
+        arquivos.append((dia, caminho))
+    serie = SerieHistorica(tmp_path / NOME_SERIE)
+    serie.adicionar_registros(date(2024, 1, 1), _resultados({9: 1}))
+
+    assert serie.reconstruir(arquivos) == 3
+    assert [int(i) for i in serie.carregar()['id']] == [1, 1, 2]
+    assert serie.nomes() == {'1': 'P1', '2': 'P2'}
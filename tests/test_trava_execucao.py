@@ -0,0 +1,48 @@
+import os
+import time
+
+import pytest
+
+from app.services.trava_execucao import ExecucaoEmAndamento, TravaArquivo, TravaExecucao, criar_trava
+
+
+def test_trava_base_e_abstrata():
+    with pytest.raises(TypeError):
+        TravaExecucao()
+
+
+def test_segunda_execucao_falha_enquanto_a_trava_esta_ativa(tmp_path):
+    caminho = tmp_path / 'execucao.lock'
+    with TravaArquivo(caminho, dono='a').adquirir():
+        with pytest.raises(ExecucaoEmAndamento) as erro:
+            TravaArquivo(caminho, dono='b').adquirir()
+        assert erro.value.dono['dono'] == 'a'
+    assert not caminho.exists()
+
+
+def test_trava_expirada_e_assumida(tmp_path):
+    caminho = tmp_path / 'execucao.lock'
+    orfa = TravaArquivo(caminho, ttl=60, dono='morto')
+    assert orfa._tentar(0)
+    antigo = time.time() - 120
+    os.utime(caminho, (antigo, antigo))
+
+    nova = TravaArquivo(caminho, ttl=60, dono='novo').adquirir()
+    try:
+        assert nova.dono_atual()['dono'] == 'novo'
+    finally:
+        nova.liberar()
+
+
+def test_liberar_nao_remove_trava_de_outro_dono(tmp_path):
+    caminho = tmp_path / 'execucao.lock'
+    atual = TravaArquivo(caminho, dono='atual')
+    assert atual._tentar(0)
+    TravaArquivo(caminho, dono='outro')._liberar()
+    assert atual.dono_atual()['dono'] == 'atual'
+
+
+def test_criar_trava():
+    assert criar_trava('desativada') is None
+    with pytest.raises(ValueError):
+        criar_trava('redis')
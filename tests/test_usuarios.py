@@ -0,0 +1,60 @@
+from app.services.usuarios import UsuariosResponsaveisCache
+
+
+class _Cursor:
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.consultas = 0
+
+    def execute(self, sql, params=()):
+        self.consultas += 1
+
+    def fetchall(self):
+        return self.linhas
+
+
+class _Conexao:
+    def __init__(self, linhas):
+        self.cursor_fake = _Cursor(linhas)
+
+    def cursor(self):
+        return self.cursor_fake
+
+
+def test_sem_indice_carregado_e_cache_miss():
+    assert UsuariosResponsaveisCache().obter(10) is None
+
+
+def test_indice_carregado_agrupa_usuarios_por_pendencia():
+    cache = UsuariosResponsaveisCache()
+    assert cache.carregar(_Conexao([(10, 1, 'Ana'), (10, 2, 'Bruno'), (20, 3, 'Carla')]))
+
+    assert [u['nome_usuario'] for u in cache.obter(10)] == ['Ana', 'Bruno']
+    assert cache.obter(20) == [{'id_usuario': 3, 'nome_usuario': 'Carla'}]
+
+
+def test_pendencia_sem_responsaveis_nao_e_cache_miss():
+    cache = UsuariosResponsaveisCache()
+    cache.carregar(_Conexao([(10, 1, 'Ana')]))
+
+    # Lista vazia (sem responsáveis) em vez de None: o serviço não faz a consulta individual
+    assert cache.obter(99) == []
+
+
+def test_falha_na_carga_volta_ao_cache_miss():
+    class _ConexaoQuebrada:
+        def cursor(self):
+            raise RuntimeError("sem conexão")
+
+    cache = UsuariosResponsaveisCache()
+    assert not cache.carregar(_ConexaoQuebrada())
+    assert cache.obter(10) is None
+
+
+def test_ttl_reaproveita_indice_sem_nova_consulta():
+    cache = UsuariosResponsaveisCache(ttl=60)
+    conexao = _Conexao([(10, 1, 'Ana')])
+    cache.carregar(conexao)
+    cache.carregar(conexao)
+
+    assert conexao.cursor_fake.consultas == 1